@@ -0,0 +1,206 @@
+"""
+Сводный анализ файла за один проход (Л2.№1–№5)
+
+lab2_1 .. lab2_5 читают файл целиком и считают по одной величине; здесь файл
+читается один раз кусками по CHUNK байт, и каждый кусок сразу получают все
+накопители:
+
+  байты порядка 0          — IΣ(Q), E, G64, G8                   (lab2_1)
+  кодовые точки порядка 0  — |A1|, IΣ(Q), E, G                    (lab2_2)
+  кодировка                — guess_encoding по частотам байтов    (lab2_3)
+  пары байтов              — I_CM1(Q)                            (lab2_4)
+  пары кодовых точек       — I_CM1(Q)                            (lab2_5)
+
+UTF-8 декодируется инкрементально: символ, разрезанный границей куска,
+собирается в следующем куске; байты, не образующие UTF-8, считаются отдельными
+символами (surrogateescape) и выводятся в отчёте как «некорректные байты».
+Последний байт / символ куска переносится в следующий, чтобы пары на границе
+не терялись.
+
+Память не зависит от длины файла: кусок фиксированного размера и таблицы
+частот (256 байтов, 65536 пар байтов, алфавит и пары кодовых точек файла).
+"""
+import codecs
+import importlib.util
+import math
+import os
+import sys
+from collections import Counter
+
+CHUNK = 1 << 20  # байт за одно чтение
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+lab2_3 = load_module("lab2_3", os.path.join(base_dir, "lab2_3.py"))
+histogram = load_module("histogram", os.path.join(base_dir, "..", "lab4", "histogram.py"))
+
+
+def info_bits(counts):
+    """IΣ(Q) = Σ count · log2(n / count) по таблице частот."""
+    n = sum(counts)
+    return sum(c * math.log2(n / c) for c in counts if c)
+
+
+def cond_info_bits(pairs, key_first):
+    """I_CM1(Q) = Σ count(a b) · log2(count(a *) / count(a b)).
+
+    pairs — Counter пар, key_first(ключ) — первый символ пары.
+    """
+    first = Counter()
+    for key, c in pairs.items():
+        first[key_first(key)] += c
+    return sum(c * math.log2(first[key_first(key)] / c) for key, c in pairs.items())
+
+
+class ByteStats:
+    """частоты байтов и пар соседних байтов (плотные таблицы из histogram).
+
+    counts — 256 частот, pairs — 65536 частот с индексом prev · 256 + next.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.counts = [0] * 256
+        self.pairs = [0] * 65536
+        self.prev = b""
+
+    def feed(self, chunk):
+        if not chunk:
+            return
+        self.n += len(chunk)
+        histogram.add_counts(self.counts, histogram.byte_counts(chunk))
+        histogram.add_counts(self.pairs, histogram.pair_counts(self.prev + chunk))
+        self.prev = chunk[-1:]
+
+    def byte_counts(self):
+        return self.counts
+
+    def byte_counter(self):
+        """ненулевые частоты байтов как Counter (для lab2_3.guess_encoding)."""
+        return Counter({b: c for b, c in enumerate(self.counts) if c})
+
+
+class TextStats:
+    """частоты кодовых точек и их пар; UTF-8 декодируется по кускам."""
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder("utf-8")("surrogateescape")
+        self.n = 0
+        self.counts = Counter()
+        self.pairs = Counter()
+        self.prev = ""
+
+    def feed(self, chunk, final=False):
+        text = self.decoder.decode(chunk, final)
+        if not text:
+            return
+        self.n += len(text)
+        self.counts.update(text)
+        buf = self.prev + text
+        self.pairs.update(zip(buf, buf[1:]))
+        self.prev = text[-1]
+
+    def finish(self):
+        self.feed(b"", final=True)
+
+    def invalid_bytes(self):
+        """байтов, не вошедших в корректные последовательности UTF-8."""
+        return sum(c for ch, c in self.counts.items() if "\udc80" <= ch <= "\udcff")
+
+
+def analyze(filename, chunk=CHUNK):
+    """прочитать файл один раз и вернуть накопители (ByteStats, TextStats)."""
+    bs = ByteStats()
+    ts = TextStats()
+    with open(filename, "rb") as f:
+        while True:
+            buf = f.read(chunk)
+            if not buf:
+                break
+            bs.feed(buf)
+            ts.feed(buf)
+    ts.finish()
+    return bs, ts
+
+
+def _char_disp(ch):
+    return ch if ch.isprintable() else f"\\u{ord(ch):04x}"
+
+
+def print_report(filename, bs, ts, top=4):
+    n = bs.n
+    print(f"\nСводный анализ файла: {filename}")
+    if n == 0:
+        print("Файл пустой.")
+        return
+
+    # Л2.№1 — байты без контекста
+    i_bytes = histogram.entropy_bits(bs.counts)
+    E = math.ceil(i_bytes / 8)
+    print("\n[Л2.№1] байты, без контекста")
+    print(f"Длина файла: n = {n} байт ({n * 8} бит)")
+    print(f"Суммарная информация IΣ(Q) = {i_bytes:.2f} бит ({i_bytes / 8:.2f} байт)")
+    print(f"Минимальная длина без учёта контекста: E = {E} байт")
+    print(f"Длина архива с таблицей G64 = {E + 256 * 8} байт")
+    print(f"Длина архива с таблицей G8  = {E + 256} байт")
+
+    # Л2.№2 — кодовые точки без контекста
+    i_chars = info_bits(ts.counts.values())
+    E_chars = math.ceil(i_chars / 8)
+    print("\n[Л2.№2] кодовые точки UTF-8, без контекста")
+    print(f"Количество символов: n = {ts.n}")
+    invalid = ts.invalid_bytes()
+    if invalid:
+        print(f"Некорректные байты UTF-8: {invalid} (считаются отдельными символами)")
+    print(f"Размер алфавита |A1| = {len(ts.counts)}")
+    print(f"Суммарная информация IΣ(Q) = {i_chars:.2f} бит ({i_chars / 8:.2f} байт)")
+    print(f"Минимальная длина без контекста: E = {E_chars} байт")
+    print(f"Оценочная длина архива G = {E_chars + math.ceil(64 / 8 + len(ts.counts) * (32 + 64) / 8)} байт")
+
+    # Л2.№3 — кодировка
+    byte_counter = bs.byte_counter()
+    print("\n[Л2.№3] кодировка")
+    print(f"Количество уникальных байт: {len(byte_counter)}")
+    print(f"Топ-{top} наиболее частых байта:")
+    for b, c in byte_counter.most_common(top):
+        char = chr(b) if 32 <= b <= 126 else '.'
+        print(f"  {b:3} (0x{b:02X}) '{char}' — {c} раз ({100 * c / n:.2f}%)")
+    non_ascii = sorted(((b, c) for b, c in byte_counter.items() if b > 127), key=lambda x: -x[1])[:top]
+    print(f"Топ-{top} наиболее частых не-ASCII байта:")
+    for b, c in non_ascii:
+        print(f"  {b:3} (0x{b:02X}) — {c} раз ({100 * c / n:.2f}%)")
+    print(f"➡ Предполагаемая кодировка: {lab2_3.guess_encoding(byte_counter)}")
+
+    # Л2.№4 — пары байтов
+    print("\n[Л2.№4] байты, контекст 1-го порядка")
+    print(f"Количество различных пар: {sum(1 for c in bs.pairs if c)}")
+    if n >= 2:
+        i_cm1 = histogram.cond_entropy_bits(bs.pairs)
+        print(f"Суммарное количество информации I_CM1(Q) = {i_cm1:.2f} бит ({i_cm1 / 8:.2f} байт)")
+
+    # Л2.№5 — пары кодовых точек
+    print("\n[Л2.№5] кодовые точки, контекст 1-го порядка")
+    print(f"Количество различных пар: {len(ts.pairs)}")
+    if ts.n >= 2:
+        i_cm1 = cond_info_bits(ts.pairs, lambda p: p[0])
+        print(f"Суммарная информация I_CM1(Q) = {i_cm1:.2f} бит ({i_cm1 / 8:.2f} байт)")
+        print(f"Самые частые пары: " + ", ".join(
+            f"'{_char_disp(a)}{_char_disp(b)}' {c}" for (a, b), c in ts.pairs.most_common(top)))
+    print("-" * 60)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Использование: python analyze.py <имя_файла> [--chunk=БАЙТ]")
+    else:
+        chunk = CHUNK
+        for arg in sys.argv[2:]:
+            if arg.startswith("--chunk="):
+                chunk = int(arg.split("=", 1)[1])
+        print_report(sys.argv[1], *analyze(sys.argv[1], chunk))
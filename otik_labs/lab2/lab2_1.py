@@ -1,25 +1,35 @@
+import importlib.util
 import math
+import os
 import sys
-from collections import Counter
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+histogram = load_module("histogram", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lab4", "histogram.py"))
+statcache = load_module("otik_statcache", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lab4", "statcache.py"))
 
 def analyze_file(filename):
-    with open(filename, "rb") as f:
-        data = f.read()
+    # количества вхождений каждого байта (из постоянного кэша, если файл не менялся)
+    dense = statcache.entry(filename).byte_counts()
 
-    n = len(data)  # длина в байтах
+    n = sum(dense)  # длина в байтах
     if n == 0:
         print("Файл пустой.")
         return
 
-    # количества вхождений каждого байта 
-    counts = Counter(data)
+    counts = {b: c for b, c in enumerate(dense) if c}
 
     # вероятности и количества информации 
     probs = {b: counts[b] / n for b in counts}
     infos = {b: -math.log2(probs[b]) for b in counts}
 
     # cуммарное количество информации 
-    total_info_bits = sum(counts[b] * infos[b] for b in counts)
+    total_info_bits = histogram.entropy_bits(dense)
     total_info_bytes = total_info_bits / 8
 
     # oценки сжатия 
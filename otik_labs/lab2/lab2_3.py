@@ -1,5 +1,46 @@
+"""
+Л2.№3 — определение кодировки текста
+
+analyze_encoding — отчёт по гистограмме всего файла (guess_encoding по долям
+характерных байтов).
+
+detect — быстрый режим для сортировки множества файлов: читается не весь файл,
+а выборки по SAMPLE байт (первая — с начала, остальные — через равные промежутки,
+не больше MAX_SAMPLES), так что время на файл не зависит от его длины.
+Кандидаты:
+
+  UTF-8           — каждая выборка проверяется инкрементальным декодером
+                    (начало выборки выравнивается на границу символа, символ,
+                    разрезанный концом выборки, не ошибка); первая же
+                    некорректная последовательность исключает UTF-8;
+  UTF-16/32       — только если в выборке есть нулевые байты, декодирование
+                    строгое; BOM в начале файла решает сразу;
+  CP1251, KOI8-R, ISO-8859-5, CP866, MacCyrillic — по правдоподобию биграмм.
+
+Правдоподобие: выборка декодируется каждым кандидатом, и для каждой пары
+соседних символов x y складывается log2 P(y | x) по простой модели русского
+текста: переход между классами символов (строчная/прописная кириллица, латиница,
+цифры, пробелы, пунктуация, прочее) × частота буквы в классе × бонус частым
+буквенным биграммам. Неверная кодировка даёт «ПрИвЕт», псевдографику и
+символы вместо букв — её правдоподобие на порядки ниже. Для однобайтовых
+кодировок пары байтов считаются один раз, а вес пары символов кэшируется.
+
+Уверенность — апостериорная вероятность лучшего кандидата при равных априорных:
+1 / Σ 2^(s_i − s_best). Как только она достигает порога (CONFIDENCE), чтение
+прекращается. Если в выборках нет ни одного байта ≥ 0x80 — ответ «ascii», а
+уверенность равна доле прочитанного файла. Нулевые байты без корректного
+UTF-16/32 или правдоподобие лучшего кандидата ниже MIN_BITS на пару символов
+(у русского текста около −4.5, у сжатых данных −9 и ниже) — ответ «binary».
+
+detect_many — то же для списка файлов и каталогов (обход вглубь, скрытые файлы
+пропускаются), с потоками для перекрытия ожидания диска.
+"""
+import codecs
+import math
+import os
 import sys
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 def guess_encoding(counts):
     """Определение кодировки по частотам байтов."""
@@ -36,6 +77,276 @@ def guess_encoding(counts):
     return "Неопределённая кодировка (возможно другая или смешанная)"
 
 
+# --- быстрое определение по выборкам ---
+
+SAMPLE = 4096        # байт в выборке
+MAX_SAMPLES = 8      # выборок на файл, не больше
+CONFIDENCE = 0.999   # порог уверенности для досрочного выхода
+MIN_BITS = -8.0      # log2-правдоподобие на пару символов ниже этого — не текст
+
+SINGLE_BYTE = ("cp1251", "koi8-r", "iso-8859-5", "cp866", "mac-cyrillic")
+WIDE = ("utf-16-le", "utf-16-be", "utf-32-le", "utf-32-be")
+BOMS = (  # UTF-32 раньше UTF-16: FF FE 00 00 начинается с FF FE
+    (codecs.BOM_UTF32_LE, "utf-32-le"), (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+ENCODING_NAMES = {
+    "ascii": "ASCII / не русскоязычный текст",
+    "binary": "не текст (двоичные данные)",
+    "utf-8": "UTF-8",
+    "utf-16-le": "UTF-16LE", "utf-16-be": "UTF-16BE",
+    "utf-32-le": "UTF-32LE", "utf-32-be": "UTF-32BE",
+    "cp1251": "Windows-1251 (CP1251)",
+    "koi8-r": "KOI8-R",
+    "iso-8859-5": "ISO-8859-5",
+    "cp866": "CP866 (DOS)",
+    "mac-cyrillic": "MacCyrillic",
+}
+
+# символы однобайтовых кодировок: 256 символов, неопределённые байты — U+FFFD
+_TABLES = {enc: bytes(range(256)).decode(enc, errors="replace") for enc in SINGLE_BYTE}
+
+# частоты русских букв
+_LETTER_FREQ = {
+    "о": .1097, "е": .0845, "а": .0801, "и": .0735, "н": .0670, "т": .0626, "с": .0547,
+    "р": .0473, "в": .0454, "л": .0440, "к": .0349, "м": .0321, "д": .0298, "п": .0281,
+    "у": .0262, "я": .0201, "ы": .0190, "ь": .0174, "г": .0170, "з": .0165, "б": .0159,
+    "ч": .0144, "й": .0121, "х": .0097, "ж": .0094, "ш": .0073, "ю": .0064, "ц": .0048,
+    "щ": .0036, "э": .0032, "ф": .0026, "ъ": .0004, "ё": .0004,
+}
+# частые буквенные биграммы (бонус BIGRAM_BONUS бит)
+_TOP_BIGRAMS = frozenset(
+    "ст но то на ен ов ни ра во ко ер по ли пр ос ле го ор ет не ал та ка ол ре ло ом он ес "
+    "ва ла ел ие те ан ит де од ин ат от ия ем ве нн ри тр".split())
+BIGRAM_BONUS = 2.0
+
+# классы: c/C — строчная/прописная русская буква, l — латиница, d — цифра,
+# s — пробел/перевод строки, p — ASCII-пунктуация, q — типографская пунктуация,
+# x — всё прочее (псевдографика, управляющие, другие алфавиты, U+FFFD)
+_TYPOGRAPHIC = frozenset("—–«»…„“”‘’№\u00a0")
+_TRANSITIONS = {
+    "c": {"c": .80, "C": .001, "l": .003, "d": .002, "s": .15, "p": .04, "q": .002, "x": .0005},
+    "C": {"c": .70, "C": .20, "l": .003, "d": .002, "s": .05, "p": .04, "q": .002, "x": .0005},
+    "l": {"c": .002, "C": .001, "l": .80, "d": .01, "s": .12, "p": .07, "q": .002, "x": .0005},
+    "d": {"c": .01, "C": .005, "l": .005, "d": .60, "s": .20, "p": .18, "q": .005, "x": .0005},
+    "s": {"c": .50, "C": .08, "l": .10, "d": .05, "s": .15, "p": .10, "q": .02, "x": .002},
+    "p": {"c": .10, "C": .05, "l": .05, "d": .05, "s": .60, "p": .15, "q": .01, "x": .002},
+    "q": {"c": .10, "C": .05, "l": .02, "d": .02, "s": .70, "p": .10, "q": .01, "x": .002},
+    "x": {"c": .05, "C": .02, "l": .05, "d": .02, "s": .30, "p": .10, "q": .01, "x": .40},
+}
+_LOG_TRANSITIONS = {a: {b: math.log2(p) for b, p in row.items()} for a, row in _TRANSITIONS.items()}
+_LOG_IN_CLASS = {"l": -math.log2(52), "d": -math.log2(10), "p": -math.log2(32),
+                 "q": -math.log2(len(_TYPOGRAPHIC)), "x": -8.0}
+_LOG_SPACE = {" ": math.log2(.80), "\n": math.log2(.12), "\r": math.log2(.05), "\t": math.log2(.03)}
+
+_weights: dict = {}
+MAX_WEIGHTS = 1 << 16   # кэш весов пар символов, не больше
+
+
+def _char_class(ch):
+    if "а" <= ch <= "я" or ch == "ё":
+        return "c"
+    if "А" <= ch <= "Я" or ch == "Ё":
+        return "C"
+    if ch in _LOG_SPACE:
+        return "s"
+    if ch.isascii():
+        if ch.isalpha():
+            return "l"
+        if ch.isdigit():
+            return "d"
+        return "p" if ch.isprintable() else "x"
+    return "q" if ch in _TYPOGRAPHIC else "x"
+
+
+def _weight(x, y):
+    """log2 P(y | x) по модели русского текста (в битах, ≤ 0 без бонуса)."""
+    cx, cy = _char_class(x), _char_class(y)
+    w = _LOG_TRANSITIONS[cx][cy]
+    if cy in "cC":
+        w += math.log2(_LETTER_FREQ[y.lower()])
+        if cx in "cC" and (x + y).lower() in _TOP_BIGRAMS:
+            w += BIGRAM_BONUS
+    elif cy == "s":
+        w += _LOG_SPACE[y]
+    else:
+        w += _LOG_IN_CLASS[cy]
+    return w
+
+
+def _score(pairs):
+    """Σ count · log2 P(y | x) по Counter пар символов."""
+    weights = _weights
+    if len(weights) > MAX_WEIGHTS:
+        weights.clear()
+    s = 0.0
+    for pair, c in pairs.items():
+        w = weights.get(pair)
+        if w is None:
+            w = weights[pair] = _weight(*pair)
+        s += c * w
+    return s
+
+
+def _sample_offsets(size, sample=SAMPLE, max_samples=MAX_SAMPLES):
+    """смещения выборок: весь файл подряд, если он короткий, иначе через равные промежутки."""
+    if size <= sample * max_samples:
+        return list(range(0, size, sample))
+    step = (size - sample) / (max_samples - 1)
+    # кратно 4: выборки UTF-16/32 начинаются на границе кодовой единицы
+    return [int(i * step) & ~3 for i in range(max_samples)]
+
+
+class EncodingScores:
+    """накопленные по выборкам правдоподобия кандидатов."""
+
+    def __init__(self):
+        self.byte_pairs = Counter()
+        self.text_pairs = {enc: Counter() for enc in ("utf-8",) + WIDE}
+        self.dead = set()
+        self.high = 0        # байтов ≥ 0x80
+        self.nul = False     # встречались нулевые байты
+        self.bytes_read = 0
+
+    def feed(self, buf, offset):
+        self.bytes_read += len(buf)
+        self.byte_pairs.update(zip(buf, buf[1:]))
+        self.high += len(buf) - len(buf.translate(None, _HIGH_BYTES))
+        if "utf-8" not in self.dead:
+            start = 0
+            if offset:
+                # выборка могла начаться внутри символа: пропустить байты продолжения
+                while start < min(3, len(buf)) and 0x80 <= buf[start] <= 0xBF:
+                    start += 1
+            try:
+                text = codecs.getincrementaldecoder("utf-8")().decode(buf[start:], False)
+            except UnicodeDecodeError:
+                self.dead.add("utf-8")
+            else:
+                self.text_pairs["utf-8"].update(zip(text, text[1:]))
+        has_nul = 0 in buf
+        self.nul = self.nul or has_nul
+        for enc in WIDE:
+            if enc in self.dead:
+                continue
+            if not has_nul:
+                self.dead.add(enc)
+                continue
+            try:
+                text = codecs.getincrementaldecoder(enc)().decode(buf, False)
+            except UnicodeDecodeError as e:
+                # выборка UTF-16 могла начаться со второй половины суррогатной пары
+                if not (offset and enc.startswith("utf-16") and e.start == 0):
+                    self.dead.add(enc)
+                    continue
+                try:
+                    text = codecs.getincrementaldecoder(enc)().decode(buf[2:], False)
+                except UnicodeDecodeError:
+                    self.dead.add(enc)
+                    continue
+            self.text_pairs[enc].update(zip(text, text[1:]))
+
+    def scores(self):
+        """{кодировка: log2-правдоподобие} для неисключённых кандидатов."""
+        result = {}
+        byte_pairs = self.byte_pairs
+        for enc in SINGLE_BYTE:
+            table = _TABLES[enc]
+            chars = Counter()
+            for (a, b), c in byte_pairs.items():
+                chars[table[a], table[b]] += c
+            result[enc] = _score(chars)
+        for enc, pairs in self.text_pairs.items():
+            if enc not in self.dead:
+                result[enc] = _score(pairs)
+        return result
+
+    def best(self):
+        """(кодировка, уверенность, log2-правдоподобие на пару символов)."""
+        scores = self.scores()
+        enc = max(scores, key=scores.get)
+        top = scores[enc]
+        pairs = self.byte_pairs if enc in _TABLES else self.text_pairs[enc]
+        per_pair = top / max(1, sum(pairs.values()))
+        return enc, 1.0 / sum(2.0 ** (s - top) for s in scores.values()), per_pair
+
+
+_HIGH_BYTES = bytes(range(0x80, 0x100))
+
+
+def detect(filename, threshold=CONFIDENCE, sample=SAMPLE, max_samples=MAX_SAMPLES):
+    """быстро определить кодировку файла по выборкам.
+
+    Возвращает словарь: encoding (имя кодека Python, "ascii" или "binary"), confidence,
+    bytes_read, samples.
+    """
+    size = os.path.getsize(filename)
+    scores = EncodingScores()
+    samples = 0
+    with open(filename, "rb") as f:
+        head = f.read(sample)
+        if not head:
+            return {"encoding": "ascii", "confidence": 1.0, "bytes_read": 0, "samples": 0}
+        for bom, enc in BOMS:
+            if head.startswith(bom):
+                return {"encoding": enc, "confidence": 1.0, "bytes_read": len(head), "samples": 1}
+        for offset in _sample_offsets(size, sample, max_samples):
+            if offset:
+                f.seek(offset)
+                buf = f.read(sample)
+            else:
+                buf = head
+            scores.feed(buf, offset)
+            samples += 1
+            if scores.nul and scores.dead.issuperset(WIDE):
+                # нулевые байты, но не UTF-16/32 — не текст
+                enc, confidence = "binary", 1.0
+                break
+            if scores.high or not scores.dead.issuperset(WIDE):
+                enc, confidence, per_pair = scores.best()
+                if per_pair < MIN_BITS:
+                    # лучшая из кодировок даёт не текст, а шум
+                    enc = "binary"
+                if confidence >= threshold:
+                    break
+            else:
+                enc, confidence = "ascii", scores.bytes_read / size
+    return {"encoding": enc, "confidence": confidence, "bytes_read": scores.bytes_read, "samples": samples}
+
+
+def iter_files(paths):
+    """файлы из списка путей; каталоги обходятся вглубь, скрытые файлы и каталоги пропускаются."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                if not name.startswith("."):
+                    yield os.path.join(root, name)
+
+
+def detect_many(paths, workers=4, threshold=CONFIDENCE):
+    """(путь, результат detect) для всех файлов paths по порядку.
+
+    Ошибка чтения отдельного файла не прерывает обход: результат — {"error": текст}.
+    """
+    def one(path):
+        try:
+            return path, detect(path, threshold)
+        except OSError as e:
+            return path, {"error": str(e)}
+
+    if workers <= 1:
+        yield from map(one, iter_files(paths))
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(one, iter_files(paths))
+
+
 def analyze_encoding(filename):
     """Анализ частот байтов и определение кодировки."""
     with open(filename, "rb") as f:
@@ -73,11 +384,36 @@ def analyze_encoding(filename):
 
     encoding_guess = guess_encoding(counts)
     print(f"\n➡ Предполагаемая кодировка: {encoding_guess}")
+    fast = detect(filename)
+    print(f"➡ По выборкам ({fast['bytes_read']} байт): {ENCODING_NAMES[fast['encoding']]}, "
+          f"уверенность {fast['confidence']:.4f}")
     print("-" * 60)
 
 
+def print_detections(paths, workers=4, threshold=CONFIDENCE):
+    """строка на файл: путь, кодировка, уверенность, прочитано байт."""
+    for path, r in detect_many(paths, workers, threshold):
+        if "error" in r:
+            print(f"{path}\terror: {r['error']}")
+        else:
+            print(f"{path}\t{r['encoding']}\t{r['confidence']:.4f}\t{r['bytes_read']}")
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Использование: python lab2_3.py <имя_файла>")
+        print("Использование: python lab2_3.py <имя_файла>\n"
+              "               python lab2_3.py --fast <файл|каталог>... [--workers=N] [--threshold=P]")
+    elif sys.argv[1] == "--fast":
+        paths = []
+        workers = 4
+        threshold = CONFIDENCE
+        for arg in sys.argv[2:]:
+            if arg.startswith("--workers="):
+                workers = int(arg.split("=", 1)[1])
+            elif arg.startswith("--threshold="):
+                threshold = float(arg.split("=", 1)[1])
+            else:
+                paths.append(arg)
+        print_detections(paths, workers, threshold)
     else:
         analyze_encoding(sys.argv[1])
@@ -1,23 +1,31 @@
+import importlib.util
+import os
 import sys
-import math
-from collections import Counter, defaultdict
 
-def analyze_markov_file(filename):
-    with open(filename, "rb") as f:
-        data = f.read()
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+histogram = load_module("histogram", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lab4", "histogram.py"))
+statcache = load_module("otik_statcache", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lab4", "statcache.py"))
 
-    n = len(data)
-    if n < 2:
+def analyze_markov_file(filename):
+    entry = statcache.entry(filename)
+    if entry.size < 2:
         print("Файл слишком короткий для анализа (нужно ≥2 байта).")
         return
 
-    # пар символов (a_j a_k) 
-    pair_counts = Counter((data[i], data[i + 1]) for i in range(n - 1))
+    # пар символов (a_j a_k): плотная таблица, индекс a_j · 256 + a_k
+    # (из постоянного кэша, если файл не менялся)
+    dense = entry.pair_counts()
+    n = sum(dense) + 1
+    pair_counts = {divmod(v, 256): c for v, c in enumerate(dense) if c}
 
     # count(a_j *) 
-    first_counts = defaultdict(int)
-    for (a, b), cnt in pair_counts.items():
-        first_counts[a] += cnt
+    first_counts = [sum(dense[a * 256:(a + 1) * 256]) for a in range(256)]
 
     # условные вероятности p(a_k | a_j) 
     conditional_probs = {
@@ -26,10 +34,7 @@ def analyze_markov_file(filename):
     }
 
     # количество информации (в битах) 
-    I_bits = sum(
-        pair_counts[(a, b)] * (-math.log2(conditional_probs[(a, b)]))
-        for (a, b) in pair_counts
-    )
+    I_bits = histogram.cond_entropy_bits(dense)
 
     I_bytes = I_bits / 8
 
@@ -37,7 +42,8 @@ def analyze_markov_file(filename):
     print(f"Файл: {filename}")
     print(f"Количество байт в файле: n = {n}")
     print(f"Количество различных пар: {len(pair_counts)}")
-    print(f"Количество различных символов: {len(set(data))}")
+    # каждый байт входит хотя бы в одну пару
+    print(f"Количество различных символов: {len({a for a, b in pair_counts} | {b for a, b in pair_counts})}")
     print("-" * 60)
     print(f"Суммарное количество информации I_CM1(Q) = {I_bits:.2f} бит ({I_bytes:.2f} байт)")
 
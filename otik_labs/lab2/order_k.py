@@ -0,0 +1,401 @@
+"""
+Оценка I_CMk(Q) для контекстов порядка k = 0..8 за один проход
+
+lab2_4 / lab2_5 останавливаются на порядке 1. Здесь считается
+I_CMk(Q) = Σ count(c a) · log2(count(c *) / count(c a)), где c — k предыдущих
+байт, сразу для нескольких k — чтобы до написания кодека знать, сколько даст
+модель высокого порядка. Как и в lab2_4, первые k байт файла не кодируются.
+
+Сумма раскладывается через S_L = Σ count(g) · log2 count(g) по всем L-граммам g:
+I_CMk = S'_k − S_{k+1}, где S'_k — та же сумма по k-граммам без последней
+k-граммы файла (за ней нет байта). Поэтому хватает по одной таблице частот на
+длину L = k..k+1: таблица длины L служит порядку L − 1 (пары контекст + байт) и
+порядку L (контексты).
+
+Длины 1 и 2 считаются точно, плотными таблицами из lab4/histogram.py. Длины от
+3 — в хэш-таблицах фиксированного размера (--memory делится поровну между ними):
+грамма длины до 9 байт — точное число до 72 бит, индекс — универсальный хэш от
+него (у каждой строки свои коэффициенты), в ячейке — сумма частот всех грамм,
+попавших в неё. S_L накапливается по ходу: при добавлении c к ячейке со значением
+e сумма растёт на f(e + c) − f(e), f(x) = x · log2 x. С --sketch=D таблица —
+count-min sketch: D строк с независимыми хэшами, частота — минимум по строкам,
+обновление консервативное (строки поднимаются только до нового минимума);
+коллизии искажают оценку меньше ценой D-кратной памяти.
+
+Файл читается кусками (--chunk). Кусок один раз превращается в массивы uint64:
+8 байт, начиная с каждой позиции (array с 8 смещений, как пары в histogram.py);
+граммы длины L ≤ 8 — это старшие L байт слова, длины 9 — слово и следующий байт,
+и Counter считает по числам только самую длинную длину, короткие получаются
+свёрткой по префиксу — по различным граммам, а не по байтам. Частоты куска
+вливаются в таблицы, хвост предыдущего куска (8 байт) переносится, чтобы граммы
+на границе не терялись. Память: таблицы + Counter одного куска, от длины файла
+не зависит.
+
+Для каждого порядка выводятся I_CMk, E = ceil(I / 8), число различных контекстов
+и (k+1)-грамм (для хэш-таблиц — оценка линейным подсчётом по занятым ячейкам) и
+память точной модели: (k+1)-граммы × (k + 1 байт ключа + 4 байта счётчика).
+Заполнение таблицы выше ~50% — оценка смещена вниз: увеличьте --memory.
+"""
+import importlib.util
+import math
+import os
+import sys
+from array import array
+from collections import Counter
+from itertools import repeat
+from operator import lshift, or_, rshift
+
+MAX_ORDER = 8
+CHUNK = 1024 * 1024         # байт за одно чтение
+MEMORY = 64 * 1024 * 1024   # бюджет хэш-таблиц по умолчанию, байт
+MIN_SLOTS = 1 << 10
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+histogram = load_module("histogram", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lab4", "histogram.py"))
+
+# универсальное хэширование: ((h · A + B) mod P) mod 2^bits, P = 2^61 − 1
+_P = (1 << 61) - 1
+_HASH_A = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+           0xA0761D6478BD642F, 0xE7037ED1A0B428DB, 0x8EBC6AF09C88C6E3, 0x589965CC75374CC3)
+_HASH_B = (0x1D8E4E27C47D124F, 0x2545F4914F6CDD1D, 0x5851F42D4C957F2D, 0x14057B7EF767814F,
+           0x3C6EF372FE94F82B, 0x510E527FADE682D1, 0x1F83D9ABFB41BD6B, 0x5BE0CD19137E2179)
+# коэффициенты старших бит ключа (ключ длиннее 61 бита): свои для каждой строки
+_HASH_C = (0x2127599BF4325C37, 0x880355F21E6D1965, 0x1B873593CC9E2D51, 0x3C6EF372FE94F82A,
+           0x0A4093822299F31D, 0x6C62272E07BB0142, 0x1F0A7D5D3F8C1B2E, 0x4CF5AD432745937F)
+MAX_SKETCH = len(_HASH_A)
+
+
+def clogc(c):
+    return c * math.log2(c) if c > 1 else 0.0
+
+
+class DenseCounts:
+    """точные частоты грамм длины 1 или 2 (плотная таблица)."""
+
+    def __init__(self, length):
+        self.length = length
+        self.counts = [0] * (256 ** length)
+
+    def feed(self, buf, first):
+        """граммы buf, начинающиеся с позиции first."""
+        part = buf[first:]
+        if self.length == 1:
+            histogram.add_counts(self.counts, histogram.byte_counts(part))
+        else:
+            histogram.add_counts(self.counts, histogram.pair_counts(part))
+
+    def estimate(self, key):
+        return self.counts[int.from_bytes(key, 'big')]
+
+    def sum_clogc(self):
+        return sum(clogc(c) for c in self.counts if c)
+
+    def distinct(self):
+        """(число различных грамм, таблица переполнена)."""
+        return sum(1 for c in self.counts if c), False
+
+    def load(self):
+        return None
+
+    @property
+    def nbytes(self):
+        return 0
+
+
+class HashedCounts:
+    """частоты грамм длины length в хэш-таблице из depth строк по slots ячеек.
+
+    depth = 1 — обычная хэш-таблица счётчиков, depth > 1 — count-min sketch
+    с консервативным обновлением. S_L = Σ f(count) накапливается в self.s.
+    """
+
+    def __init__(self, length, slots, depth=1):
+        self.length = length
+        self.mask = slots - 1
+        self.rows = [array("Q", [0]) * slots for _ in range(depth)]
+        self.s = 0.0
+
+    def _slots(self, key):
+        """ячейки ключа (int) во всех строках."""
+        hi, lo = key >> 61, key & _P
+        mask = self.mask
+        return [(((hi * c + lo) * a + b) % _P) & mask
+                for a, b, c, _ in zip(_HASH_A, _HASH_B, _HASH_C, self.rows)]
+
+    def feed(self, grams):
+        """влить частоты грамм куска: {ключ (int): частота}."""
+        rows = self.rows
+        s = 0.0
+        if len(rows) == 1:
+            row = rows[0]
+            a, b, c0, mask = _HASH_A[0], _HASH_B[0], _HASH_C[0], self.mask
+            log2 = math.log2
+            # ключи до 7 байт меньше P: старших бит нет
+            short = self.length <= 7
+            for key, c in grams.items():
+                if short:
+                    i = ((key * a + b) % _P) & mask
+                else:
+                    i = ((((key >> 61) * c0 + (key & _P)) * a + b) % _P) & mask
+                e = row[i]
+                new = e + c
+                row[i] = new
+                s += new * log2(new) - (e * log2(e) if e else 0.0)
+        else:
+            for key, c in grams.items():
+                idx = self._slots(key)
+                e = min(row[i] for row, i in zip(rows, idx))
+                new = e + c
+                for row, i in zip(rows, idx):
+                    if row[i] < new:
+                        row[i] = new
+                s += clogc(new) - clogc(e)
+        self.s += s
+
+    def estimate(self, key):
+        key = int.from_bytes(key, 'big')
+        return min(row[i] for row, i in zip(self.rows, self._slots(key)))
+
+    def sum_clogc(self):
+        return self.s
+
+    def load(self):
+        """доля занятых ячеек первой строки."""
+        row = self.rows[0]
+        return (len(row) - row.count(0)) / len(row)
+
+    def distinct(self):
+        """(оценка числа различных грамм линейным подсчётом, таблица переполнена)."""
+        m = len(self.rows[0])
+        free = self.rows[0].count(0)
+        if free == 0:
+            return m, True
+        return round(-m * math.log(free / m)), False
+
+    @property
+    def nbytes(self):
+        return sum(row.itemsize * len(row) for row in self.rows)
+
+
+def _words(buf, start, end):
+    """uint64 (старший байт первый) для всех позиций start..end - 1; порядок — по смещениям."""
+    words = array("Q")
+    for off in range(8):
+        pos = start + off
+        count = (end - pos + 7) // 8
+        if count > 0:
+            words.frombytes(buf[pos:pos + 8 * count])
+    if sys.byteorder == "little":
+        words.byteswap()
+    return words
+
+
+def _count_longest(buf, start, length):
+    """частоты грамм длины length (3..9), начинающихся с позиций start.. в buf."""
+    n = len(buf)
+    counts = Counter()
+    end = n - max(length, 8) + 1  # позиции start..end - 1 — по словам uint64
+    if end > start:
+        if length == 9:
+            # слово и следующий байт: (слово << 8) | байт по смещениям
+            for off in range(8):
+                pos = start + off
+                count = (end - pos + 7) // 8
+                if count > 0:
+                    part = array("Q")
+                    part.frombytes(buf[pos:pos + 8 * count])
+                    if sys.byteorder == "little":
+                        part.byteswap()
+                    counts.update(map(or_, map(lshift, part, repeat(8)), buf[pos + 8:pos + 8 * count + 8:8]))
+        else:
+            words = _words(buf, start, end)
+            counts.update(words if length == 8 else map(rshift, words, repeat(64 - 8 * length)))
+    for i in range(max(start, end), n - length + 1):
+        counts[int.from_bytes(buf[i:i + length], 'big')] += 1
+    return counts
+
+
+def count_grams(buf, starts, lengths):
+    """частоты грамм длин lengths (3..9) в buf: {L: {ключ (int): частота}}.
+
+    starts[L] — первая позиция граммы длины L (starts[L] ≥ starts[L + 1]).
+    По позициям считается только самая длинная длина; более короткие
+    получаются из неё свёрткой по префиксу (ключ >> 8) — работа по числу
+    различных грамм, а не по байтам. Поправки: префикс на позиции, которая
+    для длины L ещё не нужна, и последняя L-грамма, за которой нет байта.
+    """
+    if not lengths:
+        return {}
+    n = len(buf)
+    top = max(lengths)
+    if n - top < 16:
+        # короткий кусок: срезами
+        return {L: Counter(int.from_bytes(buf[i:i + L], 'big') for i in range(starts[L], n - L + 1))
+                for L in lengths}
+    counts = {top: _count_longest(buf, starts[top], top)}
+    longer = counts[top]
+    for L in range(top - 1, min(lengths) - 1, -1):
+        short = {}
+        get = short.get
+        for key, c in longer.items():
+            key >>= 8
+            short[key] = get(key, 0) + c
+        for i in range(starts[L + 1], starts[L]):
+            key = int.from_bytes(buf[i:i + L], 'big')
+            if short[key] == 1:
+                del short[key]
+            else:
+                short[key] -= 1
+        key = int.from_bytes(buf[n - L:], 'big')
+        short[key] = get(key, 0) + 1
+        counts[L] = longer = short
+    return {L: counts[L] for L in lengths}
+
+
+def make_tables(orders, memory=MEMORY, depth=1):
+    """таблицы частот для длин, нужных порядкам orders: {длина: таблица}."""
+    lengths = sorted({L for k in orders for L in (k, k + 1) if L > 0})
+    hashed = [L for L in lengths if L > 2]
+    slots = MIN_SLOTS
+    if hashed:
+        per_table = memory // (len(hashed) * depth * 8)
+        while slots * 2 <= per_table:
+            slots *= 2
+    return {L: DenseCounts(L) if L <= 2 else HashedCounts(L, slots, depth) for L in lengths}
+
+
+def estimate(filename, orders=range(MAX_ORDER + 1), memory=MEMORY, depth=1, chunk=CHUNK):
+    """один проход по файлу; возвращает (n, {k: сводка порядка k}, таблицы)."""
+    orders = sorted(set(orders))
+    if not orders or orders[0] < 0 or orders[-1] > MAX_ORDER:
+        raise ValueError(f"orders must be within 0..{MAX_ORDER}")
+    if not 1 <= depth <= MAX_SKETCH:
+        raise ValueError(f"sketch depth must be within 1..{MAX_SKETCH}")
+    tables = make_tables(orders, memory, depth)
+    keep = max(tables, default=1) - 1
+    n = 0
+    tail = b""
+    with open(filename, "rb") as f:
+        while True:
+            data = f.read(chunk)
+            if not data:
+                break
+            n += len(data)
+            buf = tail + data
+            # граммы, заканчивающиеся в новом куске
+            starts = {L: max(0, len(tail) - L + 1) for L in tables}
+            hashed = [L for L, table in tables.items() if isinstance(table, HashedCounts)]
+            grams = count_grams(buf, starts, hashed)
+            for L, table in tables.items():
+                if L in grams:
+                    table.feed(grams.pop(L))
+                else:
+                    table.feed(buf, starts[L])
+            tail = buf[-keep:] if keep else b""
+
+    results = {}
+    for k in orders:
+        if n <= k:
+            continue
+        if k == 0:
+            s_ctx = clogc(n)
+            contexts = (1, False)
+        else:
+            ctx = tables[k]
+            # последняя k-грамма файла — не контекст: за ней нет байта
+            e = ctx.estimate(tail[-k:])
+            s_ctx = ctx.sum_clogc() - clogc(e) + clogc(e - 1)
+            contexts = ctx.distinct()
+        grams = tables[k + 1]
+        bits = max(0.0, s_ctx - grams.sum_clogc())
+        distinct, saturated = grams.distinct()
+        results[k] = {
+            "bits": bits,
+            "E": math.ceil(bits / 8),
+            "symbols": n - k,
+            "contexts": contexts,
+            "grams": distinct,
+            "saturated": saturated,
+            "model_bytes": distinct * (k + 1 + 4),
+            "load": grams.load(),
+        }
+    return n, results, tables
+
+
+def _fmt_size(nbytes):
+    for unit in ("Б", "КБ", "МБ", "ГБ"):
+        if nbytes < 1024 or unit == "ГБ":
+            return f"{nbytes:.0f} {unit}" if unit == "Б" else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+
+
+def print_report(filename, n, results, tables):
+    print(f"\nОценка I_CMk(Q) для контекстов порядка k: {filename}")
+    print(f"Длина файла: n = {n} байт")
+    if not results:
+        print("Файл слишком короткий для выбранных порядков.")
+        return
+    print(f"{'k':>2} {'I_CMk, бит':>16} {'E, байт':>12} {'бит/байт':>9} "
+          f"{'контекстов':>11} {'(k+1)-грамм':>12} {'модель':>10} {'заполн.':>8}")
+    print("-" * 88)
+    for k, r in results.items():
+        contexts, ctx_saturated = r["contexts"]
+        ctx_str = ("≥" if ctx_saturated else "") + f"{contexts}"
+        grams = ("≥" if r["saturated"] else "") + f"{r['grams']}"
+        load = "точно" if r["load"] is None else f"{100 * r['load']:.0f}%"
+        print(f"{k:>2} {r['bits']:16.2f} {r['E']:12} {r['bits'] / r['symbols']:9.4f} "
+              f"{ctx_str:>11} {grams:>12} {_fmt_size(r['model_bytes']):>10} {load:>8}")
+    hashed = [t for t in tables.values() if isinstance(t, HashedCounts)]
+    if hashed:
+        depth = len(hashed[0].rows)
+        kind = "хэш-таблицы" if depth == 1 else f"count-min sketch, строк: {depth}"
+        print(f"\nПамять оценщика ({kind}): {_fmt_size(sum(t.nbytes for t in hashed))}"
+              f", таблиц: {len(hashed)}")
+        if any(t.load() > 0.5 for t in hashed):
+            print("Заполнение выше 50%: оценки высоких порядков занижены, увеличьте --memory.")
+    print("-" * 88)
+
+
+def parse_orders(spec):
+    """'2-8' или '0,1,4' -> список порядков."""
+    orders = []
+    for part in spec.split(","):
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            orders.extend(range(int(lo), int(hi) + 1))
+        else:
+            orders.append(int(part))
+    return orders
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Использование: python order_k.py <имя_файла> [--orders=0-8] [--memory=МБ] "
+              "[--sketch=D] [--chunk=БАЙТ]")
+    else:
+        orders = range(MAX_ORDER + 1)
+        memory = MEMORY
+        depth = 1
+        chunk = CHUNK
+        try:
+            for arg in sys.argv[2:]:
+                if arg.startswith("--orders="):
+                    orders = parse_orders(arg.split("=", 1)[1])
+                elif arg.startswith("--memory="):
+                    memory = int(float(arg.split("=", 1)[1]) * 1024 * 1024)
+                elif arg.startswith("--sketch="):
+                    depth = int(arg.split("=", 1)[1])
+                elif arg.startswith("--chunk="):
+                    chunk = int(arg.split("=", 1)[1])
+                else:
+                    raise ValueError(f"unknown option: {arg}")
+            print_report(sys.argv[1], *estimate(sys.argv[1], orders, memory, depth, chunk))
+        except (OSError, ValueError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            sys.exit(2)
@@ -104,15 +104,17 @@ def decode(archive_path: str, output_path: str, *, chunk: int = 1024 * 1024) ->
         (n,) = read_header(in_f)
 
         # быстрая проверка целостности архива: общий размер должен быть 16 + n.
+        # fstat может не сработать только для необычных потоков — тогда проверку
+        # пропускаем, но само несовпадение размеров не глотаем.
         try:
             total_size = os.fstat(in_f.fileno()).st_size
-            expected = HEADER_SIZE + n
-            if total_size != expected:
-                raise ValueError(
-                    f"archive size mismatch: got {total_size}, expected {expected}"
-                )
-        except Exception:
-            pass
+        except OSError:
+            total_size = None
+        expected = HEADER_SIZE + n
+        if total_size is not None and total_size != expected:
+            raise ValueError(
+                f"archive size mismatch: got {total_size}, expected {expected}"
+            )
 
         remaining = n
         with open(output_path, "wb") as out_f:
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Чтение архивов OTIK без распаковки на диск.
+
+- OtikArchive    — архив Л3.№2 (SOBSTV02, каталог с иерархией);
+- OtikRawArchive — одиночный файл в формате Л3.№1 / Л4 (SOBSTV, любой алгоритм lab4/n3.py).
+
+Файл архива отображается в память (mmap), TOC разбирается при первом обращении.
+Несжатые записи отдаются как memoryview-срезы отображения — без копирования;
+сжатые декодируются по требованию, результат держится в LRU-кэше.
+
+Пока жив хоть один выданный memoryview (или файловый объект open()),
+close() не может снять отображение — освобождайте их раньше (view.release()).
+
+Пример:
+    with OtikArchive("project.otik") as arc:
+        for name in arc.names():
+            print(name, arc.getinfo(name)['original_size'])
+        data = arc.read("docs/b.txt")
+        with arc.open("big.bin") as f:
+            f.seek(1024)
+            chunk = f.read(4096)
+"""
+from __future__ import annotations
+
+import io
+import mmap
+import os
+import struct
+import threading
+import importlib.util
+import zlib
+from collections import OrderedDict
+from typing import List, Optional
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+n2 = load_module("otik_n2", os.path.join(base_dir, "n2.py"))
+lab3_n1 = load_module("lab3_n1", os.path.join(base_dir, "..", "n1.py"))
+# реестр декодеров Л4 (DECODERS): одиночные архивы декодируются так же, как в n3.py
+lab4_n3 = load_module("otik_lab4_n3", os.path.join(base_dir, "..", "..", "lab4", "n3.py"))
+
+CACHE_BYTES = 64 << 20  # предел LRU-кэша декодированных данных по умолчанию
+
+
+class _ViewReader(io.RawIOBase):
+    """файловый объект над memoryview: seek/tell/readinto без копирования буфера."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError("negative seek position")
+        self._pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+class _DecodedCache:
+    """LRU-кэш декодированных данных, ограниченный суммарным размером.
+
+    Потокобезопасен: view() сжатых записей можно вызывать из пула потоков.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[object, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                self._size -= len(old)
+
+
+class OtikArchive:
+    """архив Л3.№2 с произвольным доступом к записям.
+
+    names()            — пути записей (каталоги — с хвостовым '/');
+    getinfo(path)      — словарь записи TOC (как в n2._read_toc);
+    view(path)         — memoryview данных (для несжатых — срез mmap, без копии);
+    read(path)         — bytes данных;
+    open(path)         — seekable файловый объект только для чтения.
+
+    verify=True: при первом обращении к записи сверяются её CRC32 (если есть);
+    испорченные полосы записей с protection = 2 исправляются кодом Рида — Соломона.
+    """
+
+    def __init__(self, path: str, *, cache_bytes: int = CACHE_BYTES, verify: bool = False):
+        self.path = path
+        self.verify = verify
+        self._f = open(path, 'rb')
+        self._mm = None
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._hdr = n2._read_header(self._mm)
+        except BaseException:
+            self.close()
+            raise
+        self._entries: Optional[List[dict]] = None
+        self._index: Optional[dict] = None
+        # TOC читается через позицию mmap — разбор один на все потоки (serve.py)
+        self._toc_lock = threading.Lock()
+        self._verified = set()
+        # исправленные кодом Рида — Соломона копии записей (path -> bytes): mmap не меняется
+        self._repaired = {}
+        self._cache = _DecodedCache(cache_bytes)
+
+    # --- TOC ---
+
+    @property
+    def header(self) -> dict:
+        return self._hdr
+
+    @property
+    def entries(self) -> List[dict]:
+        """записи TOC (разбираются при первом обращении)."""
+        if self._entries is None:
+            with self._toc_lock:
+                if self._entries is None:
+                    self._entries = n2._read_toc(self._mm, self._hdr)
+        return self._entries
+
+    def _lookup(self, path: str) -> dict:
+        if self._index is None:
+            entries = self.entries
+            with self._toc_lock:
+                if self._index is None:
+                    self._index = {e['path']: e for e in entries}
+        try:
+            return self._index[path]
+        except KeyError:
+            raise KeyError(f"no such entry: {path}") from None
+
+    def names(self) -> List[str]:
+        return [e['path'] for e in self.entries]
+
+    def getinfo(self, path: str) -> dict:
+        return self._lookup(path)
+
+    # --- данные ---
+
+    def _stored_view(self, e: dict) -> memoryview:
+        start = e['data_offset']
+        end = start + e['stored_size']
+        if e['stored_size'] and end > len(self._mm):
+            raise ValueError(f"data beyond end of archive: {e['path']}")
+        view = memoryview(self._mm)[start:end]
+        if self.verify and e['path'] in self._verified:
+            # копия кладётся до отметки о проверке, поэтому здесь она уже видна
+            repaired = self._repaired.get(e['path'])
+            if repaired is not None:
+                view.release()
+                return memoryview(repaired)
+        elif self.verify:
+            crcs = n2._entry_crcs(e)
+            if crcs is not None:
+                block_size, _, blocks = crcs
+                for i, expected in enumerate(blocks):
+                    if zlib.crc32(view[i * block_size:(i + 1) * block_size]) != expected:
+                        view.release()
+                        if e['protection'] == n2.PROT_RS:
+                            # испорченные полосы исправляются в копии один раз
+                            data = n2.read_stored(self._f.fileno(), e)
+                            self._repaired[e['path']] = data
+                            self._verified.add(e['path'])
+                            return memoryview(data)
+                        raise ValueError(f"checksum mismatch: {e['path']} (block {i})")
+            self._verified.add(e['path'])
+        return view
+
+    def view(self, path: str) -> memoryview:
+        e = self._lookup(path)
+        if e['is_dir']:
+            raise IsADirectoryError(path)
+        if not n2.is_coded(e):
+            return self._stored_view(e)
+        data = self._cache.get(path)
+        if data is None:
+            stored = self._stored_view(e)
+            try:
+                data = n2.decode_data(e, bytes(stored))
+            finally:
+                stored.release()
+            self._cache.put(path, data)
+        return memoryview(data)
+
+    def read(self, path: str) -> bytes:
+        with self.view(path) as v:
+            return bytes(v)
+
+    def open(self, path: str) -> io.BufferedReader:
+        return io.BufferedReader(_ViewReader(self.view(path)))
+
+    # --- жизненный цикл ---
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+    def __enter__(self) -> "OtikArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class OtikRawArchive:
+    """одиночный файл SOBSTV (Л3.№1, алгоритм 0; Л4 — алгоритмы из lab4/n3.py).
+
+    Алгоритм определяется так же, как в lab4/n3.py: если размер файла равен
+    16 + n из заголовка Л3.№1 — это «сырой» контейнер, иначе байт 8 — код алгоритма.
+    Декодер берётся из реестра n3.DECODERS.
+    """
+
+    def __init__(self, path: str, *, cache_bytes: int = CACHE_BYTES):
+        self.path = path
+        self._f = open(path, 'rb')
+        self._mm = None
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._parse_header()
+        except BaseException:
+            self.close()
+            raise
+        self._cache = _DecodedCache(cache_bytes)
+
+    def _parse_header(self) -> None:
+        header = self._mm[:lab3_n1.HEADER_SIZE]
+        if len(header) != lab3_n1.HEADER_SIZE:
+            raise ValueError("archive too short: no full header")
+        sig, ver, n_raw = struct.unpack(lab3_n1.HEADER_FMT, header)
+        if sig != lab3_n1.SIGNATURE:
+            raise ValueError("bad signature")
+        if ver != lab3_n1.VERSION:
+            raise ValueError(f"unsupported version: {ver}")
+        if len(self._mm) == lab3_n1.HEADER_SIZE + n_raw:
+            self.algorithm = 0
+            self.n = n_raw
+        else:
+            self.algorithm = header[8]
+            self.n = struct.unpack("<Q", header[9:16] + b'\x00')[0]
+
+    def view(self) -> memoryview:
+        """данные исходного файла (для алгоритма 0 — срез mmap, без копии)."""
+        payload = memoryview(self._mm)[lab3_n1.HEADER_SIZE:]
+        if self.algorithm == 0:
+            return payload
+        data = self._cache.get(None)
+        if data is None:
+            try:
+                data = lab4_n3.decode_payload(self.algorithm, bytes(payload), self.n)
+            finally:
+                payload.release()
+            self._cache.put(None, data)
+        else:
+            payload.release()
+        return memoryview(data)
+
+    def read(self) -> bytes:
+        with self.view() as v:
+            return bytes(v)
+
+    def open(self) -> io.BufferedReader:
+        return io.BufferedReader(_ViewReader(self.view()))
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+    def __enter__(self) -> "OtikRawArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
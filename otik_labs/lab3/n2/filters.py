@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Предварительные фильтры данных записи (extra-тег 2 архива Л3.№2).
+
+Энтропийный кодер порядка 0 почти не сжимает числовые дампы, растры и логи
+датчиков: у соседних значений близкие, но разные байты. Фильтр обратимо
+переставляет или вычитает байты до сжатия:
+
+  1 DELTA8  (шаг s байт)    — y[i] = x[i] - x[i - s] mod 256
+  2 DELTA16 (шаг s слов)    — то же для 16-битных слов little-endian (нечётный
+                               последний байт остаётся как есть)
+  3 RLE                     — PackBits: h < 128 — h + 1 литералов, h > 128 —
+                               байт повторяется 257 - h раз
+  4 PLANES  (ширина w байт) — в каждом блоке по PLANE_BLOCK элементов сначала
+                               все 0-е байты элементов, потом все 1-е и т. д.
+
+Цепочка фильтров применяется слева направо, снимается справа налево.
+Фильтры потоковые (feed/flush, как StreamDecoder в Л4) и обрабатывают кусок
+целиком операциями над bytes/int без цикла по байтам там, где это возможно:
+разность DELTA — вычитание всех элементов куска сразу в одном большом целом
+(SWAR: старший бит каждого элемента считается отдельно, заёмы не переходят
+между элементами), обратная — накопленная сумма (itertools.accumulate) по
+каждой фазе шага.
+
+choose() выбирает цепочку по выборке: каждый кандидат применяется к нескольким
+кускам записи, побеждает наименьшая стоимость (по умолчанию — энтропия порядка 0).
+
+Формат extra-записи (тег 2):
+  Q filtered_size (длина данных после фильтров — её получает кодек)
+  B count; затем count пар (B id фильтра, B параметр)
+"""
+from __future__ import annotations
+
+import importlib.util
+import os
+import re
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from typing import List, Sequence, Tuple
+
+# общее ядро гистограмм (lab4/histogram.py), один экземпляр на процесс
+histogram = sys.modules.get("otik_histogram")
+if histogram is None:
+    _histogram_spec = importlib.util.spec_from_file_location(
+        "otik_histogram", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "lab4", "histogram.py"))
+    histogram = importlib.util.module_from_spec(_histogram_spec)
+    sys.modules[_histogram_spec.name] = histogram
+    _histogram_spec.loader.exec_module(histogram)
+
+FILTER_DELTA8 = 1
+FILTER_DELTA16 = 2
+FILTER_RLE = 3
+FILTER_PLANES = 4
+
+NAMES = {FILTER_DELTA8: 'delta8', FILTER_DELTA16: 'delta16', FILTER_RLE: 'rle', FILTER_PLANES: 'planes'}
+
+RECORD_FMT = "<QB"
+RECORD_SIZE = struct.calcsize(RECORD_FMT)
+
+CHUNK = 1024 * 1024
+PLANE_BLOCK = 16 * 1024        # элементов в блоке PLANES
+SAMPLE_PIECES = 4              # сколько кусков записи пробует choose()
+SAMPLE_PIECE = 16 * 1024       # размер куска выборки
+
+# кандидаты для choose(): пустая цепочка — «без фильтра»
+CANDIDATES: Tuple[Tuple[Tuple[int, int], ...], ...] = (
+    (),
+    ((FILTER_DELTA8, 1),),
+    ((FILTER_DELTA8, 2),),
+    ((FILTER_DELTA8, 3),),
+    ((FILTER_DELTA8, 4),),
+    ((FILTER_DELTA16, 1),),
+    ((FILTER_DELTA16, 2),),
+    ((FILTER_RLE, 0),),
+    ((FILTER_PLANES, 2),),
+    ((FILTER_PLANES, 4),),
+    ((FILTER_DELTA16, 1), (FILTER_PLANES, 2)),
+    ((FILTER_DELTA8, 1), (FILTER_RLE, 0)),
+)
+
+Chain = Sequence[Tuple[int, int]]
+
+
+# --- DELTA ---
+
+def _lane_sub(a: bytes, b: bytes, lane: int) -> bytes:
+    """поэлементная разность a - b по модулю 2^(8*lane); элементы big-endian."""
+    size = len(a)
+    if not size:
+        return b""
+    top = int.from_bytes((b"\x80" + bytes(lane - 1)) * (size // lane), "big")
+    x = int.from_bytes(a, "big")
+    y = int.from_bytes(b, "big")
+    z = ((x | top) - (y & ~top)) ^ ((x ^ ~y) & top)
+    return (z & ((1 << (8 * size)) - 1)).to_bytes(size, "big")
+
+
+def _swap16(buf: bytes) -> bytes:
+    """поменять байты в каждом 16-битном слове (длина чётная)."""
+    out = bytearray(len(buf))
+    out[0::2] = buf[1::2]
+    out[1::2] = buf[0::2]
+    return bytes(out)
+
+
+class _DeltaEncoder:
+    def __init__(self, lane: int, stride: int):
+        if not 1 <= stride <= 255:
+            raise ValueError(f"bad delta stride: {stride}")
+        self.lane = lane
+        self.dist = lane * stride
+        self.hist = b""   # последние dist байт входа (элементы big-endian)
+        self.rest = b""   # неполный элемент в конце куска
+
+    def feed(self, buf) -> bytes:
+        buf = self.rest + bytes(buf)
+        k = len(buf) - len(buf) % self.lane
+        self.rest = buf[k:]
+        buf = buf[:k]
+        if self.lane == 2:
+            buf = _swap16(buf)
+        full = self.hist + buf
+        h = len(self.hist)
+        d = self.dist
+        # первые dist байт потока — как есть
+        raw_end = min(max(d, h), len(full))
+        out = full[h:raw_end] + _lane_sub(full[raw_end:], full[raw_end - d:len(full) - d], self.lane)
+        self.hist = full[-d:]
+        return _swap16(out) if self.lane == 2 else out
+
+    def flush(self) -> bytes:
+        rest, self.rest = self.rest, b""
+        return rest
+
+
+class _DeltaDecoder:
+    def __init__(self, lane: int, stride: int):
+        if not 1 <= stride <= 255:
+            raise ValueError(f"bad delta stride: {stride}")
+        self.lane = lane
+        self.stride = stride
+        self.mask = (1 << (8 * lane)) - 1
+        self.hist: List[int] = []   # последние stride восстановленных элементов
+        self.rest = b""
+
+    def feed(self, buf) -> bytes:
+        buf = self.rest + bytes(buf)
+        k = len(buf) - len(buf) % self.lane
+        self.rest = buf[k:]
+        if self.lane == 1:
+            vals = buf[:k]
+            out = bytearray(k)
+        else:
+            vals = array('H', buf[:k])
+            if sys.byteorder == 'big':
+                vals.byteswap()
+            out = array('H', bytes(k))
+        count = len(vals)
+        s = self.stride
+        hist = self.hist
+        mask = self.mask
+        for p in range(min(s, count)):
+            j = len(hist) - s + p  # предыдущий элемент той же фазы
+            if j >= 0:
+                sums = accumulate(vals[p::s], initial=hist[j])
+                next(sums)
+            else:
+                sums = accumulate(vals[p::s])
+            sums = map(mask.__and__, sums)
+            out[p::s] = bytes(sums) if self.lane == 1 else array('H', sums)
+        self.hist = (hist + list(out))[-s:] if count < s else list(out[-s:])
+        if self.lane == 2:
+            if sys.byteorder == 'big':
+                out.byteswap()
+            return out.tobytes()
+        return bytes(out)
+
+    def flush(self) -> bytes:
+        rest, self.rest = self.rest, b""
+        return rest
+
+
+# --- RLE (PackBits) ---
+
+_RUN = re.compile(rb"(.)\1{2,}", re.S)
+
+
+def _rle_literals(out: bytearray, seg: bytes) -> None:
+    for i in range(0, len(seg), 128):
+        part = seg[i:i + 128]
+        out.append(len(part) - 1)
+        out += part
+
+
+def _rle_segment(out: bytearray, seg: bytes) -> None:
+    pos = 0
+    for m in _RUN.finditer(seg):
+        _rle_literals(out, seg[pos:m.start()])
+        b = seg[m.start()]
+        left = m.end() - m.start()
+        while left:
+            take = min(left, 128)
+            if take == 1:
+                out += bytes((0, b))
+            else:
+                out += bytes((257 - take, b))
+            left -= take
+        pos = m.end()
+    _rle_literals(out, seg[pos:])
+
+
+class _RleEncoder:
+    def __init__(self, param: int = 0):
+        self.pending = b""  # хвостовая серия куска — может продолжиться в следующем
+
+    def feed(self, buf) -> bytes:
+        data = self.pending + bytes(buf)
+        if not data:
+            return b""
+        cut = len(data.rstrip(data[-1:]))
+        if cut == 0 and len(data) < 128:
+            self.pending = data
+            return b""
+        if cut == 0:
+            cut = len(data) - len(data) % 128
+        self.pending = data[cut:]
+        out = bytearray()
+        _rle_segment(out, data[:cut])
+        return bytes(out)
+
+    def flush(self) -> bytes:
+        out = bytearray()
+        _rle_segment(out, self.pending)
+        self.pending = b""
+        return bytes(out)
+
+
+class _RleDecoder:
+    def __init__(self, param: int = 0):
+        self.tail = b""
+
+    def feed(self, buf) -> bytes:
+        data = self.tail + bytes(buf)
+        out = bytearray()
+        i = 0
+        size = len(data)
+        while i < size:
+            h = data[i]
+            if h < 128:
+                end = i + 2 + h
+                if end > size:
+                    break
+                out += data[i + 1:end]
+                i = end
+            elif h > 128:
+                if i + 2 > size:
+                    break
+                out += data[i + 1:i + 2] * (257 - h)
+                i += 2
+            else:
+                i += 1
+        self.tail = data[i:]
+        return bytes(out)
+
+    def flush(self) -> bytes:
+        if self.tail:
+            raise ValueError("truncated RLE data")
+        return b""
+
+
+# --- PLANES ---
+
+class _Planes:
+    def __init__(self, width: int, inverse: bool):
+        if not 2 <= width <= 16:
+            raise ValueError(f"bad plane width: {width}")
+        self.width = width
+        self.block = width * PLANE_BLOCK
+        self.inverse = inverse
+        self.buf = b""
+
+    def _convert(self, blk: bytes) -> bytes:
+        w = self.width
+        m = len(blk) // w
+        body = blk[:m * w]
+        if self.inverse:
+            out = bytearray(len(body))
+            for k in range(w):
+                out[k::w] = body[k * m:(k + 1) * m]
+        else:
+            out = bytearray().join(body[k::w] for k in range(w))
+        return bytes(out) + blk[m * w:]
+
+    def feed(self, buf) -> bytes:
+        data = self.buf + bytes(buf)
+        k = len(data) - len(data) % self.block
+        self.buf = data[k:]
+        return b"".join(self._convert(data[i:i + self.block]) for i in range(0, k, self.block))
+
+    def flush(self) -> bytes:
+        data, self.buf = self.buf, b""
+        return self._convert(data)
+
+
+def _make(fid: int, param: int, inverse: bool):
+    if fid == FILTER_DELTA8:
+        return (_DeltaDecoder if inverse else _DeltaEncoder)(1, param)
+    if fid == FILTER_DELTA16:
+        return (_DeltaDecoder if inverse else _DeltaEncoder)(2, param)
+    if fid == FILTER_RLE:
+        return (_RleDecoder if inverse else _RleEncoder)(param)
+    if fid == FILTER_PLANES:
+        return _Planes(param, inverse)
+    raise ValueError(f"unknown filter: {fid}")
+
+
+class ChainStream:
+    """потоковое применение (inverse=False) или снятие (inverse=True) цепочки фильтров."""
+
+    def __init__(self, chain: Chain, inverse: bool = False):
+        order = reversed(chain) if inverse else chain
+        self.stages = [_make(fid, param, inverse) for fid, param in order]
+
+    def feed(self, buf) -> bytes:
+        for st in self.stages:
+            buf = st.feed(buf)
+        return bytes(buf)
+
+    def flush(self) -> bytes:
+        out = b""
+        for st in self.stages:
+            out = st.feed(out) + st.flush()
+        return out
+
+
+def _run(stream: ChainStream, data) -> bytes:
+    view = memoryview(data)
+    parts = [stream.feed(view[i:i + CHUNK]) for i in range(0, len(view), CHUNK)]
+    parts.append(stream.flush())
+    return b"".join(parts)
+
+
+def apply(chain: Chain, data) -> bytes:
+    """применить цепочку фильтров к данным."""
+    return _run(ChainStream(chain), data) if chain else bytes(data)
+
+
+def revert(chain: Chain, data) -> bytes:
+    """снять цепочку фильтров."""
+    return _run(ChainStream(chain, inverse=True), data) if chain else bytes(data)
+
+
+# --- extra-запись ---
+
+def pack_record(chain: Chain, filtered_size: int) -> bytes:
+    body = struct.pack(RECORD_FMT, filtered_size, len(chain))
+    for fid, param in chain:
+        body += bytes((fid, param))
+    return body
+
+
+def unpack_record(raw: bytes) -> Tuple[Tuple[Tuple[int, int], ...], int]:
+    """(цепочка, filtered_size)."""
+    if len(raw) < RECORD_SIZE:
+        raise ValueError("short filters record")
+    filtered_size, count = struct.unpack_from(RECORD_FMT, raw)
+    if len(raw) != RECORD_SIZE + 2 * count:
+        raise ValueError("bad filters record")
+    chain = tuple((raw[RECORD_SIZE + 2 * i], raw[RECORD_SIZE + 2 * i + 1]) for i in range(count))
+    for fid, _ in chain:
+        if fid not in NAMES:
+            raise ValueError(f"unknown filter: {fid}")
+    return chain, filtered_size
+
+
+def parse_chain(text: str) -> Tuple[Tuple[int, int], ...]:
+    """'delta16:1,planes:2' -> цепочка; 'none' или '' — пустая."""
+    if text in ('', 'none'):
+        return ()
+    ids = {name: fid for fid, name in NAMES.items()}
+    chain = []
+    for item in text.split(','):
+        name, _, param = item.partition(':')
+        if name not in ids:
+            raise ValueError(f"unknown filter: {name}")
+        chain.append((ids[name], int(param) if param else (0 if name == 'rle' else 1)))
+    return tuple(chain)
+
+
+def format_chain(chain: Chain) -> str:
+    return ','.join(NAMES[fid] if fid == FILTER_RLE else f"{NAMES[fid]}:{param}"
+                    for fid, param in chain) or 'none'
+
+
+# --- выбор фильтров ---
+
+def entropy_cost(data: bytes) -> float:
+    """оценка размера после кодирования порядка 0: энтропия в байтах."""
+    if not len(data):
+        return 0.0
+    return histogram.entropy_bits(histogram.byte_counts(data)) / 8
+
+
+def sample_pieces(data, pieces: int = SAMPLE_PIECES, piece: int = SAMPLE_PIECE) -> List[bytes]:
+    """куски выборки, равномерно по записи; смещения кратны 16 — элементы не режутся."""
+    n = len(data)
+    if n <= pieces * piece:
+        return [bytes(data)]
+    step = (n - piece) // (pieces - 1)
+    return [bytes(data[off:off + piece]) for off in ((i * step) & ~15 for i in range(pieces))]
+
+
+def choose(data, cost=entropy_cost, candidates=CANDIDATES):
+    """цепочка с наименьшей суммарной стоимостью на выборке (при равенстве — первая)."""
+    pieces = sample_pieces(data)
+    best, best_cost = (), None
+    for chain in candidates:
+        c = sum(cost(apply(chain, p)) for p in pieces)
+        if best_cost is None or c < best_cost:
+            best, best_cost = tuple(chain), c
+    return best
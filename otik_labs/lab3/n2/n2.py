@@ -4,7 +4,19 @@
 
 CLI 
     pack <root_dir> <archive>   — собрать архив из каталога (с иерархией)
+        [--no-cache]  — не засорять страничный кэш (POSIX_FADV_DONTNEED)
+        [--protect=N] — 0: без защиты, 1: CRC32 записей и блоков (по умолчанию),
+                        2: коды Рида — Соломона RS(255, 239) с чередованием (см. rs.py)
+        [--jobs=N]    — процессов для кодирования RS (по умолчанию — по числу CPU)
     unpack <archive> <out_dir>  — восстановить каталог из архива
+        [--sync]      — писать только изменившиеся файлы (размер/mtime)
+        [--checksum]  — при --sync сравнивать и содержимое
+        [--delete]    — при --sync удалить из out_dir то, чего нет в архиве
+    diff <archive> <dir> [--checksum] — показать различия, ничего не записывая
+    test <archive> [--jobs=N]   — проверить CRC32 всех записей без распаковки
+                                  (для protection = 2 — и исправимость полос)
+    serve <archive> [--host=H] [--port=P] [--workers=N]
+                                — раздавать файлы архива по HTTP (см. serve.py)
 
 - Все целые — little-endian.
 - Выравнивание границ важных блоков — до 8 байт нулями.
@@ -14,21 +26,45 @@ CLI
 from __future__ import annotations
 
 import os
+import importlib.util
 import io
+import shutil
 import sys
 import stat as statmod
 import struct
 import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from typing import BinaryIO, List, Tuple
 
+# предварительные фильтры записей (extra-тег EXTRA_FILTERS)
+_filters_spec = importlib.util.spec_from_file_location(
+    "otik_filters", os.path.join(os.path.dirname(os.path.abspath(__file__)), "filters.py"))
+filters = importlib.util.module_from_spec(_filters_spec)
+_filters_spec.loader.exec_module(filters)
+
+# коды Рида — Соломона (protection = PROT_RS); модуль регистрируется в sys.modules,
+# чтобы функции кодера передавались в пул процессов по имени
+_rs_spec = importlib.util.spec_from_file_location(
+    "otik_rs", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rs.py"))
+rs = importlib.util.module_from_spec(_rs_spec)
+sys.modules[_rs_spec.name] = rs
+_rs_spec.loader.exec_module(rs)
+
 # константы формата
 SIG = b"SOBSTV02"  # 8 байт сигнатуры
 VER_MAJOR = 2
-VER_MINOR = 0
+VER_MINOR = 1      # 1: extra-секции записей, TOC после данных, коды сжатия записей
 COMP_CTX = 0       # по умолчанию: нет
 COMP_NCTX = 0      # по умолчанию: нет
-PROTECT = 0        # по умолчанию: нет
+PROTECT = 1        # по умолчанию: CRC32 по блокам (PROT_CRC32)
+
+# коды защиты (поле protection)
+PROT_NONE = 0
+PROT_CRC32 = 1     # контрольные суммы записи и её блоков в extra-области
+PROT_RS = 2        # RS(255, k) по полосам: проверочные символы в области после данных
 
 # фиксированная часть, 56 байт
 #  8s signature; H major; H minor; B comp_ctx; B comp_nctx; B protection; B reserved;
@@ -44,6 +80,29 @@ ENTRY_SIZE = struct.calcsize(ENTRY_FMT)
 FLAG_DIR = 0x1
 FLAG_FILE = 0x2
 
+# extra-область записи — последовательность записей «тег, длина, данные»:
+#  H tag; I length; затем length байт
+EXTRA_REC_FMT = "<HI"
+EXTRA_REC_SIZE = struct.calcsize(EXTRA_REC_FMT)
+
+# тег 1 — контрольные суммы CRC32 данных записи (в том виде, как они лежат в архиве):
+#  I block_size; I entry_crc; затем I crc на каждый блок (только если блоков больше одного)
+EXTRA_CRC32 = 1
+CRC_HDR_FMT = "<II"
+CRC_BLOCK = 1024 * 1024
+
+# тег 2 — цепочка предварительных фильтров (delta, RLE, байтовые плоскости), см. filters.py:
+#  Q filtered_size; B count; затем count пар (B id, B параметр)
+EXTRA_FILTERS = 2
+
+# тег 3 — коды Рида — Соломона (protection = PROT_RS), см. rs.py:
+#  B nsym; B reserved; H depth; Q parity_offset; затем I crc на каждую полосу данных
+# Проверочные символы полос лежат подряд с parity_offset, по nsym · глубина полосы байт.
+EXTRA_RS = 3
+RS_HDR_FMT = "<BBHQ"
+RS_HDR_SIZE = struct.calcsize(RS_HDR_FMT)
+RS_PENDING = 8     # сколько полос кодируется в пуле одновременно (на процесс)
+
 ALIGN = 8
 
 def _align(n: int, k: int = ALIGN) -> int:
@@ -92,6 +151,8 @@ def _collect_entries(root: Path) -> List[dict]:
                 'mode': st.st_mode & 0o7777,
                 'mtime': int(st.st_mtime),
                 'size': st.st_size,
+                # (dev, ino) — ключ порядка чтения, в архив не пишется
+                'ino': (st.st_dev, st.st_ino),
             })
 
     # включаем запись для корневого каталога (пустой путь ''): это удобный маркер,
@@ -108,15 +169,31 @@ def _collect_entries(root: Path) -> List[dict]:
     return entries
 
 
-def pack(root_dir: str, archive: str) -> None:
+def pack(root_dir: str, archive: str, *, no_cache: bool = False,
+         protect: int = PROTECT, jobs: int | None = None) -> None:
     """
       1) Сканируем дерево и формируем TOC (без смещений на данные).
       2) Подсчитываем размеры TOC и вычисляем: toc_offset, data_offset.
-      3) Назначаем каждому файлу data_offset в области данных (с выравниванием).
+      3) Назначаем каждому файлу data_offset в области данных (с выравниванием)
+         в порядке чтения — по номеру inode, а не в порядке os.walk.
       4) Пишем заголовок, затем TOC + пути, делаем выравнивание на 8.
-      5) Потоково записываем данные файлов по рассчитанным смещениям.
+      5) Потоково записываем данные файлов по рассчитанным смещениям,
+         заранее запрашивая у ядра readahead следующих файлов.
 
+    no_cache=True: прочитанные файлы и записанные куски архива вытесняются
+    из страничного кэша (POSIX_FADV_DONTNEED), чтобы не вымывать рабочий набор
+    соседних сервисов.
+
+    protect=PROT_CRC32: на лету считаются CRC32 каждой записи и её блоков по 1 МБ;
+    место под них резервируется в extra-области TOC, суммы дописываются
+    в TOC после данных.
+
+    protect=PROT_RS: данные режутся на полосы RS (rs.py); проверочные символы
+    полос кодируются параллельно в jobs процессах и пишутся в область после
+    данных всех файлов, CRC32 полос — в extra-область TOC.
     """
+    if protect not in (PROT_NONE, PROT_CRC32, PROT_RS):
+        raise ValueError(f"unsupported protection: {protect}")
     root = Path(root_dir)
     if not root.exists():
         raise FileNotFoundError(root)
@@ -125,13 +202,18 @@ def pack(root_dir: str, archive: str) -> None:
     toc_entries = len(entries)
     total_orig = sum(e['size'] for e in entries if not e['is_dir'])
 
-    # подсчитаем общий размер TOC: сумма фиксированных записей и строк путей.
+    # подсчитаем общий размер TOC: сумма фиксированных записей, строк путей и extra.
     toc_size = 0
     paths_bytes: List[bytes] = []
     for e in entries:
         p = e['path'].encode('utf-8')
         paths_bytes.append(p)
-        toc_size += ENTRY_SIZE + len(p)  # extra_len = 0 (в нулевом профиле)
+        e['extra_len'] = 0
+        if protect == PROT_CRC32 and not e['is_dir']:
+            e['extra_len'] = EXTRA_REC_SIZE + _crc_payload_size(e['size'])
+        elif protect == PROT_RS and not e['is_dir']:
+            e['extra_len'] = EXTRA_REC_SIZE + _rs_payload_size(e['size'])
+        toc_size += ENTRY_SIZE + len(p) + e['extra_len']
     toc_size_aligned = _align(toc_size)
 
     toc_offset = HDR_SIZE
@@ -139,16 +221,30 @@ def pack(root_dir: str, archive: str) -> None:
 
     # проставим каждому файлу своё смещение в области данных.
     # выравнивание по 8 — чтобы оставаться совместимыми с возможными блоковыми алгоритмами/ДМА.
-    cursor = data_offset
-    for i, e in enumerate(entries):
+    # данные раскладываются в порядке чтения: по (dev, inode) — на большинстве ФС
+    # это близко к физическому порядку, и холодный диск читается почти без seek.
+    files = sorted((e for e in entries if not e['is_dir']), key=lambda e: e['ino'])
+    for e in entries:
         if e['is_dir']:
             e['stored_size'] = 0
             e['data_offset'] = 0
-        else:
+    cursor = data_offset
+    for e in files:
+        e['stored_size'] = e['size']
+        if not e['stored_size']:
+            # пустой файл не занимает места: смещение — начало области данных,
+            # иначе выравнивание после последнего файла уводит его за конец архива
+            e['data_offset'] = data_offset
+            continue
+        cursor = _align(cursor)
+        e['data_offset'] = cursor
+        cursor += e['stored_size']
+    if protect == PROT_RS:
+        # проверочные символы — после данных всех файлов: их длина известна заранее
+        for e in files:
             cursor = _align(cursor)
-            e['data_offset'] = cursor
-            e['stored_size'] = e['size']
-            cursor += e['stored_size']
+            e['parity_offset'] = cursor
+            cursor += rs.parity_size(e['stored_size'])
 
     with open(archive, 'wb') as out:
         # Заголовок
@@ -159,7 +255,7 @@ def pack(root_dir: str, archive: str) -> None:
             VER_MINOR,
             COMP_CTX,
             COMP_NCTX,
-            PROTECT,
+            protect,
             0,  # reserved
             toc_entries,
             0,  # global_meta_offset
@@ -185,7 +281,7 @@ def pack(root_dir: str, archive: str) -> None:
             original_size = e['size'] if not e['is_dir'] else 0
             stored_size = e['stored_size']
             data_off = e['data_offset']
-            extra_len = 0
+            extra_len = e['extra_len']
             entry_id = 0
 
             out.write(struct.pack(
@@ -195,6 +291,9 @@ def pack(root_dir: str, archive: str) -> None:
                 original_size, stored_size, data_off, extra_len, entry_id
             ))
             out.write(p_bytes)
+            # extra пока заполнено нулями: суммы известны только после данных
+            e['extra_offset'] = out.tell()
+            out.write(b"\x00" * extra_len)
         # выравнивание после TOC — до ближайшей границы 8 байт нулями
         pad = _align(out.tell()) - out.tell()
         if pad:
@@ -203,23 +302,512 @@ def pack(root_dir: str, archive: str) -> None:
         # данные файлов (пул payload):
         # для профиля 0/0/0 просто копируем «как есть». При включении алгоритмов
         # здесь должен происходить пайплайн: encode_ctx -> encode_nctx -> protect.
+        out.flush()
+        writer = _ArchiveWriter(out, no_cache)
+        buf = bytearray(1024 * 1024)
+        view = memoryview(buf)
+        parity = _ParityWriter(out.fileno(), jobs) if protect == PROT_RS else None
+        for e, fd in _open_ahead(root, [e for e in files if e['stored_size']]):
+            try:
+                # переход к заранее посчитанному смещению (на случай, если будущие версии пишут не последовательно)
+                cur = out.tell()
+                if cur < e['data_offset']:
+                    writer.write(b"\x00" * (e['data_offset'] - cur))
+                elif cur > e['data_offset']:
+                    raise RuntimeError("internal offset miscalc")
+
+                src = io.FileIO(fd, closefd=False)
+                if protect == PROT_CRC32:
+                    crc = _BlockCrc()
+                elif protect == PROT_RS:
+                    crc = _RsStripes(parity, e['parity_offset'])
+                else:
+                    crc = None
+                remaining = e['stored_size']
+                while remaining:
+                    got = src.readinto(view[:min(len(buf), remaining)])
+                    if not got:
+                        raise RuntimeError(f"file shrank during pack: {e['path']}")
+                    writer.write(view[:got])
+                    if crc is not None:
+                        crc.update(view[:got])
+                    remaining -= got
+                if crc is not None:
+                    e['crc'] = crc
+                    if protect == PROT_RS:
+                        crc.finish()
+                if no_cache:
+                    _fadvise(fd, 0, 0, 'POSIX_FADV_DONTNEED')
+            finally:
+                os.close(fd)
+        if protect == PROT_CRC32:
+            # дописываем контрольные суммы на зарезервированные места в TOC
+            out.flush()
+            empty = _BlockCrc()
+            for e in files:
+                rec = _crc_extra(e.get('crc', empty))
+                assert len(rec) == e['extra_len']
+                os.pwrite(out.fileno(), rec, e['extra_offset'])
+        elif protect == PROT_RS:
+            parity.close()
+            out.flush()
+            for e in files:
+                stripes = e.get('crc')
+                rec = _rs_extra(e['parity_offset'], stripes.crcs if stripes else [])
+                assert len(rec) == e['extra_len']
+                os.pwrite(out.fileno(), rec, e['extra_offset'])
+        writer.finish()
+
+
+# --- запись архива с TOC после данных (перекодирование) ---
+
+def _write_archive_tail_toc(archive: str, entries: List[dict], payload, *,
+                            comp_ctx: int, comp_nctx: int, protect: int) -> None:
+    """записать архив, в котором TOC идёт после данных.
+
+    Размеры сжатых данных заранее неизвестны, поэтому данные пишутся сразу за
+    заголовком, а TOC — после них; toc_offset в заголовке указывает на него.
+    entries — записи в порядке TOC (path, is_dir, mode, mtime, original_size,
+    comp_ctx, comp_nctx); payload(e) возвращает сохраняемые данные файла и может
+    положить в e['filters_extra'] extra-запись фильтров. При protect=PROT_RS
+    проверочные символы записи идут сразу за её данными.
+    """
+    with open(archive, 'wb') as out:
+        out.write(b"\x00" * _align(HDR_SIZE))
+        data_offset = out.tell()
+
         for e in entries:
-            if e['is_dir'] or e['stored_size'] == 0:
+            e['extra'] = b""
+            if e['is_dir']:
+                e['stored_size'] = 0
+                e['data_offset'] = 0
                 continue
-            # переход к заранее посчитанному смещению (на случай, если будущие версии пишут не последовательно)
-            cur = out.tell()
-            if cur < e['data_offset']:
-                out.write(b"\x00" * (e['data_offset'] - cur))
-            elif cur > e['data_offset']:
-                raise RuntimeError("internal offset miscalc")
-
-            src = root / e['path']
-            with open(src, 'rb') as f:
-                while True:
-                    chunk = f.read(1024 * 1024)
-                    if not chunk:
-                        break
-                    out.write(chunk)
+            out.write(b"\x00" * (_align(out.tell()) - out.tell()))
+            data = payload(e)
+            e['data_offset'] = out.tell()
+            e['stored_size'] = len(data)
+            out.write(data)
+            # payload() может оставить extra-запись фильтров
+            e['extra'] = e.pop('filters_extra', b"")
+            if protect == PROT_CRC32:
+                crc = _BlockCrc()
+                crc.update(data)
+                e['extra'] += _crc_extra(crc)
+            elif protect == PROT_RS:
+                out.write(b"\x00" * (_align(out.tell()) - out.tell()))
+                size = rs.stripe_size()
+                crcs = [zlib.crc32(data[i:i + size]) for i in range(0, len(data), size)]
+                e['extra'] += _rs_extra(out.tell(), crcs)
+                out.write(rs.encode(data))
+
+        out.write(b"\x00" * (_align(out.tell()) - out.tell()))
+        toc_offset = out.tell()
+        for e in entries:
+            p_bytes = e['path'].encode('utf-8')
+            out.write(struct.pack(
+                ENTRY_FMT,
+                len(p_bytes), FLAG_DIR if e['is_dir'] else FLAG_FILE, e['mode'], e['mtime'],
+                0xFF if e['comp_ctx'] == comp_ctx else e['comp_ctx'],
+                0xFF if e['comp_nctx'] == comp_nctx else e['comp_nctx'],
+                0xFF, 0,
+                e['original_size'], e['stored_size'], e['data_offset'], len(e['extra']), 0
+            ))
+            out.write(p_bytes)
+            out.write(e['extra'])
+
+        out.seek(0)
+        out.write(struct.pack(
+            HDR_FMT, SIG, VER_MAJOR, VER_MINOR, comp_ctx, comp_nctx, protect, 0,
+            len(entries), 0, 0, toc_offset, data_offset,
+            sum(e['original_size'] for e in entries if not e['is_dir']),
+        ))
+
+
+def transcode(src_archive: str, dst_archive: str, comp_nctx: int,
+              protect: int | None = None, comp_ctx: int = 0, level: int | None = None,
+              filters_chain=None) -> None:
+    """перекодировать все записи архива в алгоритм comp_ctx/comp_nctx без распаковки на диск.
+
+    Каждая запись декодируется в память и сразу кодируется целевым кодеком Л4
+    (контекстной стадией comp_ctx с уровнем level, если задана, и кодеком
+    comp_nctx); метаданные (пути, права, mtime) переносятся как есть.
+    protect по умолчанию — как в исходном архиве.
+
+    filters_chain — предварительные фильтры перед кодеком: цепочка для всех
+    записей или 'auto' — своя цепочка для каждой записи (filters.choose по
+    выборке; стоимость — энтропия порядка 0 для кодека comp_nctx, zlib как
+    грубая оценка контекстной стадии, размер без сжатия).
+    """
+    # неизвестный код — ошибка до начала записи
+    entropy = load_codec(comp_nctx) if comp_nctx != 0 else None
+    ctx_codec = load_ctx_codec(comp_ctx) if comp_ctx != 0 else None
+    if comp_ctx != 0:
+        cost = lambda d: len(zlib.compress(d, 1))
+    elif comp_nctx != 0:
+        cost = filters.entropy_cost
+    else:
+        cost = len
+
+    def choose(data: bytes):
+        return filters.choose(data, cost)
+    with open(src_archive, 'rb') as f:
+        hdr = _read_header(f)
+        entries = _read_toc(f, hdr)
+        src_fd = f.fileno()
+        targets = [dict(e, comp_ctx=comp_ctx, comp_nctx=comp_nctx, src=e) for e in entries]
+
+        def payload(t: dict) -> bytes:
+            src = t['src']
+            data = decode_data(src, read_stored(src_fd, src))
+            chain = choose(data) if filters_chain == 'auto' else filters_chain
+            if chain:
+                data = filters.apply(chain, data)
+                t['filters_extra'] = _filters_extra(chain, len(data))
+            if ctx_codec is not None:
+                if level is None:
+                    return ctx_codec.encode_payload(data, entropy=entropy)
+                return ctx_codec.encode_payload(data, level, entropy=entropy)
+            if entropy is None:
+                return data
+            return entropy.encode_payload(data)
+
+        _write_archive_tail_toc(
+            dst_archive, targets, payload, comp_ctx=comp_ctx, comp_nctx=comp_nctx,
+            protect=hdr['protection'] if protect is None else protect)
+
+
+# --- контрольные суммы (protection = PROT_CRC32) ---
+
+class _BlockCrc:
+    """потоковый CRC32 всей записи и каждого блока по CRC_BLOCK байт."""
+
+    def __init__(self):
+        self.entry = 0
+        self.blocks: List[int] = []
+        self._cur = 0
+        self._fill = 0
+
+    def update(self, data) -> None:
+        self.entry = zlib.crc32(data, self.entry)
+        view = memoryview(data)
+        while view:
+            take = min(CRC_BLOCK - self._fill, len(view))
+            self._cur = zlib.crc32(view[:take], self._cur)
+            self._fill += take
+            view = view[take:]
+            if self._fill == CRC_BLOCK:
+                self.blocks.append(self._cur)
+                self._cur = 0
+                self._fill = 0
+
+    def block_crcs(self) -> List[int]:
+        return self.blocks + ([self._cur] if self._fill else [])
+
+
+def _crc_payload_size(size: int) -> int:
+    nblocks = (size + CRC_BLOCK - 1) // CRC_BLOCK
+    return struct.calcsize(CRC_HDR_FMT) + (4 * nblocks if nblocks > 1 else 0)
+
+
+def _crc_extra(crc: _BlockCrc) -> bytes:
+    """extra-запись EXTRA_CRC32 для посчитанных сумм."""
+    blocks = crc.block_crcs()
+    body = struct.pack(CRC_HDR_FMT, CRC_BLOCK, crc.entry)
+    if len(blocks) > 1:
+        body += struct.pack(f"<{len(blocks)}I", *blocks)
+    return struct.pack(EXTRA_REC_FMT, EXTRA_CRC32, len(body)) + body
+
+
+def _filters_extra(chain, filtered_size: int) -> bytes:
+    """extra-запись EXTRA_FILTERS."""
+    body = filters.pack_record(chain, filtered_size)
+    return struct.pack(EXTRA_REC_FMT, EXTRA_FILTERS, len(body)) + body
+
+
+def _parse_extra(raw: bytes) -> dict:
+    """разобрать extra-область записи в словарь {тег: данные}."""
+    recs = {}
+    pos = 0
+    while pos < len(raw):
+        if pos + EXTRA_REC_SIZE > len(raw):
+            raise ValueError("short extra record")
+        tag, length = struct.unpack_from(EXTRA_REC_FMT, raw, pos)
+        pos += EXTRA_REC_SIZE
+        if pos + length > len(raw):
+            raise ValueError("short extra record")
+        recs[tag] = raw[pos:pos + length]
+        pos += length
+    return recs
+
+
+def _entry_crcs(e: dict):
+    """(block_size, entry_crc, [crc блоков]) записи или None, если сумм нет.
+
+    Для protection = PROT_RS блоки — полосы RS, entry_crc — None.
+    """
+    if e['protection'] == PROT_RS and EXTRA_RS in e['extra']:
+        nsym, depth, _, crcs = _entry_rs(e)
+        return rs.stripe_size(nsym, depth), None, crcs
+    if e['protection'] != PROT_CRC32 or EXTRA_CRC32 not in e['extra']:
+        return None
+    raw = e['extra'][EXTRA_CRC32]
+    block_size, entry_crc = struct.unpack_from(CRC_HDR_FMT, raw)
+    nblocks = (e['stored_size'] + block_size - 1) // block_size if block_size else 0
+    if nblocks > 1:
+        blocks = list(struct.unpack_from(f"<{nblocks}I", raw, struct.calcsize(CRC_HDR_FMT)))
+    else:
+        blocks = [entry_crc] if nblocks else []
+    return block_size, entry_crc, blocks
+
+
+# --- коды Рида — Соломона (protection = PROT_RS) ---
+
+class _ParityWriter:
+    """кодирование полос RS в пуле процессов и запись проверочных символов (pwrite).
+
+    Одновременно в пуле не больше RS_PENDING полос на процесс; без пула
+    (jobs = 1 или rs не доступен по имени) полосы кодируются сразу.
+    """
+
+    def __init__(self, fd: int, jobs: int | None):
+        self.fd = fd
+        workers = jobs or os.cpu_count() or 1
+        self.pool = None
+        if workers > 1 and sys.modules.get(rs.__name__) is rs:
+            self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.limit = RS_PENDING * workers
+        self._pending: deque = deque()
+
+    def submit(self, stripe: bytes, offset: int) -> None:
+        if self.pool is None:
+            os.pwrite(self.fd, rs.encode_stripe(stripe), offset)
+            return
+        self._pending.append((self.pool.submit(rs.encode_stripe, stripe), offset))
+        while len(self._pending) > self.limit:
+            self._write_one()
+
+    def _write_one(self) -> None:
+        fut, offset = self._pending.popleft()
+        os.pwrite(self.fd, fut.result(), offset)
+
+    def close(self) -> None:
+        while self._pending:
+            self._write_one()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+class _RsStripes:
+    """потоковая нарезка записи на полосы RS: CRC32 полос и отправка их в _ParityWriter."""
+
+    def __init__(self, parity: _ParityWriter, offset: int):
+        self.parity = parity
+        self.offset = offset
+        self.crcs: List[int] = []
+        self._buf = bytearray()
+
+    def update(self, data) -> None:
+        self._buf += data
+        size = rs.stripe_size()
+        while len(self._buf) >= size:
+            self._stripe(bytes(self._buf[:size]))
+            del self._buf[:size]
+
+    def _stripe(self, stripe: bytes) -> None:
+        self.crcs.append(zlib.crc32(stripe))
+        self.parity.submit(stripe, self.offset)
+        self.offset += rs.NSYM * rs.stripe_depth(len(stripe))
+
+    def finish(self) -> None:
+        if self._buf:
+            self._stripe(bytes(self._buf))
+            self._buf.clear()
+
+
+def _rs_payload_size(size: int) -> int:
+    nstripes = (size + rs.stripe_size() - 1) // rs.stripe_size()
+    return RS_HDR_SIZE + 4 * nstripes
+
+
+def _rs_extra(parity_offset: int, crcs: List[int]) -> bytes:
+    """extra-запись EXTRA_RS (параметры кода — по умолчанию из rs.py)."""
+    body = struct.pack(RS_HDR_FMT, rs.NSYM, 0, rs.DEPTH, parity_offset)
+    body += struct.pack(f"<{len(crcs)}I", *crcs)
+    return struct.pack(EXTRA_REC_FMT, EXTRA_RS, len(body)) + body
+
+
+def _entry_rs(e: dict):
+    """(nsym, depth, parity_offset, [crc полос]) записи с EXTRA_RS."""
+    raw = e['extra'][EXTRA_RS]
+    if len(raw) < RS_HDR_SIZE:
+        raise ValueError(f"short RS record: {e['path']}")
+    nsym, _, depth, parity_offset = struct.unpack_from(RS_HDR_FMT, raw)
+    rs.check_params(nsym, depth)
+    size = rs.stripe_size(nsym, depth)
+    nstripes = (e['stored_size'] + size - 1) // size
+    if len(raw) < RS_HDR_SIZE + 4 * nstripes:
+        raise ValueError(f"short RS record: {e['path']}")
+    crcs = list(struct.unpack_from(f"<{nstripes}I", raw, RS_HDR_SIZE))
+    return nsym, depth, parity_offset, crcs
+
+
+def _rs_repair(src_fd: int, e: dict, i: int, chunk: bytes) -> Tuple[bytes, int]:
+    """исправить полосу i записи, CRC32 которой не сошёлся.
+
+    Возвращает (данные, число исправленных символов); 0 — данные согласованы
+    с проверочными символами, испорчена сама сумма в TOC.
+    """
+    nsym, depth, parity_offset, crcs = _entry_rs(e)
+    want = nsym * rs.stripe_depth(len(chunk), nsym, depth)
+    parity = os.pread(src_fd, want, parity_offset + i * nsym * depth)
+    if len(parity) != want:
+        raise ValueError(f"checksum mismatch: {e['path']} (stripe {i}), RS parity missing")
+    try:
+        data, fixed = rs.correct_stripe(chunk, parity, nsym, depth)
+    except ValueError:
+        fixed = -1
+    if fixed < 0 or (fixed and zlib.crc32(data) != crcs[i]):
+        raise ValueError(f"uncorrectable errors: {e['path']} (stripe {i})")
+    return data, fixed
+
+
+# --- декодирование сжатых записей ---
+
+# коды comp_nctx совпадают с кодами алгоритмов Л4 (байт алгоритма в заголовке SOBSTV),
+# payload записи — то, что кодек Л4 пишет после своего 16-байтового заголовка.
+# Коды comp_ctx — контекстные стадии Л4; payload стадии содержит потоки, сжатые
+# кодеком comp_nctx (0 — без сжатия).
+LAB4_DIR = Path(__file__).resolve().parent.parent.parent / 'lab4'
+NCTX_CODECS = {1: 'n1.py', 2: 'n6.py', 10: 'unicode_huffman.py'}
+CTX_CODECS = {1: 'lzss.py', 2: 'bwt.py'}
+_codecs: dict = {}
+
+
+def _load_lab4(kind: str, code: int, table: dict):
+    if code not in table:
+        raise ValueError(f"unsupported {kind}: {code}")
+    key = (kind, code)
+    if key not in _codecs:
+        path = LAB4_DIR / table[code]
+        name = f"lab4_{kind}_{code}"
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        # по имени модуля процессы-вычислители кодека находят его функции (bwt.py)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        _codecs[key] = module
+    return _codecs[key]
+
+
+def load_codec(code: int):
+    """модуль кодека Л4 для кода comp_nctx (загружается один раз)."""
+    return _load_lab4('comp_nctx', code, NCTX_CODECS)
+
+
+def load_ctx_codec(code: int):
+    """модуль контекстной стадии Л4 для кода comp_ctx (загружается один раз)."""
+    return _load_lab4('comp_ctx', code, CTX_CODECS)
+
+
+def is_coded(e: dict) -> bool:
+    return bool(e['comp_ctx'] or e['comp_nctx'] or EXTRA_FILTERS in e['extra'])
+
+
+def decode_data(e: dict, stored: bytes) -> bytes:
+    """восстановить исходные данные записи из сохранённых."""
+    chain, size = (), e['original_size']
+    if EXTRA_FILTERS in e['extra']:
+        chain, size = filters.unpack_record(e['extra'][EXTRA_FILTERS])
+    if e['comp_ctx'] != 0:
+        entropy = load_codec(e['comp_nctx']) if e['comp_nctx'] else None
+        data = load_ctx_codec(e['comp_ctx']).decode_payload(stored, size, entropy)
+    elif e['comp_nctx'] == 0:
+        data = stored
+    else:
+        data = load_codec(e['comp_nctx']).decode_payload(stored, size)
+    if len(data) != size:
+        raise ValueError(f"decoded size mismatch: {e['path']}")
+    if chain:
+        data = filters.revert(chain, data)
+        if len(data) != e['original_size']:
+            raise ValueError(f"filtered size mismatch: {e['path']}")
+    return data
+
+
+# --- планирование ввода-вывода при упаковке ---
+
+READAHEAD_FILES = 8            # сколько следующих файлов держим открытыми с WILLNEED
+READAHEAD_BYTES = 64 << 20     # ... но не больше стольких байт суммарно
+DROP_EVERY = 8 << 20           # при no_cache вытесняем архив кусками такого размера
+
+
+def _fadvise(fd: int, offset: int, length: int, advice: str) -> None:
+    """posix_fadvise, если он есть в системе (подсказка ядру — ошибки не критичны)."""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, offset, length, getattr(os, advice))
+        except OSError:
+            pass
+
+
+def _open_ahead(root: Path, files: List[dict]):
+    """выдавать (запись, fd) по порядку, держа открытыми следующие файлы
+    с POSIX_FADV_WILLNEED — ядро читает их фоном, пока мы пишем текущий."""
+    window: "deque[Tuple[dict, int]]" = deque()
+    ahead_bytes = 0
+    it = iter(files)
+    pending = next(it, None)
+    while window or pending is not None:
+        while pending is not None and (
+                not window
+                or (len(window) < READAHEAD_FILES and ahead_bytes + pending['size'] <= READAHEAD_BYTES)):
+            fd = os.open(root / pending['path'], os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0))
+            _fadvise(fd, 0, 0, 'POSIX_FADV_SEQUENTIAL')
+            _fadvise(fd, 0, 0, 'POSIX_FADV_WILLNEED')
+            window.append((pending, fd))
+            ahead_bytes += pending['size']
+            pending = next(it, None)
+        e, fd = window.popleft()
+        ahead_bytes -= e['size']
+        try:
+            yield e, fd
+        except BaseException:
+            for _, other in window:
+                os.close(other)
+            raise
+
+
+class _ArchiveWriter:
+    """запись payload архива; при no_cache записанное сбрасывается на диск
+    и вытесняется из кэша кусками по DROP_EVERY байт."""
+
+    def __init__(self, out: BinaryIO, no_cache: bool):
+        self.out = out
+        self.no_cache = no_cache
+        self.fd = out.fileno()
+        self.dropped = 0
+        self.pos = out.tell()
+
+    def write(self, data) -> None:
+        self.out.write(data)
+        self.pos += len(data)
+        if self.no_cache and self.pos - self.dropped >= DROP_EVERY:
+            self._drop()
+
+    def _drop(self) -> None:
+        # DONTNEED вытесняет только чистые страницы, поэтому сначала fdatasync
+        self.out.flush()
+        os.fdatasync(self.fd)
+        _fadvise(self.fd, self.dropped, self.pos - self.dropped, 'POSIX_FADV_DONTNEED')
+        self.dropped = self.pos
+
+    def finish(self) -> None:
+        if self.no_cache:
+            # вместе с тем, что записано мимо буфера (pwrite сумм и проверочных символов)
+            self.out.flush()
+            self.pos = max(self.pos, os.fstat(self.fd).st_size)
+            self.dropped = 0
+            self._drop()
 
 # --- Чтение архива ---
 
@@ -237,128 +825,602 @@ def _safe_join(base: Path, rel: str) -> Path:
     return full
 
 
-def unpack(archive: str, out_dir: str) -> None:
-    """распаковать архив в каталог out_dir.
+def _split_path(rel: str) -> Tuple[str, ...]:
+    """разбить путь из TOC на компоненты, проверив каждую ровно один раз.
 
-    Схема чтения:
-      1) Проверяем сигнатуру/версию и читаем общие коды алгоритмов.
-      2) Переходим на TOC и читаем его записи + пути.
-      3) Создаём каталоги (включая пустой путь для корня), проставляем права/mtime.
-      4) Для каждого файла читаем данные по data_offset длиной stored_size и пишем.
+    Запрещены абсолютные пути, пустые компоненты (кроме хвостового '/' у каталогов),
+    '.' и '..', а также NUL. Результат — кортеж имён от корня out_dir.
     """
-    out_root = Path(out_dir)
-    out_root.mkdir(parents=True, exist_ok=True)
+    if rel == '':
+        return ()
+    if rel.startswith('/'):
+        raise ValueError("absolute path in archive")
+    parts = rel[:-1].split('/') if rel.endswith('/') else rel.split('/')
+    for name in parts:
+        if name in ('', '.', '..') or '\x00' in name:
+            raise ValueError("path traversal detected")
+    return tuple(parts)
 
-    with open(archive, 'rb') as f:
-        hdr_raw = f.read(HDR_SIZE)
-        if len(hdr_raw) != HDR_SIZE:
-            raise ValueError("short header")
+
+def _read_header(f: BinaryIO) -> dict:
+    """прочитать и проверить заголовок архива, вернуть его поля."""
+    hdr_raw = f.read(HDR_SIZE)
+    if len(hdr_raw) != HDR_SIZE:
+        raise ValueError("short header")
+    (
+        sig,
+        vmaj,
+        vmin,
+        comp_ctx,
+        comp_nctx,
+        protection,
+        _reserved,
+        toc_entries,
+        global_meta_off,
+        global_meta_len,
+        toc_off,
+        data_off,
+        total_orig,
+    ) = struct.unpack(HDR_FMT, hdr_raw)
+
+    if sig != SIG:
+        raise ValueError("bad signature")
+    if vmaj < 1:
+        raise ValueError("unsupported version")
+    if vmaj > VER_MAJOR or (vmaj == VER_MAJOR and vmin > VER_MINOR):
+        # более новый minor может менять разметку TOC — читать наугад нельзя
+        raise ValueError(f"unsupported version: {vmaj}.{vmin}")
+
+    return {
+        'comp_ctx': comp_ctx,
+        'comp_nctx': comp_nctx,
+        'protection': protection,
+        'toc_entries': toc_entries,
+        'toc_offset': toc_off,
+        'data_offset': data_off,
+        'total_original_size': total_orig,
+    }
+
+
+def _read_toc(f: BinaryIO, hdr: dict) -> List[dict]:
+    """прочитать TOC: фиксированная часть записи + путь UTF‑8."""
+    f.seek(hdr['toc_offset'])
+    entries = []
+    for i in range(hdr['toc_entries']):
+        eraw = f.read(ENTRY_SIZE)
+        if len(eraw) != ENTRY_SIZE:
+            raise ValueError("short TOC entry")
         (
-            sig,
-            vmaj,
-            vmin,
-            comp_ctx,
-            comp_nctx,
-            protection,
-            _reserved,
-            toc_entries,
-            global_meta_off,
-            global_meta_len,
-            toc_off,
-            data_off,
-            total_orig,
-        ) = struct.unpack(HDR_FMT, hdr_raw)
-
-        if sig != SIG:
-            raise ValueError("bad signature")
-        if vmaj < 1:
-            raise ValueError("unsupported version")
-
-        # читаем TOC: фиксированная часть записи + путь UTF‑8
-        f.seek(toc_off)
-        entries = []
-        for i in range(toc_entries):
-            eraw = f.read(ENTRY_SIZE)
-            if len(eraw) != ENTRY_SIZE:
-                raise ValueError("short TOC entry")
-            (
-                path_len, flags, mode, mtime,
-                e_comp_ctx, e_comp_nctx, e_prot, e_res,
-                original_size, stored_size, data_offset, extra_len, entry_id
-            ) = struct.unpack(ENTRY_FMT, eraw)
-            p = f.read(path_len)
-            if len(p) != path_len:
-                raise ValueError("short path")
-            path = p.decode('utf-8')
+            path_len, flags, mode, mtime,
+            e_comp_ctx, e_comp_nctx, e_prot, e_res,
+            original_size, stored_size, data_offset, extra_len, entry_id
+        ) = struct.unpack(ENTRY_FMT, eraw)
+        p = f.read(path_len)
+        if len(p) != path_len:
+            raise ValueError("short path")
+        path = p.decode('utf-8')
+        extra = f.read(extra_len)
+        if len(extra) != extra_len:
+            raise ValueError("short extra")
+
+        entries.append({
+            'path': path,
+            'is_dir': bool(flags & FLAG_DIR),
+            'mode': mode,
+            'mtime': mtime,
+            'original_size': original_size,
+            'stored_size': stored_size,
+            'data_offset': data_offset,
+            'comp_ctx': hdr['comp_ctx'] if e_comp_ctx == 0xFF else e_comp_ctx,
+            'comp_nctx': hdr['comp_nctx'] if e_comp_nctx == 0xFF else e_comp_nctx,
+            'protection': hdr['protection'] if e_prot == 0xFF else e_prot,
+            'extra': _parse_extra(extra),
+        })
+    return entries
+
+
+def _copy_range(src_fd: int, offset: int, size: int, dst_fd: int) -> None:
+    """скопировать size байт архива начиная с offset в dst_fd.
+
+    Сначала пробуем copy_file_range (копирование внутри ядра, без буферов Python),
+    при отказе ФС — позиционное чтение pread + write кусками по 1 МБ.
+    """
+    remaining = size
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while remaining:
+                done = os.copy_file_range(src_fd, dst_fd, remaining, offset)
+                if done == 0:
+                    raise ValueError("unexpected EOF in data")
+                offset += done
+                remaining -= done
+            return
+        except OSError:
+            pass
+    while remaining:
+        chunk = os.pread(src_fd, min(1024 * 1024, remaining), offset)
+        if not chunk:
+            raise ValueError("unexpected EOF in data")
+        _write_all(dst_fd, chunk)
+        offset += len(chunk)
+        remaining -= len(chunk)
+
+
+def _read_verified(src_fd: int, e: dict, crcs):
+    """читать данные записи блоками и сверять CRC32 каждого блока
+    (испорченные полосы PROT_RS исправляются)."""
+    block_size, _, blocks = crcs
+    offset = e['data_offset']
+    remaining = e['stored_size']
+    for i, expected in enumerate(blocks):
+        want = min(block_size, remaining)
+        chunk = os.pread(src_fd, want, offset)
+        if len(chunk) != want:
+            raise ValueError("unexpected EOF in data")
+        if zlib.crc32(chunk) != expected:
+            if e['protection'] != PROT_RS:
+                raise ValueError(f"checksum mismatch: {e['path']} (block {i})")
+            chunk, _ = _rs_repair(src_fd, e, i, chunk)
+        yield chunk
+        offset += want
+        remaining -= want
+
+
+def read_stored(src_fd: int, e: dict) -> bytes:
+    """данные записи в том виде, как они лежат в архиве (с проверкой CRC)."""
+    crcs = _entry_crcs(e)
+    if crcs is not None:
+        return b"".join(_read_verified(src_fd, e, crcs))
+    data = os.pread(src_fd, e['stored_size'], e['data_offset'])
+    if len(data) != e['stored_size']:
+        raise ValueError("unexpected EOF in data")
+    return data
+
+
+def _write_all(fd: int, data) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _extract_data(src_fd: int, e: dict, dst_fd: int) -> None:
+    """записать данные записи в dst_fd, проверяя CRC, если они есть."""
+    if is_coded(e):
+        _write_all(dst_fd, decode_data(e, read_stored(src_fd, e)))
+        return
+    crcs = _entry_crcs(e)
+    if crcs is None:
+        _copy_range(src_fd, e['data_offset'], e['stored_size'], dst_fd)
+        return
+    for chunk in _read_verified(src_fd, e, crcs):
+        _write_all(dst_fd, chunk)
+
+
+def _apply_meta_fd(fd: int, mode: int, mtime: int) -> None:
+    """права и mtime по уже открытому дескриптору (fchmod/futimens)."""
+    try:
+        os.fchmod(fd, mode)
+    except PermissionError:
+        pass
+    try:
+        os.utime(fd, (mtime, mtime))
+    except Exception:
+        pass
+
+
+# распаковка через дескрипторы каталогов доступна на POSIX-системах
+_FAST_EXTRACT = (
+    hasattr(os, 'O_DIRECTORY')
+    and hasattr(os, 'fchmod')
+    and {os.open, os.mkdir, os.rename, os.unlink} <= os.supports_dir_fd
+    and os.utime in os.supports_fd
+)
+
+
+class _DirFdExtractor:
+    """движок распаковки на дескрипторах каталогов.
+
+    Каждый каталог открывается один раз (O_NOFOLLOW — подменённая симлинком папка
+    в out_dir не пропустит запись наружу), файлы создаются через dir_fd по одному
+    имени, метаданные ставятся через fchmod/futimens на открытом дескрипторе.
+    Путь целиком ядро больше не разбирает. Кэш дескрипторов ограничен max_fds.
+    Файл пишется под временным именем TEMP_NAME и получает своё имя только
+    целиком: ошибка CRC не оставит обрезанный файл и не испортит прежний.
+    """
+
+    DIR_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_CLOEXEC', 0)
+    FILE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_CLOEXEC', 0)
+    TEMP_NAME = f".otik-part-{os.getpid()}"
+
+    def __init__(self, out_root: Path, max_fds: int = 256):
+        out_root.mkdir(parents=True, exist_ok=True)
+        self.root_fd = os.open(out_root, self.DIR_FLAGS & ~getattr(os, 'O_NOFOLLOW', 0))
+        self.max_fds = max_fds
+        self._fds: "OrderedDict[Tuple[str, ...], int]" = OrderedDict()
+
+    def dir_fd(self, parts: Tuple[str, ...]) -> int:
+        """дескриптор каталога parts (создаётся при отсутствии)."""
+        if not parts:
+            return self.root_fd
+        fd = self._fds.get(parts)
+        if fd is not None:
+            self._fds.move_to_end(parts)
+            return fd
+        parent = self.dir_fd(parts[:-1])
+        name = parts[-1]
+        try:
+            # 0o700 на время распаковки: реальные права ставятся в finish_dirs
+            os.mkdir(name, 0o700, dir_fd=parent)
+        except FileExistsError:
+            pass
+        fd = os.open(name, self.DIR_FLAGS, dir_fd=parent)
+        self._fds[parts] = fd
+        if len(self._fds) > self.max_fds:
+            _, old = self._fds.popitem(last=False)
+            os.close(old)
+        return fd
+
+    def write_file(self, parts: Tuple[str, ...], write) -> None:
+        """записать файл: write(fd) наполняет временный файл в родительском каталоге,
+        затем он переименовывается в parts[-1]; при ошибке временный файл удаляется."""
+        parent = self.dir_fd(parts[:-1])
+        fd = os.open(self.TEMP_NAME, self.FILE_FLAGS, 0o600, dir_fd=parent)
+        try:
+            write(fd)
+        except BaseException:
+            os.close(fd)
+            os.unlink(self.TEMP_NAME, dir_fd=parent)
+            raise
+        os.close(fd)
+        os.rename(self.TEMP_NAME, parts[-1], src_dir_fd=parent, dst_dir_fd=parent)
+
+    def finish_dirs(self, dirs: List[Tuple[Tuple[str, ...], int, int]]) -> None:
+        """права и mtime каталогов — в самом конце и от глубоких к корню,
+        иначе запись файлов сбросит mtime, а права вида 0o555 не дадут писать."""
+        for parts, mode, mtime in sorted(dirs, key=lambda d: -len(d[0])):
+            _apply_meta_fd(self.dir_fd(parts), mode, mtime)
+
+    def close(self) -> None:
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+        os.close(self.root_fd)
+
+
+def _unpack_fast(f: BinaryIO, entries: List[dict], out_root: Path) -> None:
+    """распаковка движком _DirFdExtractor."""
+    ex = _DirFdExtractor(out_root)
+    dirs = []
+    try:
+        src_fd = f.fileno()
+
+        def write(e, fd):
+            _extract_data(src_fd, e, fd)
+            _apply_meta_fd(fd, e['mode'], e['mtime'])
 
-            entries.append({
-                'path': path,
-                'is_dir': bool(flags & FLAG_DIR),
-                'mode': mode,
-                'mtime': mtime,
-                'original_size': original_size,
-                'stored_size': stored_size,
-                'data_offset': data_offset,
-                'comp_ctx': comp_ctx if e_comp_ctx == 0xFF else e_comp_ctx,
-                'comp_nctx': comp_nctx if e_comp_nctx == 0xFF else e_comp_nctx,
-                'protection': protection if e_prot == 0xFF else e_prot,
-            })
-        
-        # восстановление каталогов и файлов
-        # сначала каталоги (включая корень с пустым путём)
         for e in entries:
-            if not e['is_dir']:
+            parts = _split_path(e['path'])
+            if e['is_dir']:
+                ex.dir_fd(parts)
+                dirs.append((parts, e['mode'], e['mtime']))
                 continue
-            rel = e['path']
-            target = out_root if rel == '' else _safe_join(out_root, rel)
-            target.mkdir(parents=True, exist_ok=True)
-            try:
-                os.chmod(target, e['mode'])
-            except PermissionError:
-                pass
-            try:
-                os.utime(target, (e['mtime'], e['mtime']))
-            except Exception:
-                pass
+            if not parts:
+                raise ValueError("file entry with empty path")
+            ex.write_file(parts, lambda fd: write(e, fd))
+    finally:
+        try:
+            # и после ошибки: иначе созданные каталоги останутся с правами 0o700
+            ex.finish_dirs(dirs)
+        finally:
+            ex.close()
+
+
+def _unpack_paths(f: BinaryIO, entries: List[dict], out_root: Path) -> None:
+    """распаковка по путям (запасной вариант для систем без dir_fd)."""
+    # восстановление каталогов и файлов
+    # сначала каталоги (включая корень с пустым путём)
+    for e in entries:
+        if not e['is_dir']:
+            continue
+        rel = e['path']
+        target = out_root if rel == '' else _safe_join(out_root, rel)
+        target.mkdir(parents=True, exist_ok=True)
+        try:
+            os.chmod(target, e['mode'])
+        except PermissionError:
+            pass
+        try:
+            os.utime(target, (e['mtime'], e['mtime']))
+        except Exception:
+            pass
 
-        # затем файлы: для профиля 0/0/0 читаем порциями и пишем как есть.
+    # затем файлы: для профиля 0/0/0 читаем порциями и пишем как есть.
+    for e in entries:
+        if e['is_dir']:
+            continue
+        target = _safe_join(out_root, e['path'])
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # временное имя рядом с целью: обрезанный при ошибке файл не останется
+        part = target.with_name(_DirFdExtractor.TEMP_NAME)
+        try:
+            with open(part, 'wb') as out:
+                _extract_data(f.fileno(), e, out.fileno())
+        except BaseException:
+            part.unlink(missing_ok=True)
+            raise
+        os.replace(part, target)
+        try:
+            os.chmod(target, e['mode'])
+        except PermissionError:
+            pass
+        try:
+            os.utime(target, (e['mtime'], e['mtime']))
+        except Exception:
+            pass
+
+
+# --- проверка целостности без распаковки (test) ---
+
+def verify(archive: str, jobs: int | None = None) -> Tuple[int, int, List[str]]:
+    """проверить CRC32 всех записей параллельно, ничего не распаковывая.
+
+    Каждый блок читается позиционно (pread по общему дескриптору) в пуле потоков;
+    zlib.crc32 на больших буферах отпускает GIL, так что потоки считают суммы
+    одновременно. Возвращает (проверено записей, не защищено записей, ошибки).
+
+    Для protection = PROT_RS полоса с несошедшимся CRC32 пробно исправляется:
+    в ошибках отмечается, исправима ли она (unpack исправит её сам).
+    """
+    with open(archive, 'rb') as f:
+        hdr = _read_header(f)
+        entries = _read_toc(f, hdr)
+        archive_size = os.fstat(f.fileno()).st_size
+        src_fd = f.fileno()
+
+        tasks = []
+        checked = unprotected = 0
+        errors: List[str] = []
         for e in entries:
             if e['is_dir']:
                 continue
-            target = _safe_join(out_root, e['path'])
-            target.parent.mkdir(parents=True, exist_ok=True)
-            f.seek(e['data_offset'])
-            remaining = e['stored_size']
-            with open(target, 'wb') as out:
-                while remaining:
-                    chunk = f.read(min(1024 * 1024, remaining))
-                    if not chunk:
-                        raise ValueError("unexpected EOF in data")
-                    out.write(chunk)
-                    remaining -= len(chunk)
-            try:
-                os.chmod(target, e['mode'])
-            except PermissionError:
-                pass
+            if e['stored_size'] and e['data_offset'] + e['stored_size'] > archive_size:
+                errors.append(f"{e['path']}: data beyond end of archive")
+                continue
+            crcs = _entry_crcs(e)
+            if crcs is None:
+                unprotected += 1
+                continue
+            checked += 1
+            block_size, _, blocks = crcs
+            for i, expected in enumerate(blocks):
+                offset = e['data_offset'] + i * block_size
+                length = min(block_size, e['data_offset'] + e['stored_size'] - offset)
+                tasks.append((e, i, offset, length, expected))
+
+        def check(task):
+            e, i, offset, length, expected = task
+            chunk = os.pread(src_fd, length, offset)
+            if zlib.crc32(chunk) == expected:
+                return None
+            if e['protection'] != PROT_RS:
+                return f"{e['path']}: checksum mismatch (block {i})"
             try:
-                os.utime(target, (e['mtime'], e['mtime']))
-            except Exception:
-                pass
+                _, fixed = _rs_repair(src_fd, e, i, chunk)
+            except ValueError as err:
+                return str(err)
+            if fixed == 0:
+                return f"{e['path']}: stripe {i} checksum damaged, data matches RS parity"
+            return f"{e['path']}: stripe {i} damaged, correctable ({fixed} symbols)"
+
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+            errors.extend(err for err in pool.map(check, tasks) if err)
+    return checked, unprotected, errors
+
+
+# --- сравнение архива с каталогом (unpack --sync, diff) ---
+
+def _same_content(src_fd: int, e: dict, target: Path) -> bool:
+    """сравнить данные записи в архиве с файлом на диске.
+
+    Если в архиве есть CRC32 (записи или полос RS), читается только файл на
+    диске — суммы сверяются поблочно; иначе — побайтно.
+    Сжатые записи сначала декодируются.
+    """
+    if is_coded(e):
+        with open(target, 'rb') as g:
+            return g.read() == decode_data(e, read_stored(src_fd, e))
+    crcs = _entry_crcs(e)
+    if crcs is not None:
+        block_size, _, blocks = crcs
+        with open(target, 'rb') as g:
+            for expected in blocks:
+                if zlib.crc32(g.read(block_size)) != expected:
+                    return False
+            return g.read(1) == b''
+    offset = e['data_offset']
+    remaining = e['stored_size']
+    with open(target, 'rb') as g:
+        while remaining:
+            want = min(1024 * 1024, remaining)
+            a = os.pread(src_fd, want, offset)
+            b = g.read(want)
+            if len(a) != want:
+                raise ValueError("unexpected EOF in data")
+            if a != b:
+                return False
+            offset += want
+            remaining -= want
+        return g.read(1) == b''
+
+
+def _diff_entries(f: BinaryIO, entries: List[dict], out_root: Path,
+                  checksum: bool = False) -> List[Tuple[str, str]]:
+    """сравнить TOC с содержимым out_root, ничего не записывая.
+
+    Возвращает список (статус, путь):
+      '+' — нет на диске; 'M' — отличается (тип, размер, mtime, при checksum — данные);
+      '-' — есть на диске, но нет в архиве.
+    На каждую запись — один lstat; данные читаются только при checksum=True.
+    """
+    result: List[Tuple[str, str]] = []
+    known = set()
+    src_fd = f.fileno()
+    for e in entries:
+        parts = _split_path(e['path'])
+        known.add(parts)
+        target = out_root.joinpath(*parts)
+        try:
+            st = os.lstat(target)
+        except (FileNotFoundError, NotADirectoryError):
+            # NotADirectoryError: на месте одного из родительских каталогов — файл
+            result.append(('+', e['path']))
+            continue
+        if e['is_dir']:
+            if not statmod.S_ISDIR(st.st_mode):
+                result.append(('M', e['path']))
+            continue
+        if (not statmod.S_ISREG(st.st_mode)
+                or st.st_size != e['original_size']
+                or int(st.st_mtime) != e['mtime']):
+            result.append(('M', e['path']))
+        elif checksum and not _same_content(src_fd, e, target):
+            result.append(('M', e['path']))
+
+    if out_root.is_dir():
+        for dirpath, dirnames, filenames in os.walk(out_root):
+            rel = Path(dirpath).relative_to(out_root).parts
+            for name in dirnames:
+                if rel + (name,) not in known:
+                    result.append(('-', '/'.join(rel + (name,)) + '/'))
+            # содержимое лишних каталогов уже покрыто их записью '-'
+            dirnames[:] = [d for d in dirnames if rel + (d,) in known]
+            for name in filenames:
+                if rel + (name,) not in known:
+                    result.append(('-', '/'.join(rel + (name,))))
+    return result
+
+
+def _delete_extras(out_root: Path, extras: List[str]) -> None:
+    """удалить пути со статусом '-' (каталоги — вместе с содержимым)."""
+    for rel in extras:
+        target = out_root.joinpath(*_split_path(rel))
+        if rel.endswith('/') and not target.is_symlink():
+            shutil.rmtree(target)
+        else:
+            target.unlink()
+
+
+def _remove_conflicts(out_root: Path, entries: List[dict]) -> None:
+    """убрать узлы не того типа: файл (или симлинк) на месте каталога архива
+    и каталог на месте файла — поверх них запись невозможна."""
+    for e in entries:
+        target = out_root.joinpath(*_split_path(e['path']))
+        try:
+            st = os.lstat(target)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        if e['is_dir'] and not statmod.S_ISDIR(st.st_mode):
+            target.unlink()
+        elif not e['is_dir'] and statmod.S_ISDIR(st.st_mode):
+            shutil.rmtree(target)
+
+
+def diff(archive: str, out_dir: str, checksum: bool = False) -> List[Tuple[str, str]]:
+    """отчёт о различиях между архивом и каталогом (ничего не пишет)."""
+    with open(archive, 'rb') as f:
+        hdr = _read_header(f)
+        entries = _read_toc(f, hdr)
+        return _diff_entries(f, entries, Path(out_dir), checksum)
+
+
+def unpack(archive: str, out_dir: str, *, sync: bool = False,
+           checksum: bool = False, delete: bool = False) -> None:
+    """распаковать архив в каталог out_dir.
+
+    Схема чтения:
+      1) Проверяем сигнатуру/версию и читаем общие коды алгоритмов.
+      2) Переходим на TOC и читаем его записи + пути.
+      3) Создаём каталоги (включая пустой путь для корня) и файлы: данные читаем
+         по data_offset длиной stored_size.
+      4) Проставляем права/mtime (у каталогов — после файлов).
+
+    На POSIX используется движок на дескрипторах каталогов (_DirFdExtractor),
+    иначе — распаковка по путям через _safe_join.
+
+    sync=True: пишутся только файлы, у которых на диске отличаются размер/mtime
+    (при checksum=True — и содержимое); delete=True дополнительно удаляет из
+    out_dir всё, чего нет в архиве.
+    """
+    out_root = Path(out_dir)
+    out_root.mkdir(parents=True, exist_ok=True)
+
+    with open(archive, 'rb') as f:
+        hdr = _read_header(f)
+        entries = _read_toc(f, hdr)
+        if sync:
+            changes = _diff_entries(f, entries, out_root, checksum)
+            if delete:
+                _delete_extras(out_root, [p for s, p in changes if s == '-'])
+            todo = {p for s, p in changes if s != '-'}
+            _remove_conflicts(out_root, [e for e in entries if e['path'] in todo])
+            entries = [e for e in entries if e['is_dir'] or e['path'] in todo]
+        if _FAST_EXTRACT:
+            _unpack_fast(f, entries, out_root)
+        else:
+            _unpack_paths(f, entries, out_root)
+
+
+USAGE = (
+    "usage: n2.py pack <root_dir> <archive> [--no-cache] [--protect=N] [--jobs=N]\n"
+    "       n2.py unpack <archive> <out_dir> [--sync] [--checksum] [--delete]\n"
+    "       n2.py diff <archive> <dir> [--checksum]\n"
+    "       n2.py test <archive> [--jobs=N]\n"
+    "       n2.py serve <archive> [--host=127.0.0.1] [--port=8000] [--workers=N]"
+)
 
 
 def main(argv: list[str]) -> int:
     if len(argv) == 0:
-        print("usage: n2.py pack <root_dir> <archive> | n2.py unpack <archive> <out_dir>", file=sys.stderr)
+        print(USAGE, file=sys.stderr)
         return 2
     cmd = argv[0]
+    args = [a for a in argv[1:] if not a.startswith('--')]
+    opts = {a.split('=', 1)[0] for a in argv[1:] if a.startswith('--')}
+    values = dict(a[2:].split('=', 1) for a in argv[1:] if a.startswith('--') and '=' in a)
     try:
-        if cmd == 'pack' and len(argv) == 3:
-            pack(argv[1], argv[2])
+        if cmd == 'pack' and len(args) == 2 and opts <= {'--no-cache', '--protect', '--jobs'}:
+            pack(args[0], args[1], no_cache='--no-cache' in opts,
+                 protect=int(values.get('protect', PROTECT)),
+                 jobs=int(values['jobs']) if 'jobs' in values else None)
+            return 0
+        if cmd == 'unpack' and len(args) == 2 and opts <= {'--sync', '--checksum', '--delete'}:
+            if opts and '--sync' not in opts:
+                print("--checksum/--delete require --sync", file=sys.stderr)
+                return 2
+            unpack(args[0], args[1], sync='--sync' in opts,
+                   checksum='--checksum' in opts, delete='--delete' in opts)
             return 0
-        if cmd == 'unpack' and len(argv) == 3:
-            unpack(argv[1], argv[2])
+        if cmd == 'diff' and len(args) == 2 and opts <= {'--checksum'}:
+            changes = diff(args[0], args[1], checksum='--checksum' in opts)
+            for status, path in changes:
+                print(f"{status} {path}")
+            return 1 if changes else 0
+        if cmd == 'test' and len(args) == 1 and opts <= {'--jobs'}:
+            jobs = int(values['jobs']) if 'jobs' in values else None
+            checked, unprotected, errors = verify(args[0], jobs)
+            for err in errors:
+                print(f"BAD {err}")
+            print(f"checked: {checked}, without checksums: {unprotected}, errors: {len(errors)}")
+            return 1 if errors else 0
+        if cmd == 'serve' and len(args) == 1 and opts <= {'--host', '--port', '--workers'}:
+            spec = importlib.util.spec_from_file_location(
+                "otik_serve", Path(__file__).resolve().parent / "serve.py")
+            serve_mod = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(serve_mod)
+            serve_mod.serve(args[0], values.get('host', '127.0.0.1'), int(values.get('port', 8000)),
+                            int(values['workers']) if 'workers' in values else None)
             return 0
-        print("usage: n2.py pack <root_dir> <archive> | n2.py unpack <archive> <out_dir>", file=sys.stderr)
+        print(USAGE, file=sys.stderr)
         return 2
     except Exception as e:
         print(f"error: {e}", file=sys.stderr)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Коды Рида — Соломона RS(255, k) над GF(256) для защиты записей (protection = 2).
+
+Поле GF(256) — по примитивному многочлену x^8 + x^4 + x^3 + x^2 + 1 (0x11D),
+α = 2; умножение — по таблицам логарифмов и антилогарифмов (LOG/EXP).
+Порождающий многочлен g(x) = (x - α^0)(x - α^1)...(x - α^(nsym-1)), код
+систематический: кодовое слово — данные и nsym проверочных символов (остаток
+от деления data(x)·x^nsym на g(x)); исправляется до nsym / 2 ошибочных символов.
+
+Чередование (interleaving): данные записи режутся на полосы по k · depth байт,
+в полосе кодовое слово c — байты c, c + depth, c + 2·depth, ... Пакет ошибок
+длиной до depth · nsym / 2 байт портит в каждом слове не больше nsym / 2
+символов и исправляется целиком. Короткая полоса (хвост записи) берёт глубину
+ceil(длина / k): слова укорочены, недостающие старшие символы считаются нулями.
+
+Векторизация: строка i полосы (depth байт) — i-й символ всех слов сразу, так
+что регистр кодера — nsym целых по depth байт, умножение строки на константу —
+bytes.translate по таблице умножения MUL[c], сложение — XOR больших целых.
+Одна строка стоит nsym операций на C-уровне независимо от depth.
+
+Проверочные символы полосы хранятся так же построчно: nsym строк по depth байт.
+
+Синдромы: полоса кодируется заново, XOR с прочитанными проверочными символами
+даёт остаток R(x) каждого слова; R(α^j) = синдромы. Все остатки нулевые —
+ошибок нет, полный декодер (Берлекэмп — Мэсси, поиск Ченя, Форни) запускается
+только для слов с ненулевым остатком.
+"""
+from __future__ import annotations
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+N = 255            # длина кодового слова
+NSYM = 16          # проверочных символов по умолчанию: RS(255, 239), до 8 ошибок на слово
+DEPTH = 4096       # глубина чередования по умолчанию: полоса 239 · 4096 байт
+
+# --- арифметика GF(256) ---
+
+PRIM = 0x11D
+EXP = [0] * 512
+LOG = [0] * 256
+_x = 1
+for _i in range(255):
+    EXP[_i] = _x
+    LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= PRIM
+for _i in range(255, 512):
+    EXP[_i] = EXP[_i - 255]
+
+
+def gf_mul(a: int, b: int) -> int:
+    if a == 0 or b == 0:
+        return 0
+    return EXP[LOG[a] + LOG[b]]
+
+
+def gf_div(a: int, b: int) -> int:
+    if b == 0:
+        raise ZeroDivisionError("division by zero in GF(256)")
+    if a == 0:
+        return 0
+    return EXP[(LOG[a] - LOG[b]) % 255]
+
+
+# MUL[c] — таблица для bytes.translate: умножение каждого байта строки на c
+MUL = [bytes(gf_mul(c, v) for v in range(256)) for c in range(256)]
+
+_generators: dict = {}
+
+
+def generator(nsym: int) -> list:
+    """коэффициенты g(x), старший первый (g[0] = 1)."""
+    g = _generators.get(nsym)
+    if g is None:
+        g = [1]
+        for i in range(nsym):
+            r = [0] * (len(g) + 1)
+            for j, c in enumerate(g):
+                r[j] ^= c
+                r[j + 1] ^= gf_mul(c, EXP[i])
+            g = r
+        _generators[nsym] = g
+    return g
+
+
+# --- геометрия полос ---
+
+def check_params(nsym: int, depth: int) -> None:
+    if not 2 <= nsym <= 254 or nsym % 2:
+        raise ValueError(f"bad RS parity length: {nsym}")
+    if not 1 <= depth <= 0xFFFF:
+        raise ValueError(f"bad RS interleave depth: {depth}")
+
+
+def stripe_size(nsym: int = NSYM, depth: int = DEPTH) -> int:
+    """байт данных в полной полосе."""
+    return (N - nsym) * depth
+
+
+def stripe_depth(length: int, nsym: int = NSYM, depth: int = DEPTH) -> int:
+    """глубина чередования полосы из length байт (короткие полосы — мельче)."""
+    k = N - nsym
+    return min(depth, (length + k - 1) // k)
+
+
+def parity_size(size: int, nsym: int = NSYM, depth: int = DEPTH) -> int:
+    """байт проверочных символов для записи из size байт."""
+    full, rest = divmod(size, stripe_size(nsym, depth))
+    return nsym * (full * depth + stripe_depth(rest, nsym, depth))
+
+
+# --- кодирование ---
+
+def _remainder(data, d: int, nsym: int) -> list:
+    """остатки всех d слов полосы: nsym целых по d байт (старший символ первый)."""
+    tables = [MUL[c] for c in generator(nsym)[1:]]
+    from_bytes = int.from_bytes
+    reg = [0] * nsym
+    zero = [0]
+    for pos in range(0, len(data), d):
+        row = data[pos:pos + d]
+        fb = (from_bytes(row, 'little') ^ reg[0]).to_bytes(d, 'little')
+        reg = [r ^ from_bytes(fb.translate(t), 'little') for r, t in zip(reg[1:] + zero, tables)]
+    return reg
+
+
+def _rows(data, d: int) -> bytes:
+    """данные полосы, дополненные нулями до целого числа строк."""
+    return bytes(data) + bytes(-len(data) % d)
+
+
+def encode_stripe(data, nsym: int = NSYM, depth: int = DEPTH) -> bytes:
+    """проверочные символы одной полосы: nsym строк по stripe_depth байт."""
+    if not data:
+        return b""
+    d = stripe_depth(len(data), nsym, depth)
+    reg = _remainder(_rows(data, d), d, nsym)
+    return b"".join(r.to_bytes(d, 'little') for r in reg)
+
+
+def _map(fn, args, workers):
+    """fn по полосам по порядку: в процессах, если их больше одного и модуль доступен по имени."""
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(args))
+    if workers <= 1 or sys.modules.get(__name__) is None:
+        return [fn(*a) for a in args]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, *zip(*args)))
+
+
+def encode(data, nsym: int = NSYM, depth: int = DEPTH, workers: int | None = None) -> bytes:
+    """проверочные символы всех полос data подряд."""
+    check_params(nsym, depth)
+    size = stripe_size(nsym, depth)
+    args = [(data[i:i + size], nsym, depth) for i in range(0, len(data), size)]
+    return b"".join(_map(encode_stripe, args, workers))
+
+
+# --- декодирование ---
+
+def _poly_eval(p: list, x: int) -> int:
+    """значение многочлена (младший коэффициент первый) в точке x."""
+    y = 0
+    for c in reversed(p):
+        y = gf_mul(y, x) ^ c
+    return y
+
+
+def _berlekamp_massey(synd: list) -> list:
+    """многочлен локаторов ошибок Λ(x), младший коэффициент первый."""
+    lam = [1]
+    prev = [1]
+    length = 0
+    shift = 1
+    b = 1
+    for n in range(len(synd)):
+        d = synd[n]
+        for i in range(1, length + 1):
+            if i < len(lam):
+                d ^= gf_mul(lam[i], synd[n - i])
+        if d == 0:
+            shift += 1
+            continue
+        coef = gf_div(d, b)
+        upd = [0] * shift + [gf_mul(coef, c) for c in prev]
+        new = [(lam[i] if i < len(lam) else 0) ^ (upd[i] if i < len(upd) else 0)
+               for i in range(max(len(lam), len(upd)))]
+        if 2 * length <= n:
+            prev = lam
+            length = n + 1 - length
+            b = d
+            shift = 1
+        else:
+            shift += 1
+        lam = new
+    while len(lam) > 1 and lam[-1] == 0:
+        lam.pop()
+    return lam
+
+
+def correct_word(rem: list, n: int) -> list:
+    """ошибки слова длины n по его остатку rem (nsym символов, старший первый).
+
+    Возвращает [(индекс символа в слове, величина ошибки)]; индекс 0 — первый
+    символ данных. ValueError — если ошибок больше, чем код может исправить.
+    """
+    nsym = len(rem)
+    # синдромы S_j = R(α^j)
+    synd = []
+    for j in range(nsym):
+        s = 0
+        x = EXP[j]
+        for c in rem:
+            s = gf_mul(s, x) ^ c
+        synd.append(s)
+    lam = _berlekamp_massey(synd)
+    nerr = len(lam) - 1
+    if 2 * nerr > nsym:
+        raise ValueError("too many errors")
+    # Ω(x) = S(x)Λ(x) mod x^nsym; Λ'(x) — формальная производная (нечётные степени)
+    omega = [0] * nsym
+    for i, a in enumerate(synd):
+        for j, b in enumerate(lam):
+            if i + j < nsym:
+                omega[i + j] ^= gf_mul(a, b)
+    deriv = [lam[i] if i % 2 else 0 for i in range(1, len(lam))]
+    errors = []
+    for i in range(n):
+        power = n - 1 - i
+        x_inv = EXP[(255 - power) % 255]
+        if _poly_eval(lam, x_inv) != 0:
+            continue
+        # Форни (первый корень g — α^0): e = X · Ω(X⁻¹) / Λ'(X⁻¹)
+        den = _poly_eval(deriv, x_inv)
+        if den == 0:
+            raise ValueError("error locator has a multiple root")
+        errors.append((i, gf_mul(EXP[power], gf_div(_poly_eval(omega, x_inv), den))))
+    if len(errors) != nerr:
+        raise ValueError("error locator roots not found")
+    return errors
+
+
+def correct_stripe(data, parity, nsym: int = NSYM, depth: int = DEPTH):
+    """исправить полосу по её проверочным символам.
+
+    Возвращает (исправленные данные, число исправленных символов); 0 — все
+    остатки нулевые, данные совпадают с кодом без декодирования слов.
+    ValueError — если исправить нельзя.
+    """
+    length = len(data)
+    d = stripe_depth(length, nsym, depth)
+    if len(parity) != nsym * d:
+        raise ValueError("short RS parity")
+    rows = _rows(data, d)
+    reg = _remainder(rows, d, nsym)
+    from_bytes = int.from_bytes
+    syn = [r ^ from_bytes(parity[j * d:(j + 1) * d], 'little') for j, r in enumerate(reg)]
+    any_err = 0
+    for s in syn:
+        any_err |= s
+    if not any_err:
+        return bytes(data), 0
+
+    syn_bytes = [s.to_bytes(d, 'little') for s in syn]
+    n = len(rows) // d + nsym
+    out = bytearray(rows)
+    fixed = 0
+    for c, v in enumerate(any_err.to_bytes(d, 'little')):
+        if not v:
+            continue
+        for i, mag in correct_word([s[c] for s in syn_bytes], n):
+            if i >= n - nsym:
+                fixed += 1  # ошибка в проверочном символе: данные целы
+                continue
+            pos = c + i * d
+            if pos >= length:
+                raise ValueError("error located in padding")
+            out[pos] ^= mag
+            fixed += 1
+    return bytes(out[:length]), fixed
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+HTTP-сервер, отдающий файлы прямо из архива Л3.№2 (без распаковки).
+
+CLI
+    serve <archive> [--host=127.0.0.1] [--port=8000] [--workers=N]
+
+- Один процесс, asyncio: тысячи одновременных соединений, keep-alive (HTTP/1.1).
+- Путь запроса ищется по индексу TOC (словарь путь -> запись), а не перебором.
+- Несжатые записи отдаются через loop.sendfile (os.sendfile) прямо с data_offset
+  архива; если нативный sendfile недоступен — срезами mmap.
+- Range: bytes=a-b / a- / -n (один диапазон) -> 206 и Content-Range, смещения
+  переводятся в смещения payload записи; неудовлетворимый диапазон -> 416.
+- Сжатые записи декодируются в пуле потоков (event loop не блокируется),
+  результат берётся из LRU-кэша OtikArchive.
+- По умолчанию слушает только 127.0.0.1.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import mimetypes
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from typing import Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+archive_mod = load_module("otik_archive", os.path.join(base_dir, "archive.py"))
+
+MAX_HEAD = 16 * 1024        # предел размера строки запроса + заголовков
+SEND_CHUNK = 256 * 1024     # кусок записи в запасном пути (без sendfile)
+
+REASONS = {
+    200: "OK",
+    206: "Partial Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    416: "Range Not Satisfiable",
+    500: "Internal Server Error",
+}
+
+
+def parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """разобрать заголовок Range для ресурса длиной size.
+
+    Возвращает (start, end) включительно; None — диапазон не задан или не
+    поддерживается (несколько диапазонов) и отдаётся весь ресурс;
+    ValueError — диапазон неудовлетворим (416).
+    """
+    unit, _, spec = value.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, dash, last = spec.strip().partition('-')
+    if not dash:
+        return None
+    try:
+        if first == '':
+            # суффикс: последние n байт
+            n = int(last)
+            if n <= 0 or size == 0:
+                raise ValueError("unsatisfiable range")
+            return max(0, size - n), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        raise ValueError("unsatisfiable range") from None
+    if start >= size or end < start:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+class ArchiveServer:
+    """обработчик соединений; один экземпляр на открытый архив."""
+
+    def __init__(self, archive_path: str, workers: Optional[int] = None):
+        self.arc = archive_mod.OtikArchive(archive_path)
+        self.arc.getinfo('')  # строим индекс путей заранее
+        self._file = open(archive_path, 'rb')
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._native_sendfile = hasattr(os, 'sendfile')
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+        self._file.close()
+        self.arc.close()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send_error(writer, 400, keep_alive=False)
+                    break
+                keep_alive = await self._handle_request(head, reader, writer)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _handle_request(self, head: bytes, reader, writer) -> bool:
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            await self._send_error(writer, 400, keep_alive=False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                k, v = line.split(':', 1)
+                headers[k.strip().lower()] = v.strip()
+
+        conn = headers.get('connection', '').lower()
+        keep_alive = conn != 'close' if version == 'HTTP/1.1' else conn == 'keep-alive'
+
+        # тело запроса нам не нужно, но его нужно дочитать для keep-alive
+        body_len = headers.get('content-length')
+        if body_len:
+            try:
+                await reader.readexactly(int(body_len))
+            except (ValueError, asyncio.IncompleteReadError):
+                await self._send_error(writer, 400, keep_alive=False)
+                return False
+
+        if method not in ('GET', 'HEAD'):
+            await self._send_error(writer, 405, keep_alive, extra={'Allow': 'GET, HEAD'})
+            return keep_alive
+
+        path = unquote(urlsplit(target).path).lstrip('/')
+        try:
+            e = self.arc.getinfo(path)
+        except KeyError:
+            e = None
+        if e is None or e['is_dir']:
+            await self._send_error(writer, 404, keep_alive)
+            return keep_alive
+
+        size = e['original_size']
+        try:
+            rng = parse_range(headers['range'], size) if 'range' in headers else None
+        except ValueError:
+            await self._send_error(writer, 416, keep_alive,
+                                   extra={'Content-Range': f"bytes */{size}"})
+            return keep_alive
+        start, end = rng if rng else (0, size - 1)
+        length = end - start + 1 if size else 0
+
+        resp = {
+            'Content-Type': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            'Content-Length': str(length),
+            'Accept-Ranges': 'bytes',
+            'Last-Modified': formatdate(e['mtime'], usegmt=True),
+        }
+        if rng:
+            resp['Content-Range'] = f"bytes {start}-{end}/{size}"
+        self._write_head(writer, 206 if rng else 200, resp, keep_alive)
+        if method == 'HEAD' or length == 0:
+            await writer.drain()
+            return keep_alive
+
+        if archive_mod.n2.is_coded(e):
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(self._pool, self.arc.view, path)
+            try:
+                await self._write_view(writer, data[start:end + 1])
+            finally:
+                data.release()
+        else:
+            await self._send_stored(writer, e['data_offset'] + start, length)
+        return keep_alive
+
+    async def _send_stored(self, writer, offset: int, count: int) -> None:
+        """отдать count байт архива с offset: sendfile или срезы mmap."""
+        if self._native_sendfile:
+            await writer.drain()
+            loop = asyncio.get_running_loop()
+            try:
+                # явное смещение: общая позиция файла между соединениями не используется
+                await loop.sendfile(writer.transport, self._file, offset, count, fallback=False)
+                return
+            except (asyncio.SendfileNotAvailableError, NotImplementedError):
+                self._native_sendfile = False
+        view = memoryview(self.arc._mm)[offset:offset + count]
+        try:
+            await self._write_view(writer, view)
+        finally:
+            view.release()
+
+    @staticmethod
+    async def _write_view(writer, view: memoryview) -> None:
+        for pos in range(0, len(view), SEND_CHUNK):
+            writer.write(bytes(view[pos:pos + SEND_CHUNK]))
+            await writer.drain()
+
+    @staticmethod
+    def _write_head(writer, status: int, headers: dict, keep_alive: bool) -> None:
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+        headers = dict(headers)
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+
+    async def _send_error(self, writer, status: int, keep_alive: bool, extra: dict = None) -> None:
+        body = f"{status} {REASONS[status]}\n".encode()
+        headers = {'Content-Type': 'text/plain; charset=utf-8', 'Content-Length': str(len(body))}
+        headers.update(extra or {})
+        self._write_head(writer, status, headers, keep_alive)
+        writer.write(body)
+        await writer.drain()
+
+
+async def _serve_forever(archive_path: str, host: str, port: int, workers: Optional[int]) -> None:
+    server = ArchiveServer(archive_path, workers)
+    try:
+        srv = await asyncio.start_server(server.handle, host, port, backlog=4096, limit=MAX_HEAD)
+        addrs = ", ".join(str(s.getsockname()) for s in srv.sockets)
+        print(f"serving {archive_path} on {addrs}", file=sys.stderr)
+        async with srv:
+            await srv.serve_forever()
+    finally:
+        server.close()
+
+
+def serve(archive_path: str, host: str = '127.0.0.1', port: int = 8000,
+          workers: Optional[int] = None) -> None:
+    """запустить сервер (блокирует до Ctrl+C)."""
+    try:
+        asyncio.run(_serve_forever(archive_path, host, port, workers))
+    except KeyboardInterrupt:
+        pass
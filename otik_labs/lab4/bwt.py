@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Блочная сортировка: BWT + MTF + RLE нулей + энтропийное кодирование — алгоритм 9
+
+Контекстная стадия для текстов (как в bzip2): данные режутся на блоки, каждый
+блок переставляется преобразованием Барроуза-Уилера (байты с похожим правым
+контекстом оказываются рядом), затем move-to-front превращает повторы в малые
+числа, серии нулей MTF сжимаются RLE, и результат сжимается кодеком Л4
+(по умолчанию Хаффманом из n1.py).
+
+Суффиксный массив строится удвоением префиксов (Larsson-Sadakane): начальная
+сортировка по первым 8 байтам, затем на каждом шаге пересортировываются только
+ещё не разделённые группы по рангу суффикса через h позиций; O(n log n) без
+сортировки вращений. Конец блока — виртуальный символ меньше любого байта.
+
+Обратное BWT — через массив LF: LF[i] — строка, в которую переходит строка i
+при сдвиге на символ влево; блок восстанавливается с конца.
+
+MTF + RLE (алфавит байтовый, в отличие от 258 символов bzip2):
+  0, 1        — RUNA, RUNB: длина серии нулей MTF в биективной двоичной записи
+  2..254      — ранг MTF 1..253 (ранг + 1)
+  255, байт r — ранг MTF 254 + r
+
+Блоки независимы и кодируются/декодируются параллельно в процессах (--workers).
+Функции блоков процессы находят по имени модуля, поэтому пул используется, только
+если модуль есть в sys.modules (запуск скриптом или загрузка с регистрацией,
+как load_shared в n1.py); иначе блоки обрабатываются по очереди.
+
+В архиве Л3.№2 эта стадия — comp_ctx = 2, потоки сжимаются кодеком comp_nctx.
+
+Формат payload (всё после заголовка Л4 / данные записи Л3.№2):
+  uint32 число блоков
+  на каждый блок: uint32 длина блока, uint32 primary (строка с концом блока),
+    uint8 способ (0 — как есть, 1 — кодек), uint32 длина потока MTF/RLE,
+    uint32 длина сохранённого, затем сохранённые байты
+
+Формат архива алгоритма 9: заголовок Л4 (16 байт, алгоритм 9) + payload
+(поток сжимается Хаффманом n1.py).
+
+CLI:
+  encode <input> <archive> [--level=1..9] [--block=BYTES] [--workers=N]
+  decode <archive> <output> [--workers=N]
+  bench <file1> [<file2> ...]   — размер и время по стадиям
+
+--level=N — блок N * 100 000 байт (как в bzip2), --block — любой размер до 8 МБ.
+"""
+from __future__ import annotations
+import os
+import re
+import struct
+import sys
+import time
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+
+SIGNATURE = b"SOBSTV"
+VERSION = 0
+ALGORITHM = 9  # BWT + MTF + RLE + Хаффман
+
+HEADER_FMT = "<6sHBxxxxxxx"
+HEADER_SIZE = 16
+
+LEVEL_BLOCK = 100_000
+DEFAULT_LEVEL = 9
+MAX_BLOCK = 8 << 20
+PREFIX = 8  # по скольким байтам суффиксы сортируются сразу
+
+RUNA, RUNB = 0, 1
+ESCAPE = 255
+
+BLOCK_HDR_FMT = "<IIBII"
+BLOCK_HDR_SIZE = struct.calcsize(BLOCK_HDR_FMT)
+STORED, CODED = 0, 1
+
+_RUNS = re.compile(rb"(.)\1*", re.S)
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+huffman_codec = load_module("huffman_codec", os.path.join(base_dir, "n1.py"))
+
+
+# --- BWT ---
+
+def suffix_array(data):
+    """индексы суффиксов data в порядке возрастания (конец меньше любого байта)."""
+    n = len(data)
+    if n == 0:
+        return []
+    # начальные ключи: первые PREFIX байт, дополненные нулями, и сколько из них настоящих
+    pad = bytes(data) + bytes(PREFIX)
+    shift = PREFIX.bit_length()
+    keys = [(int.from_bytes(pad[i:i + PREFIX], "big") << shift) | min(PREFIX, n - i) for i in range(n)]
+    sa = sorted(range(n), key=keys.__getitem__)
+    ks = list(map(keys.__getitem__, sa))
+    slots = range(n)  # места в sa, ключи которых лежат в ks
+    rank = [0] * n
+    h = PREFIX
+    while True:
+        # ранг суффикса — 1 + место начала его группы в sa (0 — конец данных);
+        # у разделённых групп ранг больше не меняется
+        active = []
+        prev = None
+        start = 0
+        m = len(ks)
+        for t in range(m):
+            k = ks[t]
+            j = slots[t]
+            if k != prev:
+                start = j + 1
+                prev = k
+                if t + 1 < m and ks[t + 1] == k:
+                    active.append(t)
+            else:
+                active.append(t)
+            rank[sa[j]] = start
+        if not active:
+            return sa
+        # пересортировать только неразделённые группы по (ранг, ранг через h)
+        slots = [slots[t] for t in active]
+        pos = [sa[j] for j in slots]
+        base = n + 1
+        keys = [rank[i] * base + (rank[i + h] if i + h < n else 0) for i in pos]
+        order = sorted(range(len(pos)), key=keys.__getitem__)
+        for j, t in zip(slots, order):
+            sa[j] = pos[t]
+        ks = [keys[t] for t in order]
+        h <<= 1
+
+
+def bwt(block):
+    """(последний столбец без символа конца, primary — его строка)."""
+    n = len(block)
+    if n == 0:
+        return b"", 0
+    sa = suffix_array(block)
+    # строка 0 — пустой суффикс, перед ним последний байт блока
+    last = bytes(map(block.__getitem__, [i - 1 for i in sa]))
+    j = sa.index(0)
+    return block[-1:] + last[:j] + last[j + 1:], j + 1
+
+
+def inverse_bwt(last, primary):
+    """восстановить блок по последнему столбцу и primary (массив LF)."""
+    n = len(last)
+    if n == 0:
+        return b""
+    if not 0 < primary <= n:
+        raise ValueError(f"bad BWT primary index: {primary}")
+    # последний столбец полностью; символ конца (-1) меньше любого байта
+    column = list(last[:primary]) + [-1] + list(last[primary:])
+    # устойчивая сортировка столбца — первый столбец; LF переводит место в последнем
+    # столбце в место того же символа в первом
+    order = sorted(range(n + 1), key=column.__getitem__)
+    lf = [0] * (n + 1)
+    list(map(lf.__setitem__, order, range(n + 1)))
+    out = bytearray(n)
+    row = 0
+    for k in range(n - 1, -1, -1):
+        out[k] = column[row]
+        row = lf[row]
+    if row != primary:
+        raise ValueError("corrupted BWT block")
+    return bytes(out)
+
+
+# --- MTF + RLE ---
+
+def _put_run(out, run):
+    # биективная двоичная запись: RUNA — 1, RUNB — 2 в текущем разряде
+    while run:
+        if run & 1:
+            out.append(RUNA)
+            run = (run - 1) >> 1
+        else:
+            out.append(RUNB)
+            run = (run - 2) >> 1
+
+
+def mtf_rle(last):
+    """move-to-front + RLE серий нулей в байтовый поток."""
+    table = bytearray(range(256))
+    out = bytearray()
+    zeros = 0
+    # серия одинаковых байт — один сдвиг MTF и (длина - 1) нулей
+    for m in _RUNS.finditer(last):
+        c = last[m.start()]
+        length = m.end() - m.start()
+        r = table.index(c)
+        if r == 0:
+            zeros += length
+            continue
+        _put_run(out, zeros)
+        if r < ESCAPE - 1:
+            out.append(r + 1)
+        else:
+            out.append(ESCAPE)
+            out.append(r - (ESCAPE - 1))
+        del table[r]
+        table.insert(0, c)
+        zeros = length - 1
+    _put_run(out, zeros)
+    return bytes(out)
+
+
+def unmtf_rle(stream, n):
+    """обратное к mtf_rle: n байт последнего столбца."""
+    table = bytearray(range(256))
+    out = bytearray()
+    run = 0
+    weight = 1
+    i = 0
+    size = len(stream)
+    while i < size:
+        s = stream[i]
+        i += 1
+        if s <= RUNB:
+            run += weight << s
+            weight <<= 1
+            continue
+        if run:
+            out += table[0:1] * run
+            run = 0
+            weight = 1
+        if s == ESCAPE:
+            if i >= size:
+                raise ValueError("short MTF escape")
+            r = ESCAPE - 1 + stream[i]
+            i += 1
+            if r > 255:
+                raise ValueError(f"bad MTF rank: {r}")
+        else:
+            r = s - 1
+        c = table[r]
+        del table[r]
+        table.insert(0, c)
+        out.append(c)
+    if run:
+        out += table[0:1] * run
+    if len(out) != n:
+        raise ValueError("BWT block size mismatch")
+    return bytes(out)
+
+
+# --- блоки ---
+
+_entropy_modules = {}
+
+
+def _entropy(path):
+    """кодек Л4 по пути к файлу (в процессах-вычислителях модули не передаются)."""
+    if path is None:
+        return None
+    if path not in _entropy_modules:
+        _entropy_modules[path] = load_module(f"bwt_entropy_{len(_entropy_modules)}", path)
+    return _entropy_modules[path]
+
+
+def _encode_block(block, entropy_path):
+    last, primary = bwt(block)
+    stream = mtf_rle(last)
+    method, stored = STORED, stream
+    entropy = _entropy(entropy_path)
+    if entropy is not None and stream:
+        coded = entropy.encode_payload(stream)
+        if len(coded) < len(stream):
+            method, stored = CODED, coded
+    return struct.pack(BLOCK_HDR_FMT, len(block), primary, method, len(stream), len(stored)) + stored
+
+
+def _decode_block(n, primary, method, stream_len, stored, entropy_path):
+    if method == STORED:
+        stream = stored
+    elif method == CODED:
+        entropy = _entropy(entropy_path)
+        if entropy is None:
+            raise ValueError("BWT block is entropy-coded, but no codec given")
+        stream = entropy.decode_payload(stored, stream_len)
+    else:
+        raise ValueError(f"bad BWT block method: {method}")
+    if len(stream) != stream_len:
+        raise ValueError("BWT stream size mismatch")
+    return inverse_bwt(unmtf_rle(stream, n), primary)
+
+
+def _map_blocks(fn, args, workers):
+    """fn по блокам по порядку: в процессах, если их больше одного и модуль доступен по имени."""
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(args))
+    if workers <= 1 or sys.modules.get(__name__) is None:
+        return [fn(*a) for a in args]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, *zip(*args)))
+
+
+def block_size(level=DEFAULT_LEVEL, block=None):
+    if block is None:
+        if not 1 <= level <= 9:
+            raise ValueError(f"unknown level: {level}")
+        block = level * LEVEL_BLOCK
+    if not 0 < block <= MAX_BLOCK:
+        raise ValueError(f"block size must be in 1..{MAX_BLOCK}: {block}")
+    return block
+
+
+def encode_payload(data, level=DEFAULT_LEVEL, entropy=huffman_codec, block=None, workers=None):
+    """Сжать данные в памяти: блоки BWT + MTF/RLE, потоки сжаты кодеком entropy."""
+    size = block_size(level, block)
+    path = entropy.__file__ if entropy is not None else None
+    args = [(data[i:i + size], path) for i in range(0, len(data), size)]
+    return struct.pack("<I", len(args)) + b"".join(_map_blocks(_encode_block, args, workers))
+
+
+def decode_payload(payload, n, entropy=huffman_codec, workers=None):
+    """Распаковать n байт из payload блочной сортировки."""
+    if len(payload) < 4:
+        raise ValueError("short BWT payload")
+    count = struct.unpack_from("<I", payload)[0]
+    path = entropy.__file__ if entropy is not None else None
+    pos = 4
+    args = []
+    for _ in range(count):
+        if pos + BLOCK_HDR_SIZE > len(payload):
+            raise ValueError("short BWT block header")
+        size, primary, method, stream_len, stored_len = struct.unpack_from(BLOCK_HDR_FMT, payload, pos)
+        pos += BLOCK_HDR_SIZE
+        stored = bytes(payload[pos:pos + stored_len])
+        if len(stored) != stored_len:
+            raise ValueError("short BWT block")
+        pos += stored_len
+        args.append((size, primary, method, stream_len, stored, path))
+    data = b"".join(_map_blocks(_decode_block, args, workers))
+    if len(data) != n:
+        raise ValueError("BWT data size mismatch")
+    return data
+
+
+def encode(input_path: str, archive_path: str, level=DEFAULT_LEVEL, block=None, workers=None):
+    """Сжать файл: BWT + MTF + RLE + Хаффман."""
+    with open(input_path, "rb") as f:
+        data = f.read()
+
+    n = len(data)
+    payload = encode_payload(data, level, block=block, workers=workers)
+    with open(archive_path, "wb") as f:
+        header = struct.pack(HEADER_FMT, SIGNATURE, VERSION, ALGORITHM)
+        header = header[:9] + struct.pack("<Q", n)[:7]
+        f.write(header)
+        f.write(payload)
+
+def decode(archive_path: str, output_path: str, workers=None):
+    """Распаковать файл, сжатый BWT + MTF + RLE + Хаффман."""
+    with open(archive_path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("short header")
+
+        sig = header[:6]
+        ver = struct.unpack("<H", header[6:8])[0]
+        alg = header[8]
+
+        if sig != SIGNATURE:
+            raise ValueError("bad signature")
+        if ver != VERSION:
+            raise ValueError(f"unsupported version: {ver}")
+        if alg != ALGORITHM:
+            raise ValueError(f"wrong algorithm: {alg}")
+
+        n = struct.unpack("<Q", header[9:16] + b"\x00")[0]
+        payload = f.read()
+
+    data = decode_payload(payload, n, workers=workers)
+    with open(output_path, "wb") as f:
+        f.write(data)
+
+def bench(paths, level=DEFAULT_LEVEL):
+    """размер и время по стадиям на первом блоке (суффиксный массив, MTF/RLE, Хаффман,
+    обратное BWT) и время кодирования всего файла в одном процессе и в пуле."""
+    print(f"{'file':<24} {'n':>9} {'payload':>9} {'ratio':>6} {'SA s':>6} {'MTF s':>6}"
+          f" {'n1 s':>6} {'iBWT s':>7} {'1 proc s':>9} {'N proc s':>9}")
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        n = len(data)
+        block = data[:block_size(level)]
+        t0 = time.perf_counter()
+        last, primary = bwt(block)
+        t1 = time.perf_counter()
+        stream = mtf_rle(last)
+        t2 = time.perf_counter()
+        huffman_codec.encode_payload(stream)
+        t3 = time.perf_counter()
+        if inverse_bwt(unmtf_rle(stream, len(block)), primary) != block:
+            raise ValueError(f"round trip failed: {path}")
+        t4 = time.perf_counter()
+        payload = encode_payload(data, level, workers=1)
+        t5 = time.perf_counter()
+        parallel = encode_payload(data, level)
+        t6 = time.perf_counter()
+        if parallel != payload or decode_payload(payload, n) != data:
+            raise ValueError(f"round trip failed: {path}")
+        print(f"{os.path.basename(path)[:24]:<24} {n:>9} {len(payload):>9} {len(payload) / max(n, 1):>6.3f}"
+              f" {t1 - t0:>6.2f} {t2 - t1:>6.2f} {t3 - t2:>6.2f} {t4 - t3:>7.2f} {t5 - t4:>9.2f} {t6 - t5:>9.2f}")
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "bench":
+        bench(argv[1:])
+        return 0
+    if len(argv) < 3:
+        print("usage: bwt.py encode <input> <archive> [--level=1..9] [--block=BYTES] [--workers=N]"
+              " | bwt.py decode <archive> <output> [--workers=N] | bwt.py bench <file>...", file=sys.stderr)
+        return 2
+
+    cmd = argv[0]
+    try:
+        level = DEFAULT_LEVEL
+        block = None
+        workers = None
+        for arg in argv[3:]:
+            if arg.startswith("--level="):
+                level = int(arg.split("=", 1)[1])
+            elif arg.startswith("--block="):
+                block = int(arg.split("=", 1)[1])
+            elif arg.startswith("--workers="):
+                workers = int(arg.split("=", 1)[1])
+        if cmd == "encode":
+            encode(argv[1], argv[2], level, block, workers)
+            return 0
+        elif cmd == "decode":
+            decode(argv[1], argv[2], workers)
+            return 0
+        else:
+            return 2
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Хаффман с контекстом 1-го порядка — алгоритм 4
+
+Модель та же, что в lab2/lab2_4.py (I_CM1): вероятность байта зависит от
+предыдущего байта. Для каждого частого контекста (предыдущего байта) хранится
+своя таблица частот и свой код Хаффмана; редкие контексты объединяются в общую
+запасную таблицу, чтобы таблицы не стоили дороже выигрыша. Контекст первого
+байта — 0.
+
+Контекст получает свою таблицу, если по оценке она окупается: выигрыш в битах
+по сравнению с кодом порядка 0 больше размера таблицы.
+
+Формат архива:
+  Заголовок (16 байт):
+    0..5  : сигнатура b"SOBSTV" (6 байт)
+    6-7   : версия формата uint16 = 0
+    8     : код алгоритма uint8 = 4 (Хаффман, контекст 1-го порядка)
+    9..15 : исходная длина n (uint64) - 7 байт
+  Битовая карта контекстов (32 байта): бит c (младший бит байта c // 8 — первый)
+    установлен, если у контекста c своя таблица
+  Таблицы: сначала запасная, затем свои таблицы контекстов по возрастанию c.
+    Каждая таблица — нормализованные частоты 0..255 (как в n1.py):
+      m <= 127 ненулевых: uint8 m, затем m пар (символ uint8, частота uint8)
+      иначе             : uint8 0xFF, затем 256 частот
+  Сжатые данные: коды Хаффмана по таблице контекста, старший бит первый
+
+Коды и таблицы декодирования берутся из общего кэша (tablecache.py) —
+одинаковые таблицы контекстов строятся один раз.
+
+CLI:
+  encode <input> <archive>
+  decode <archive> <output>
+"""
+from __future__ import annotations
+import os
+import struct
+import sys
+import importlib.util
+
+SIGNATURE = b"SOBSTV"
+VERSION = 0
+ALGORITHM = 4  # Хаффман, контекст 1-го порядка
+
+HEADER_FMT = "<6sHBxxxxxxx"
+HEADER_SIZE = 16
+BITMAP_SIZE = 32
+FULL_TABLE = 0xFF
+CHUNK = 64 * 1024
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+huffman_codec = load_module("huffman_codec", os.path.join(base_dir, "n1.py"))
+histogram = huffman_codec.histogram
+
+
+def count_pairs(data):
+    """частоты пар (предыдущий байт, байт): 256 списков по 256."""
+    # первый байт — в контексте 0
+    pairs = histogram.pair_counts(b"\x00" + data)
+    return [pairs[prev * 256:(prev + 1) * 256] for prev in range(256)]
+
+
+def pack_table(freqs):
+    """компактная запись таблицы частот (разреженная, если ненулевых мало)."""
+    nz = [(s, f) for s, f in enumerate(freqs) if f]
+    if len(nz) <= 127:
+        out = bytearray([len(nz)])
+        for s, f in nz:
+            out += bytes((s, f))
+        return bytes(out)
+    return bytes([FULL_TABLE]) + bytes(freqs)
+
+
+def unpack_table(buf, pos):
+    """прочитать таблицу с позиции pos: (частоты, новая позиция)."""
+    if pos >= len(buf):
+        raise ValueError("short context table")
+    m = buf[pos]
+    pos += 1
+    if m == FULL_TABLE:
+        if pos + 256 > len(buf):
+            raise ValueError("short context table")
+        return list(buf[pos:pos + 256]), pos + 256
+    if pos + 2 * m > len(buf):
+        raise ValueError("short context table")
+    freqs = [0] * 256
+    for i in range(m):
+        freqs[buf[pos + 2 * i]] = buf[pos + 2 * i + 1]
+    return freqs, pos + 2 * m
+
+
+def _code_bits(codes, counts):
+    return sum(len(codes[s]) * c for s, c in enumerate(counts) if c)
+
+
+def build_model(counts):
+    """выбрать контексты со своими таблицами.
+
+    Возвращает (own, fallback): own — {контекст: частоты}, fallback — частоты
+    запасной таблицы (сумма редких контекстов).
+    """
+    totals = [sum(row) for row in counts]
+    order0 = [sum(counts[c][s] for c in range(256)) for s in range(256)]
+    order0_codes = huffman_codec.code_table(
+        huffman_codec.normalize_freqs(order0, sum(totals))).codes
+
+    own = {}
+    merged = [0] * 256
+    for ctx in range(256):
+        row = counts[ctx]
+        if not totals[ctx]:
+            continue
+        freqs = huffman_codec.normalize_freqs(row, totals[ctx])
+        codes = huffman_codec.code_table(freqs).codes
+        gain = _code_bits(order0_codes, row) - _code_bits(codes, row)
+        if gain > 8 * len(pack_table(freqs)):
+            own[ctx] = freqs
+        else:
+            for s in range(256):
+                merged[s] += row[s]
+    fallback = huffman_codec.normalize_freqs(merged, sum(merged))
+    return own, fallback
+
+
+def estimate_size(data):
+    """размер архива алгоритма 4 в байтах без кодирования (заголовок включён)."""
+    counts = count_pairs(data)
+    own, fallback = build_model(counts)
+    fallback_codes = huffman_codec.code_table(fallback).codes
+    size = BITMAP_SIZE + len(pack_table(fallback))
+    bits = 0
+    for ctx in range(256):
+        if ctx in own:
+            size += len(pack_table(own[ctx]))
+            bits += _code_bits(huffman_codec.code_table(own[ctx]).codes, counts[ctx])
+        elif any(counts[ctx]):
+            bits += _code_bits(fallback_codes, counts[ctx])
+    return HEADER_SIZE + size + (bits + 7) // 8
+
+
+def encode_payload(data):
+    """Сжать данные в памяти: карта контекстов + таблицы + сжатые биты."""
+    own, fallback = build_model(count_pairs(data))
+
+    bitmap = bytearray(BITMAP_SIZE)
+    tables = bytearray(pack_table(fallback))
+    for ctx in sorted(own):
+        bitmap[ctx >> 3] |= 1 << (ctx & 7)
+        tables += pack_table(own[ctx])
+
+    # плоская таблица кодов: (контекст << 8) | байт -> код
+    fallback_codes = huffman_codec.code_table(fallback).codes
+    flat = [""] * 65536
+    for ctx in range(256):
+        codes = huffman_codec.code_table(own[ctx]).codes if ctx in own else fallback_codes
+        base = ctx << 8
+        for s, code in codes.items():
+            flat[base | s] = code
+
+    out = bytearray(bitmap + tables)
+    nbits = 0
+    pending = 0
+    prev = 0
+    for pos in range(0, len(data), CHUNK):
+        chunk = data[pos:pos + CHUNK]
+        bits = "".join([flat[(p << 8) | b] for p, b in zip(bytes([prev]) + chunk[:-1], chunk)])
+        prev = chunk[-1]
+        # склейка кусков по границе, не кратной байту
+        value = (pending << len(bits)) | (int(bits, 2) if bits else 0)
+        nbits += len(bits)
+        whole = nbits // 8
+        rest = nbits - whole * 8
+        out += (value >> rest).to_bytes(whole, "big")
+        pending = value & ((1 << rest) - 1)
+        nbits = rest
+    if nbits:
+        out.append((pending << (8 - nbits)) & 0xFF)
+    return bytes(out)
+
+
+def read_model(payload):
+    """разобрать карту и таблицы: (таблица декодирования для каждого контекста, позиция данных)."""
+    if len(payload) < BITMAP_SIZE:
+        raise ValueError("short context bitmap")
+    bitmap = payload[:BITMAP_SIZE]
+    fallback, pos = unpack_table(payload, BITMAP_SIZE)
+    fallback_table = huffman_codec.code_table(fallback)
+    tables = [fallback_table] * 256
+    for ctx in range(256):
+        if bitmap[ctx >> 3] & (1 << (ctx & 7)):
+            freqs, pos = unpack_table(payload, pos)
+            tables[ctx] = huffman_codec.code_table(freqs)
+    return [t.decoder for t in tables], pos
+
+
+class ContextDecoder:
+    """потоковый декодер: куски битов -> байты; таблица выбирается по предыдущему байту."""
+
+    def __init__(self, decoders, n):
+        self.decoders = decoders
+        self.left = n
+        self.prev = 0
+        self.tail = ""
+
+    def feed(self, buf):
+        if self.left == 0 or not buf:
+            return b""
+        bits = self.tail + format(int.from_bytes(buf, "big"), f"0{len(buf) * 8}b")
+        decoders = self.decoders
+        out = bytearray()
+        end = 0
+        size = len(bits)
+        prev = self.prev
+        left = self.left
+        while left:
+            dec = decoders[prev]
+            if dec.single is not None:
+                # единственный символ контекста кодируется одним битом "0"
+                if end >= size:
+                    break
+                prev = dec.single
+                end += 1
+            else:
+                if dec.match is None:
+                    raise ValueError(f"no code table for context {prev}")
+                m = dec.match(bits, end)
+                if m is None:
+                    break
+                prev = dec.lookup[m.group()]
+                end = m.end()
+            out.append(prev)
+            left -= 1
+        self.prev = prev
+        self.left = left
+        self.tail = bits[end:]
+        return bytes(out)
+
+
+def decode_payload(payload, n):
+    """Распаковать n байт из карты контекстов + таблиц + сжатых битов."""
+    decoders, pos = read_model(payload)
+    dec = ContextDecoder(decoders, n)
+    out = bytearray()
+    view = memoryview(payload)
+    for start in range(pos, len(view), CHUNK):
+        if not dec.left:
+            break
+        out += dec.feed(bytes(view[start:start + CHUNK]))
+    if dec.left:
+        raise ValueError("unexpected EOF in archive data")
+    return bytes(out)
+
+
+def encode(input_path: str, archive_path: str):
+    """Сжать файл Хаффманом с контекстом 1-го порядка."""
+    with open(input_path, "rb") as f:
+        data = f.read()
+
+    n = len(data)
+    with open(archive_path, "wb") as f:
+        header = struct.pack(HEADER_FMT, SIGNATURE, VERSION, ALGORITHM)
+        header = header[:9] + struct.pack("<Q", n)[:7]
+        f.write(header)
+        f.write(encode_payload(data))
+
+def decode(archive_path: str, output_path: str):
+    """Распаковать файл, сжатый Хаффманом с контекстом 1-го порядка."""
+    with open(archive_path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("short header")
+
+        sig = header[:6]
+        ver = struct.unpack("<H", header[6:8])[0]
+        alg = header[8]
+
+        if sig != SIGNATURE:
+            raise ValueError("bad signature")
+        if ver != VERSION:
+            raise ValueError(f"unsupported version: {ver}")
+        if alg != ALGORITHM:
+            raise ValueError(f"wrong algorithm: {alg}")
+
+        n = struct.unpack("<Q", header[9:16] + b"\x00")[0]
+        payload = f.read()
+
+    data = decode_payload(payload, n)
+    with open(output_path, "wb") as f:
+        f.write(data)
+
+def main(argv):
+    if len(argv) < 3:
+        print("usage: context_huffman.py encode <input> <archive> | context_huffman.py decode <archive> <output>",
+              file=sys.stderr)
+        return 2
+
+    cmd = argv[0]
+    try:
+        if cmd == "encode":
+            encode(argv[1], argv[2])
+            return 0
+        elif cmd == "decode":
+            decode(argv[1], argv[2])
+            return 0
+        else:
+            return 2
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Хаффман с заранее обученной таблицей («словарём») — алгоритм 3
+
+Для файлов в несколько КБ таблица частот (256 байт) и построение дерева стоят
+дороже выигрыша, и n4.py выбирает алгоритм 0. Здесь таблица одна на весь корпус:
+она обучается командой train по образцам, сохраняется в файл словаря с ID,
+а архив хранит только ID словаря.
+
+Формат архива:
+  Заголовок (16 байт):
+    0..5  : сигнатура b"SOBSTV" (6 байт)
+    6-7   : версия формата uint16 = 0
+    8     : код алгоритма uint8 = 3 (Хаффман со словарём)
+    9..15 : исходная длина n (uint64) - 7 байт
+  ID словаря (uint32)
+  Сжатые данные (побитово упакованные коды Хаффмана, старший бит первый)
+
+Формат словаря (.otikdict):
+  0..7    : сигнатура b"SOBSTVDC"
+  8..11   : ID словаря uint32 = CRC32 таблицы частот
+  12..267 : таблица частот 256 x uint8 (как в n1.py, но без нулей —
+            словарь обязан кодировать любой байт)
+
+Словари для декодирования ищутся по ID в каталогах из переменной окружения
+OTIK_DICTS (через os.pathsep) и в lab4/dicts. Построенные по словарю коды и
+таблицы декодирования кэшируются в процессе: повторные файлы с тем же словарём
+не строят ничего.
+
+CLI:
+  train <dict_out> <sample1> [<sample2> ...]
+  encode <input> <archive> --dict=<dict_file>
+  decode <archive> <output> [--dict-dir=<dir>]
+"""
+from __future__ import annotations
+import os
+import struct
+import sys
+import zlib
+import importlib.util
+
+SIGNATURE = b"SOBSTV"
+VERSION = 0
+ALGORITHM = 3  # Хаффман со словарём
+
+HEADER_FMT = "<6sHBxxxxxxx"
+HEADER_SIZE = 16
+
+DICT_SIGNATURE = b"SOBSTVDC"
+DICT_FMT = "<8sI256s"
+DICT_SIZE = struct.calcsize(DICT_FMT)
+DICT_EXT = ".otikdict"
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+huffman_codec = load_module("huffman_codec", os.path.join(base_dir, "n1.py"))
+pipeline = load_module("pipeline", os.path.join(base_dir, "pipeline.py"))
+
+DEFAULT_DICT_DIR = os.path.join(base_dir, "dicts")
+
+
+class Dictionary:
+    """загруженный словарь: таблица частот, коды и таблица декодирования."""
+
+    def __init__(self, dict_id, freqs):
+        self.id = dict_id
+        self.freqs = freqs
+        tree = huffman_codec.build_huffman_tree(freqs)
+        self.codes = huffman_codec.build_codes(tree)
+        self.table = pipeline.DecodeTable(self.codes)
+
+# ID -> Dictionary (кэш процесса)
+_loaded = {}
+
+
+def train(dict_path, samples):
+    """Обучить словарь по образцам и записать его; вернуть ID."""
+    counts = [0] * 256
+    total = 0
+    for sample in samples:
+        with open(sample, "rb") as f:
+            while True:
+                buf = f.read(1024 * 1024)
+                if not buf:
+                    break
+                huffman_codec.histogram.add_counts(counts, huffman_codec.histogram.byte_counts(buf))
+                total += len(buf)
+
+    freqs = huffman_codec.normalize_freqs(counts, total)
+    # байты, которых не было в образцах, всё равно должны кодироваться
+    freqs = [max(1, f) for f in freqs]
+    table = bytes(freqs)
+    dict_id = zlib.crc32(table)
+
+    with open(dict_path, "wb") as f:
+        f.write(struct.pack(DICT_FMT, DICT_SIGNATURE, dict_id, table))
+    return dict_id
+
+
+def read_dictionary(dict_path):
+    """Прочитать файл словаря (с кэшем по ID)."""
+    with open(dict_path, "rb") as f:
+        raw = f.read(DICT_SIZE)
+    if len(raw) != DICT_SIZE:
+        raise ValueError(f"short dictionary file: {dict_path}")
+    sig, dict_id, table = struct.unpack(DICT_FMT, raw)
+    if sig != DICT_SIGNATURE:
+        raise ValueError(f"bad dictionary signature: {dict_path}")
+    if zlib.crc32(table) != dict_id:
+        raise ValueError(f"dictionary id mismatch: {dict_path}")
+    if dict_id not in _loaded:
+        _loaded[dict_id] = Dictionary(dict_id, list(table))
+    return _loaded[dict_id]
+
+
+def _dict_dirs(extra_dirs=()):
+    dirs = list(extra_dirs)
+    env = os.environ.get("OTIK_DICTS")
+    if env:
+        dirs.extend(d for d in env.split(os.pathsep) if d)
+    dirs.append(DEFAULT_DICT_DIR)
+    return dirs
+
+
+def find_dictionary(dict_id, extra_dirs=()):
+    """Найти словарь по ID (сначала кэш процесса, затем каталоги словарей)."""
+    if dict_id in _loaded:
+        return _loaded[dict_id]
+    for d in _dict_dirs(extra_dirs):
+        if not os.path.isdir(d):
+            continue
+        for name in sorted(os.listdir(d)):
+            if not name.endswith(DICT_EXT):
+                continue
+            path = os.path.join(d, name)
+            try:
+                with open(path, "rb") as f:
+                    sig, found_id, _ = struct.unpack(DICT_FMT, f.read(DICT_SIZE))
+            except (OSError, struct.error):
+                continue
+            if sig == DICT_SIGNATURE and found_id == dict_id:
+                return read_dictionary(path)
+    raise ValueError(f"dictionary {dict_id:08x} not found")
+
+
+def encode_payload(data, dictionary):
+    """ID словаря + сжатые биты (всё, что идёт после заголовка)."""
+    packed, _ = pipeline.encode_bits(data, dictionary.codes)
+    return struct.pack("<I", dictionary.id) + packed
+
+
+def decode_payload(payload, n, extra_dirs=()):
+    """Распаковать n байт из ID словаря + сжатых битов."""
+    if len(payload) < 4:
+        raise ValueError("short dictionary id")
+    dict_id = struct.unpack("<I", payload[:4])[0]
+    dictionary = find_dictionary(dict_id, extra_dirs)
+    dec = pipeline.StreamDecoder(dictionary.table, n)
+    data = dec.feed(payload[4:])
+    if dec.left:
+        raise ValueError("unexpected EOF in archive data")
+    return data
+
+
+def encode(input_path: str, archive_path: str, dict_path: str):
+    """Сжать файл по словарю."""
+    dictionary = read_dictionary(dict_path)
+    with open(input_path, "rb") as f:
+        data = f.read()
+
+    n = len(data)
+    with open(archive_path, "wb") as f:
+        header = struct.pack(HEADER_FMT, SIGNATURE, VERSION, ALGORITHM)
+        header = header[:9] + struct.pack("<Q", n)[:7]
+        f.write(header)
+        f.write(encode_payload(data, dictionary))
+
+def decode(archive_path: str, output_path: str, extra_dirs=()):
+    """Распаковать файл, сжатый по словарю."""
+    with open(archive_path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("short header")
+
+        sig = header[:6]
+        ver = struct.unpack("<H", header[6:8])[0]
+        alg = header[8]
+
+        if sig != SIGNATURE:
+            raise ValueError("bad signature")
+        if ver != VERSION:
+            raise ValueError(f"unsupported version: {ver}")
+        if alg != ALGORITHM:
+            raise ValueError(f"wrong algorithm: {alg}")
+
+        n = struct.unpack("<Q", header[9:16] + b"\x00")[0]
+        payload = f.read()
+
+    data = decode_payload(payload, n, extra_dirs)
+    with open(output_path, "wb") as f:
+        f.write(data)
+
+def main(argv):
+    if len(argv) < 3:
+        print("usage: dict_huffman.py train <dict_out> <sample>... | dict_huffman.py encode <input> <archive> --dict=FILE"
+              " | dict_huffman.py decode <archive> <output> [--dict-dir=DIR]", file=sys.stderr)
+        return 2
+
+    cmd = argv[0]
+    try:
+        if cmd == "train":
+            dict_id = train(argv[1], argv[2:])
+            print(f"Dictionary {dict_id:08x} -> {argv[1]}")
+            return 0
+        elif cmd == "encode":
+            dict_path = None
+            for arg in argv[3:]:
+                if arg.startswith("--dict="):
+                    dict_path = arg.split("=", 1)[1]
+            if dict_path is None:
+                print("encode requires --dict=FILE", file=sys.stderr)
+                return 2
+            encode(argv[1], argv[2], dict_path)
+            return 0
+        elif cmd == "decode":
+            dirs = [arg.split("=", 1)[1] for arg in argv[3:] if arg.startswith("--dict-dir=")]
+            decode(argv[1], argv[2], dirs)
+            return 0
+        else:
+            return 2
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        return 2
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Профиль энтропии скользящим окном и алгоритм 11 (участки: без сжатия / Хаффман)
+
+lab2 даёт одно число IΣ(Q) на весь файл, и n4.py выбирает «сжимать или нет»
+сразу для всего файла. Здесь считается энтропия порядка 0 в окнах
+[k · stride, k · stride + window) за один проход: гистограмма окна не
+пересчитывается, а обновляется — при сдвиге вычитается гистограмма уходящего
+куска (stride байт) и прибавляется гистограмма пришедшего (histogram.py: NumPy
+или Counter), а сумма Σ c · log2 c правится только для изменившихся байтов.
+Энтропия окна длины L — log2 L − Σ c · log2 c / L бит на байт.
+
+Карта участков: файл делится на блоки по stride байт, блоку приписывается
+энтропия окна, центрированного на нём. Блоки с энтропией не ниже threshold —
+«без сжатия», остальные — «Хаффман»; соседние блоки одного вида сливаются,
+участки короче min_region присоединяются к предыдущему.
+
+Алгоритм 11 кодирует файл по карте: участки «без сжатия» пишутся как есть,
+участки «Хаффман» — кодом Хаффмана с одной таблицей (n1.py), построенной только
+по ним, так что случайные или уже сжатые куски не портят таблицу текста.
+
+Формат архива:
+  Заголовок (16 байт):
+    0..5  : сигнатура b"SOBSTV" (6 байт)
+    6-7   : версия формата uint16 = 0
+    8     : код алгоритма uint8 = 11 (участки по профилю энтропии)
+    9..15 : исходная длина n (uint64) - 7 байт
+  Таблица частот (256 байт, как в n1.py) — по участкам «Хаффман»
+  Карта:
+    varint m — число участков
+    uint8 — вид первого участка (0 — без сжатия, 1 — Хаффман); виды чередуются
+    m записей: varint длина участка; для участка «Хаффман» ещё varint длина его кода в байтах
+    varint — 7 бит на байт, младшие первыми, старший бит — «есть продолжение»
+  Данные участков подряд: как есть / код Хаффмана, старший бит первый,
+  дополненный нулями до байта
+
+CLI:
+  encode <input> <archive> [--window=N] [--stride=N] [--threshold=БИТ]
+  decode <archive> <output>
+  profile <file> [--window=N] [--stride=N] [--threshold=БИТ] [--windows]
+"""
+from __future__ import annotations
+import io
+import math
+import os
+import struct
+import sys
+import importlib.util
+from collections import namedtuple
+
+SIGNATURE = b"SOBSTV"
+VERSION = 0
+ALGORITHM = 11  # участки без сжатия / Хаффман по профилю энтропии
+
+HEADER_FMT = "<6sHBxxxxxxx"
+HEADER_SIZE = 16
+
+WINDOW = 64 * 1024       # окно, байт
+STRIDE = 16 * 1024       # шаг окна и размер блока карты, байт
+THRESHOLD = 7.5          # бит на байт: не ниже — участок без сжатия
+MIN_REGION = 2 * STRIDE  # участки короче присоединяются к предыдущему
+CHUNK = 1024 * 1024      # байт за одно чтение
+
+STORED = 0
+CODED = 1
+KIND_NAMES = {STORED: "stored", CODED: "huffman"}
+
+# участок карты: смещение, длина, вид, средняя энтропия окон (бит на байт)
+Region = namedtuple("Region", "offset length kind bits")
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+huffman_codec = load_module("huffman_codec", os.path.join(base_dir, "n1.py"))
+histogram = huffman_codec.histogram
+tablecache = huffman_codec.tablecache
+
+
+# --- профиль ---
+
+def _clogc(c):
+    return c * math.log2(c) if c > 1 else 0.0
+
+
+def check_params(window, stride):
+    if stride <= 0 or window <= 0:
+        raise ValueError("window and stride must be positive")
+    if window % stride:
+        raise ValueError(f"window ({window}) must be a multiple of stride ({stride})")
+
+
+def profile(f, window=WINDOW, stride=STRIDE):
+    """окна [k · stride, k · stride + window) файла f: (начало, длина, бит на байт).
+
+    Последнее окно доходит до конца файла и может быть короче window.
+    """
+    check_params(window, stride)
+    counts = [0] * 256
+    s = 0.0              # Σ c · log2 c по окну
+    buf = bytearray()
+    base = 0             # смещение buf[0] в файле
+    start = end = 0      # окно [start, end) в counts
+    eof = False
+
+    def apply(block, sign):
+        nonlocal s
+        for b, c in enumerate(histogram.byte_counts(block)):
+            if c:
+                old = counts[b]
+                counts[b] = old + sign * c
+                s += _clogc(old + sign * c) - _clogc(old)
+
+    while True:
+        while base + len(buf) < start + window and not eof:
+            data = f.read(max(CHUNK, window))
+            if data:
+                buf += data
+            else:
+                eof = True
+        new_end = min(start + window, base + len(buf))
+        apply(buf[end - base:new_end - base], 1)
+        end = new_end
+        length = end - start
+        if length == 0:
+            return
+        yield start, length, math.log2(length) - s / length
+        if eof and end == base + len(buf):
+            return
+        apply(buf[start - base:start + stride - base], -1)
+        start += stride
+        del buf[:start - base]
+        base = start
+
+
+def region_map(windows, n, window=WINDOW, stride=STRIDE, threshold=THRESHOLD, min_region=MIN_REGION):
+    """карта участков по окнам profile(): список Region, покрывающий [0, n)."""
+    entropies = [h for _, _, h in windows]
+    if n == 0 or not entropies:
+        return []
+    half = (window // stride - 1) // 2   # окно, центрированное на блоке, начинается на half блоков раньше
+    regions = []
+    for offset in range(0, n, stride):
+        i = min(max(offset // stride - half, 0), len(entropies) - 1)
+        h = entropies[i]
+        length = min(stride, n - offset)
+        kind = STORED if h >= threshold else CODED
+        if regions and regions[-1].kind == kind:
+            regions[-1] = _join(regions[-1], Region(offset, length, kind, h))
+        else:
+            regions.append(Region(offset, length, kind, h))
+    # короткие участки — к предыдущему (с его видом); после этого соседи одного вида сливаются
+    merged = []
+    for r in regions:
+        if merged and (r.length < min_region or r.kind == merged[-1].kind):
+            merged[-1] = _join(merged[-1], r)
+        else:
+            merged.append(r)
+    return merged
+
+
+def _join(a, b):
+    """участок a, продолженный соседним b (вид — от a)."""
+    total = a.length + b.length
+    return Region(a.offset, total, a.kind, (a.bits * a.length + b.bits * b.length) / total)
+
+
+def regions_of(data, window=WINDOW, stride=STRIDE, threshold=THRESHOLD, min_region=MIN_REGION):
+    """карта участков для данных в памяти."""
+    return region_map(profile(io.BytesIO(data), window, stride), len(data), window, stride,
+                      threshold, min_region)
+
+
+# --- алгоритм 11 ---
+
+def _varint(v, out):
+    while v >= 0x80:
+        out.append((v & 0x7F) | 0x80)
+        v >>= 7
+    out.append(v)
+
+
+def _read_varint(buf, pos):
+    v = shift = 0
+    while True:
+        if pos >= len(buf):
+            raise ValueError("short region map")
+        b = buf[pos]
+        pos += 1
+        v |= (b & 0x7F) << shift
+        if b < 0x80:
+            return v, pos
+        shift += 7
+        if shift > 63:
+            raise ValueError("bad varint in region map")
+
+
+def _coded_freqs(data, regions):
+    """нормализованная таблица частот по участкам «Хаффман» и их гистограммы."""
+    view = memoryview(data)
+    parts = {}
+    counts = [0] * 256
+    for r in regions:
+        if r.kind == CODED:
+            parts[r.offset] = histogram.byte_counts(view[r.offset:r.offset + r.length])
+            histogram.add_counts(counts, parts[r.offset])
+    return huffman_codec.normalize_freqs(counts, sum(counts)), parts
+
+
+def _encode_bits(buf, codes):
+    bits = "".join(map(codes.__getitem__, buf))
+    nbits = len(bits)
+    if nbits == 0:
+        return b""
+    pad = -nbits % 8
+    return (int(bits, 2) << pad).to_bytes((nbits + pad) // 8, "big")
+
+
+def estimate_size(data, regions):
+    """точный размер архива алгоритма 11 по карте, без кодирования."""
+    freqs, parts = _coded_freqs(data, regions)
+    codes = huffman_codec.code_table(freqs).codes
+    coded_sizes = {offset: (histogram.code_bits(counts, codes) + 7) // 8 for offset, counts in parts.items()}
+    stored = sum(r.length for r in regions if r.kind == STORED)
+    return HEADER_SIZE + 256 + len(_pack_map(regions, coded_sizes)) + stored + sum(coded_sizes.values())
+
+
+def _pack_map(regions, coded_sizes):
+    out = bytearray()
+    _varint(len(regions), out)
+    out.append(regions[0].kind if regions else STORED)
+    for r in regions:
+        _varint(r.length, out)
+        if r.kind == CODED:
+            _varint(coded_sizes.get(r.offset, 0), out)
+    return out
+
+
+def encode_payload(data, regions=None):
+    """таблица частот + карта + данные участков (всё, что после заголовка)."""
+    if regions is None:
+        regions = regions_of(data)
+    freqs, _ = _coded_freqs(data, regions)
+    codes = huffman_codec.code_table(freqs).codes
+    view = memoryview(data)
+    coded_sizes = {}
+    blocks = []
+    for r in regions:
+        part = view[r.offset:r.offset + r.length]
+        if r.kind == CODED:
+            block = _encode_bits(part, codes)
+            coded_sizes[r.offset] = len(block)
+        else:
+            block = part
+        blocks.append(block)
+    return bytes(freqs) + bytes(_pack_map(regions, coded_sizes)) + b"".join(blocks)
+
+
+def decode_payload(payload, n):
+    """распаковать n байт из таблицы, карты и данных участков."""
+    if len(payload) < 256:
+        raise ValueError("short freqs table")
+    freqs = list(payload[:256])
+    m, pos = _read_varint(payload, 256)
+    if m and pos >= len(payload):
+        raise ValueError("short region map")
+    kind = payload[pos] if m else STORED
+    pos += 1
+    if kind not in KIND_NAMES:
+        raise ValueError(f"bad region kind: {kind}")
+    entries = []
+    for _ in range(m):
+        length, pos = _read_varint(payload, pos)
+        size = length
+        if kind == CODED:
+            size, pos = _read_varint(payload, pos)
+        entries.append((kind, length, size))
+        kind ^= 1
+    if sum(length for _, length, _ in entries) != n:
+        raise ValueError("region map does not cover the file")
+    table = huffman_codec.code_table(freqs)
+    out = bytearray()
+    for kind, length, size in entries:
+        block = payload[pos:pos + size]
+        if len(block) != size:
+            raise ValueError("unexpected EOF in region data")
+        pos += size
+        if kind == STORED:
+            out += block
+        else:
+            if not table.codes:
+                raise ValueError("no tree for coded region")
+            out += tablecache.decode_bits(table.decoder, block, length)
+    return bytes(out)
+
+
+def encode(input_path: str, archive_path: str, window=WINDOW, stride=STRIDE, threshold=THRESHOLD):
+    """Сжать файл по карте участков."""
+    with open(input_path, "rb") as f:
+        data = f.read()
+    regions = regions_of(data, window, stride, threshold)
+    n = len(data)
+    with open(archive_path, "wb") as f:
+        header = struct.pack(HEADER_FMT, SIGNATURE, VERSION, ALGORITHM)
+        f.write(header[:9] + struct.pack("<Q", n)[:7])
+        f.write(encode_payload(data, regions))
+
+
+def decode(archive_path: str, output_path: str):
+    """Распаковать файл алгоритма 11."""
+    with open(archive_path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("short header")
+
+        sig = header[:6]
+        ver = struct.unpack("<H", header[6:8])[0]
+        alg = header[8]
+
+        if sig != SIGNATURE:
+            raise ValueError("bad signature")
+        if ver != VERSION:
+            raise ValueError(f"unsupported version: {ver}")
+        if alg != ALGORITHM:
+            raise ValueError(f"wrong algorithm: {alg}")
+
+        n = struct.unpack("<Q", header[9:16] + b"\x00")[0]
+        payload = f.read()
+
+    data = decode_payload(payload, n)
+    with open(output_path, "wb") as f:
+        f.write(data)
+
+
+def print_profile(path, window=WINDOW, stride=STRIDE, threshold=THRESHOLD, show_windows=False):
+    """карта участков файла (и, по желанию, энтропия каждого окна)."""
+    n = os.path.getsize(path)
+    with open(path, "rb") as f:
+        windows = list(profile(f, window, stride))
+    if show_windows:
+        print(f"{'offset':>12} {'length':>10} {'bits/byte':>9}")
+        for start, length, h in windows:
+            print(f"{start:>12} {length:>10} {h:>9.4f}")
+        print()
+    regions = region_map(windows, n, window, stride, threshold)
+    print(f"{path}: {n} bytes, window {window}, stride {stride}, threshold {threshold} bits/byte")
+    print(f"{'offset':>12} {'length':>12} {'kind':>8} {'bits/byte':>9}")
+    for r in regions:
+        print(f"{r.offset:>12} {r.length:>12} {KIND_NAMES[r.kind]:>8} {r.bits:>9.4f}")
+    stored = sum(r.length for r in regions if r.kind == STORED)
+    print(f"regions: {len(regions)}, stored: {stored} bytes, huffman: {n - stored} bytes")
+
+
+def parse_options(args):
+    """--window= / --stride= / --threshold= / --windows -> словарь параметров."""
+    opts = {"window": WINDOW, "stride": STRIDE, "threshold": THRESHOLD, "show_windows": False}
+    for arg in args:
+        if arg.startswith("--window="):
+            opts["window"] = int(arg.split("=", 1)[1])
+        elif arg.startswith("--stride="):
+            opts["stride"] = int(arg.split("=", 1)[1])
+        elif arg.startswith("--threshold="):
+            opts["threshold"] = float(arg.split("=", 1)[1])
+        elif arg == "--windows":
+            opts["show_windows"] = True
+        else:
+            raise ValueError(f"unknown option: {arg}")
+    check_params(opts["window"], opts["stride"])
+    return opts
+
+
+def main(argv):
+    usage = ("usage: entropy_profile.py encode <input> <archive> [--window=N] [--stride=N] [--threshold=BITS]"
+             " | entropy_profile.py decode <archive> <output>"
+             " | entropy_profile.py profile <file> [--window=N] [--stride=N] [--threshold=BITS] [--windows]")
+    if len(argv) < 2 or argv[0] not in ("encode", "decode", "profile"):
+        print(usage, file=sys.stderr)
+        return 2
+    cmd = argv[0]
+    try:
+        if cmd == "profile":
+            print_profile(argv[1], **parse_options(argv[2:]))
+            return 0
+        if len(argv) < 3:
+            print(usage, file=sys.stderr)
+            return 2
+        if cmd == "encode":
+            opts = parse_options(argv[3:])
+            opts.pop("show_windows")
+            encode(argv[1], argv[2], **opts)
+        else:
+            decode(argv[1], argv[2])
+        return 0
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
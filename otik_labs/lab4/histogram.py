@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Гистограммы байтов и пар байтов (общие для lab2 и lab4)
+
+Подсчёт частот — самая дорогая часть большинства инструментов: оценки в
+lab2, построение таблиц в n1/n2/n4/n6. Здесь одно ядро на всех:
+
+  byte_counts(data)  — 256 частот байтов (порядок 0)
+  pair_counts(data)  — 65536 частот пар (data[i], data[i + 1]): индекс a · 256 + b,
+                       то есть плотная матрица 256 × 256 по строкам
+  entropy_bits(counts)       — IΣ(Q) = Σ c · log2(n / c)
+  cond_entropy_bits(pairs)   — I_CM1(Q) = Σ c(ab) · log2(c(a*) / c(ab))
+  add_counts(total, part)    — сложение гистограмм кусков
+  code_bits(counts, codes)   — длина данных в битах при готовых кодах
+
+С NumPy (если установлен) частоты считает np.bincount — по data для порядка 0
+и по data[:-1] · 256 + data[1:] для пар, энтропии — векторно по массиву частот.
+Без NumPy — запасные пути на стандартной библиотеке: Counter по байтам и по
+массиву uint16, прочитанному с чётного и нечётного смещения (пара — одно число,
+без кортежа на байт). Результат в обоих случаях — списки int одинакового вида.
+"""
+from __future__ import annotations
+import math
+import operator
+import sys
+from array import array
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен
+    np = None
+
+
+def byte_counts(data):
+    """частоты байтов: список из 256 int."""
+    if np is not None:
+        return np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256).tolist()
+    counts = Counter(data)
+    return [counts.get(b, 0) for b in range(256)]
+
+
+def pair_counts(data):
+    """частоты пар соседних байтов: список из 65536 int, индекс a · 256 + b."""
+    if len(data) < 2:
+        return [0] * 65536
+    if np is not None:
+        arr = np.frombuffer(data, dtype=np.uint8)
+        idx = (arr[:-1].astype(np.uint16) << 8) | arr[1:]
+        return np.bincount(idx, minlength=65536).tolist()
+    counts = Counter()
+    view = memoryview(data).cast("B")
+    for start in (0, 1):
+        part = view[start:]
+        pairs = array("H")
+        pairs.frombytes(part[:len(part) & ~1])
+        # старший байт uint16 — первый байт пары
+        if sys.byteorder == "little":
+            pairs.byteswap()
+        counts.update(pairs)
+    dense = [0] * 65536
+    for v, c in counts.items():
+        dense[v] = c
+    return dense
+
+
+def add_counts(total, part):
+    """сложить гистограмму part в total (на месте) и вернуть total."""
+    total[:] = map(operator.add, total, part)
+    return total
+
+
+def entropy_bits(counts):
+    """IΣ(Q) в битах по таблице частот."""
+    if np is not None:
+        c = np.asarray(counts, dtype=np.float64)
+        c = c[c > 0]
+        n = c.sum()
+        return float(n * np.log2(n) - (c * np.log2(c)).sum()) if n else 0.0
+    n = sum(counts)
+    return sum(c * math.log2(n / c) for c in counts if c)
+
+
+def cond_entropy_bits(pairs):
+    """I_CM1(Q) в битах по плотной таблице пар (65536 частот)."""
+    if np is not None:
+        m = np.asarray(pairs, dtype=np.float64).reshape(256, 256)
+        rows = m.sum(axis=1)
+        rows = rows[rows > 0]
+        c = m[m > 0]
+        return float((rows * np.log2(rows)).sum() - (c * np.log2(c)).sum())
+    bits = 0.0
+    for a in range(256):
+        row = pairs[a * 256:(a + 1) * 256]
+        total = sum(row)
+        if total:
+            bits += sum(c * math.log2(total / c) for c in row if c)
+    return bits
+
+
+def code_bits(counts, codes):
+    """длина данных в битах при кодах codes (символ -> строка бит)."""
+    return sum(len(codes[b]) * c for b, c in enumerate(counts) if c)
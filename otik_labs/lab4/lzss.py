@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+LZSS (LZ77 со скользящим окном) + энтропийное кодирование потоков — алгоритм 7
+
+Контекстная стадия сжатия: повторы заменяются ссылками (длина, расстояние) назад
+в окне. Поток токенов раскладывается на пять байтовых потоков, и каждый из них
+отдельно сжимается кодеком Л4 (по умолчанию Хаффманом из n1.py) — как в deflate:
+  flags     — бит на токен (1 — ссылка, 0 — литерал), старший бит первый
+  literals  — байты литералов
+  lengths   — длина ссылки - MIN_MATCH (0..255)
+  dist_hi   — старший байт (расстояние - 1)
+  dist_lo   — младший байт (расстояние - 1)
+Поток пишется сжатым, только если так короче; иначе — как есть.
+
+Поиск совпадений — хэш-цепочки: head[3 байта] — последняя позиция с таким
+префиксом, prev[pos % window] — предыдущая позиция с тем же префиксом.
+Длина совпадения с кандидатом считается без цикла по байтам: срезы
+переводятся в числа, и по длине их XOR находится первый различающийся байт.
+Уровни 1..9 — параметры zlib: длина просматриваемой цепочки, «достаточная»
+длина совпадения и ленивое сопоставление (уровни 4+: прежде чем взять ссылку,
+проверяется, не начинается ли в следующей позиции более длинная).
+
+В архиве Л3.№2 эта стадия — comp_ctx = 1, а потоки сжимаются кодеком comp_nctx
+(0 — потоки без сжатия).
+
+Формат payload (всё после заголовка Л4 / данные записи Л3.№2):
+  uint8 число потоков (5)
+  на каждый поток: uint8 способ (0 — как есть, 1 — кодек), uint32 длина исходного
+  потока, uint32 длина сохранённого, затем сохранённые байты
+
+Формат архива алгоритма 7: заголовок Л4 (16 байт, алгоритм 7) + payload
+(потоки сжимаются Хаффманом n1.py).
+
+CLI:
+  encode <input> <archive> [--level=1..9] [--window=BYTES]
+  decode <archive> <output>
+  bench <file1> [<file2> ...]   — степень сжатия и скорость по уровням
+"""
+from __future__ import annotations
+import os
+import struct
+import sys
+import time
+import importlib.util
+
+SIGNATURE = b"SOBSTV"
+VERSION = 0
+ALGORITHM = 7  # LZSS + Хаффман
+
+HEADER_FMT = "<6sHBxxxxxxx"
+HEADER_SIZE = 16
+
+MIN_MATCH = 3
+MAX_MATCH = MIN_MATCH + 255
+WINDOW = 1 << 15        # по умолчанию; не больше 1 << 16 (расстояние — 2 байта)
+MAX_WINDOW = 1 << 16
+DEFAULT_LEVEL = 6
+
+# уровень -> (good, lazy, nice, chain, ленивое сопоставление) — таблица zlib:
+#   chain — сколько кандидатов цепочки просматривать; nice — совпадения такой
+#   длины достаточно, поиск прекращается; good — если уже есть совпадение такой
+#   длины, в ленивом поиске цепочка просматривается на четверть;
+#   lazy — без ленивого сопоставления: до какой длины позиции совпадения
+#   вставляются в хэш; с ним: ленивый поиск только для совпадений короче lazy
+LEVELS = {
+    1: (4, 4, 8, 4, False),
+    2: (4, 5, 16, 8, False),
+    3: (4, 6, 32, 32, False),
+    4: (4, 4, 16, 16, True),
+    5: (8, 16, 32, 32, True),
+    6: (8, 16, 128, 128, True),
+    7: (8, 32, 128, 256, True),
+    8: (32, 128, MAX_MATCH, 1024, True),
+    9: (32, MAX_MATCH, MAX_MATCH, 4096, True),
+}
+
+STREAMS = 5
+STREAM_HDR_FMT = "<BII"
+STREAM_HDR_SIZE = struct.calcsize(STREAM_HDR_FMT)
+STORED, CODED = 0, 1
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+huffman_codec = load_module("huffman_codec", os.path.join(base_dir, "n1.py"))
+
+
+def tokenize(data, level=DEFAULT_LEVEL, window=WINDOW):
+    """разобрать data на литералы и ссылки; вернуть пять потоков (см. описание модуля)."""
+    if level not in LEVELS:
+        raise ValueError(f"unknown level: {level}")
+    if window <= 0 or window > MAX_WINDOW or window & (window - 1):
+        raise ValueError(f"window must be a power of two up to {MAX_WINDOW}: {window}")
+    good, max_lazy, nice, max_chain, lazy = LEVELS[level]
+    insert_limit = MAX_MATCH if lazy else max_lazy
+
+    n = len(data)
+    mask = window - 1
+    head = {}
+    prev = [-1] * window
+    flags = bytearray()
+    literals = bytearray()
+    lengths = bytearray()
+    dist_hi = bytearray()
+    dist_lo = bytearray()
+
+    def insert(i):
+        if i + MIN_MATCH <= n:
+            key = data[i:i + MIN_MATCH]
+            prev[i & mask] = head.get(key, -1)
+            head[key] = i
+
+    def find(i, best_len=MIN_MATCH - 1, chain=max_chain):
+        """совпадение для позиции i длиннее best_len (до вставки i в хэш): (длина, расстояние)."""
+        limit = min(MAX_MATCH, n - i)
+        if limit <= best_len:
+            return 0, 0
+        cand = head.get(data[i:i + MIN_MATCH], -1)
+        best_dist = 0
+        # длина общего префикса — по старшему различающемуся байту XOR двух чисел
+        target = int.from_bytes(data[i:i + limit], "big")
+        while cand >= 0 and i - cand <= window and chain:
+            # быстрый отсев: байт за текущим лучшим совпадением должен совпасть
+            if data[cand + best_len] == data[i + best_len]:
+                diff = target ^ int.from_bytes(data[cand:cand + limit], "big")
+                length = limit - ((diff.bit_length() + 7) >> 3)
+                if length > best_len:
+                    best_len = length
+                    best_dist = i - cand
+                    if length >= nice or length == limit:
+                        break
+            nxt = prev[cand & mask]
+            if nxt >= cand:
+                break  # слот prev уже перезаписан более новой позицией
+            cand = nxt
+            chain -= 1
+        return (best_len, best_dist) if best_dist else (0, 0)
+
+    def emit_match(length, dist):
+        flags.append(0x31)  # b"1"
+        lengths.append(length - MIN_MATCH)
+        dist_hi.append((dist - 1) >> 8)
+        dist_lo.append((dist - 1) & 0xFF)
+
+    i = 0
+    pending = None
+    while i < n:
+        if pending is None:
+            length, dist = find(i)
+            insert(i)
+        else:
+            length, dist = pending
+            pending = None
+        if length < MIN_MATCH:
+            flags.append(0x30)  # b"0"
+            literals.append(data[i])
+            i += 1
+            continue
+        first = i + 1  # с какой позиции вставлять позиции совпадения в хэш
+        if lazy and length < max_lazy and i + 1 < n:
+            next_length, next_dist = find(i + 1, length, max_chain >> 2 if length >= good else max_chain)
+            insert(i + 1)
+            if next_length > length:
+                # в следующей позиции совпадение длиннее — здесь литерал
+                flags.append(0x30)
+                literals.append(data[i])
+                i += 1
+                pending = (next_length, next_dist)
+                continue
+            first = i + 2
+        emit_match(length, dist)
+        if length <= insert_limit:
+            for j in range(first, i + length):
+                insert(j)
+        i += length
+
+    packed_flags = b""
+    if flags:
+        pad = -len(flags) % 8
+        packed_flags = (int(flags, 2) << pad).to_bytes((len(flags) + pad) // 8, "big")
+    return [packed_flags, bytes(literals), bytes(lengths), bytes(dist_hi), bytes(dist_lo)]
+
+
+def untokenize(streams, n):
+    """восстановить n байт из пяти потоков."""
+    flags, literals, lengths, dist_hi, dist_lo = streams
+    out = bytearray()
+    lit = 0
+    ref = 0
+    for byte in flags:
+        for bit in range(7, -1, -1):
+            if len(out) >= n:
+                break
+            if (byte >> bit) & 1:
+                if ref >= len(lengths) or ref >= len(dist_hi) or ref >= len(dist_lo):
+                    raise ValueError("short match streams")
+                length = lengths[ref] + MIN_MATCH
+                dist = ((dist_hi[ref] << 8) | dist_lo[ref]) + 1
+                ref += 1
+                start = len(out) - dist
+                if start < 0:
+                    raise ValueError("match distance beyond start of data")
+                if dist >= length:
+                    out += out[start:start + length]
+                else:
+                    # перекрывающаяся ссылка: повтор последних dist байт
+                    pattern = out[start:]
+                    out += (pattern * (length // dist + 1))[:length]
+            else:
+                if lit >= len(literals):
+                    raise ValueError("short literal stream")
+                out.append(literals[lit])
+                lit += 1
+    if len(out) != n:
+        raise ValueError("unexpected end of token streams")
+    return bytes(out)
+
+
+def pack_streams(streams, entropy=None):
+    """записать потоки; entropy — кодек Л4 (encode_payload/decode_payload) или None."""
+    out = bytearray([len(streams)])
+    for raw in streams:
+        method, stored = STORED, raw
+        if entropy is not None and raw:
+            coded = entropy.encode_payload(raw)
+            if len(coded) < len(raw):
+                method, stored = CODED, coded
+        out += struct.pack(STREAM_HDR_FMT, method, len(raw), len(stored))
+        out += stored
+    return bytes(out)
+
+
+def unpack_streams(payload, entropy=None):
+    if not payload:
+        raise ValueError("empty LZSS payload")
+    count = payload[0]
+    if count != STREAMS:
+        raise ValueError(f"bad LZSS stream count: {count}")
+    pos = 1
+    streams = []
+    for _ in range(count):
+        if pos + STREAM_HDR_SIZE > len(payload):
+            raise ValueError("short LZSS stream header")
+        method, raw_len, stored_len = struct.unpack_from(STREAM_HDR_FMT, payload, pos)
+        pos += STREAM_HDR_SIZE
+        stored = bytes(payload[pos:pos + stored_len])
+        if len(stored) != stored_len:
+            raise ValueError("short LZSS stream")
+        pos += stored_len
+        if method == STORED:
+            raw = stored
+        elif method == CODED:
+            if entropy is None:
+                raise ValueError("LZSS stream is entropy-coded, but no codec given")
+            raw = entropy.decode_payload(stored, raw_len)
+        else:
+            raise ValueError(f"bad LZSS stream method: {method}")
+        if len(raw) != raw_len:
+            raise ValueError("LZSS stream size mismatch")
+        streams.append(raw)
+    return streams
+
+
+def encode_payload(data, level=DEFAULT_LEVEL, window=WINDOW, entropy=huffman_codec):
+    """Сжать данные в памяти: LZSS + сжатие потоков кодеком entropy."""
+    return pack_streams(tokenize(data, level, window), entropy)
+
+
+def decode_payload(payload, n, entropy=huffman_codec):
+    """Распаковать n байт из payload LZSS."""
+    return untokenize(unpack_streams(payload, entropy), n)
+
+
+def encode(input_path: str, archive_path: str, level=DEFAULT_LEVEL, window=WINDOW):
+    """Сжать файл: LZSS + Хаффман."""
+    with open(input_path, "rb") as f:
+        data = f.read()
+
+    n = len(data)
+    with open(archive_path, "wb") as f:
+        header = struct.pack(HEADER_FMT, SIGNATURE, VERSION, ALGORITHM)
+        header = header[:9] + struct.pack("<Q", n)[:7]
+        f.write(header)
+        f.write(encode_payload(data, level, window))
+
+def decode(archive_path: str, output_path: str):
+    """Распаковать файл, сжатый LZSS + Хаффман."""
+    with open(archive_path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("short header")
+
+        sig = header[:6]
+        ver = struct.unpack("<H", header[6:8])[0]
+        alg = header[8]
+
+        if sig != SIGNATURE:
+            raise ValueError("bad signature")
+        if ver != VERSION:
+            raise ValueError(f"unsupported version: {ver}")
+        if alg != ALGORITHM:
+            raise ValueError(f"wrong algorithm: {alg}")
+
+        n = struct.unpack("<Q", header[9:16] + b"\x00")[0]
+        payload = f.read()
+
+    data = decode_payload(payload, n)
+    with open(output_path, "wb") as f:
+        f.write(data)
+
+def bench(paths, window=WINDOW):
+    """размер и скорость поиска совпадений / всего кодирования по уровням."""
+    print(f"{'file':<24} {'level':>5} {'payload':>10} {'ratio':>7} {'match MB/s':>11} {'enc MB/s':>9} {'dec MB/s':>9}")
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        n = len(data)
+        for level in sorted(LEVELS):
+            t0 = time.perf_counter()
+            streams = tokenize(data, level, window)
+            t1 = time.perf_counter()
+            payload = pack_streams(streams, huffman_codec)
+            t2 = time.perf_counter()
+            if decode_payload(payload, n) != data:
+                raise ValueError(f"round trip failed: {path} (level {level})")
+            t3 = time.perf_counter()
+            print(f"{os.path.basename(path)[:24]:<24} {level:>5} {len(payload):>10} {len(payload) / max(n, 1):>7.3f}"
+                  f" {n / 1e6 / max(t1 - t0, 1e-9):>11.2f} {n / 1e6 / max(t2 - t0, 1e-9):>9.2f}"
+                  f" {n / 1e6 / max(t3 - t2, 1e-9):>9.2f}")
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "bench":
+        bench(argv[1:])
+        return 0
+    if len(argv) < 3:
+        print("usage: lzss.py encode <input> <archive> [--level=1..9] [--window=BYTES]"
+              " | lzss.py decode <archive> <output> | lzss.py bench <file>...", file=sys.stderr)
+        return 2
+
+    cmd = argv[0]
+    try:
+        if cmd == "encode":
+            level = DEFAULT_LEVEL
+            window = WINDOW
+            for arg in argv[3:]:
+                if arg.startswith("--level="):
+                    level = int(arg.split("=", 1)[1])
+                elif arg.startswith("--window="):
+                    window = int(arg.split("=", 1)[1])
+            encode(argv[1], argv[2], level, window)
+            return 0
+        elif cmd == "decode":
+            decode(argv[1], argv[2])
+            return 0
+        else:
+            return 2
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
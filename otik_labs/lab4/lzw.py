@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+LZW со словарём-деревом и кодами переменной длины — алгоритм 8
+
+Словарь строится по ходу кодирования и не хранится в архиве: коды 0..255 —
+одиночные байты, 256 — CLEAR (сброс словаря), новые строки получают коды с 257.
+Ширина кода растёт с 9 бит до max_bits (по умолчанию 16): код пишется
+минимальным числом бит, которым представим наибольший уже выданный кодером код.
+
+Словарь кодера — дерево (префикс, байт) -> код в двух массивах фиксированного
+размера с открытой адресацией (как в compress): ключ (префикс << 8) | байт и код
+ребёнка. Строки не хранятся, память ограничена размером таблицы.
+
+Словарь декодера — (смещение, длина) строки в уже выданных данных: строка кода
+всегда встречалась в выходе, поэтому она дописывается копированием среза из
+того же буфера.
+
+Когда словарь заполнен:
+  reset  — кодер выдаёт CLEAR, и словарь строится заново (подходит для данных,
+           статистика которых меняется)
+  freeze — словарь больше не меняется
+Декодеру политика не нужна: CLEAR в потоке явный.
+
+Формат payload (всё после заголовка Л4):
+  uint8 max_bits (9..16)
+  коды переменной длины, старший бит первый, последний байт дополнен нулями
+
+Формат архива: заголовок Л4 (16 байт, алгоритм 8) + payload.
+
+CLI:
+  encode <input> <archive> [--max-bits=9..16] [--policy=reset|freeze]
+  decode <archive> <output>
+  bench <file1> [<file2> ...]   — размер и скорость против lzss.py и n1.py
+"""
+from __future__ import annotations
+import os
+import struct
+import sys
+import time
+import importlib.util
+from array import array
+
+SIGNATURE = b"SOBSTV"
+VERSION = 0
+ALGORITHM = 8  # LZW
+
+HEADER_FMT = "<6sHBxxxxxxx"
+HEADER_SIZE = 16
+
+CLEAR = 256
+FIRST_CODE = 257
+MIN_BITS = 9
+MAX_BITS = 16
+POLICIES = ("reset", "freeze")
+DEFAULT_POLICY = "reset"
+
+# размер хэш-таблицы дерева кодера: простое число, ~5% свободных ячеек при 2^16 кодах
+HSIZE = 69001
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def encode_codes(data, max_bits=MAX_BITS, policy=DEFAULT_POLICY):
+    """сжать data в поток кодов переменной длины (без байта max_bits)."""
+    if not MIN_BITS <= max_bits <= MAX_BITS:
+        raise ValueError(f"max_bits must be in {MIN_BITS}..{MAX_BITS}: {max_bits}")
+    if policy not in POLICIES:
+        raise ValueError(f"unknown policy: {policy}")
+    if not data:
+        return b""
+    max_codes = 1 << max_bits
+    reset = policy == "reset"
+    keys = array("i", [-1]) * HSIZE
+    vals = array("H", [0]) * HSIZE
+    size = FIRST_CODE
+    width = MIN_BITS
+    out = bytearray()
+    acc = 0
+    nbits = 0
+
+    w = data[0]
+    for b in data[1:]:
+        key = (w << 8) | b
+        i = (b << 8) ^ w  # < 2^16 <= HSIZE
+        k = keys[i]
+        if k == key:
+            w = vals[i]
+            continue
+        if k >= 0:
+            # повторное хэширование: шаг HSIZE - i, как в compress
+            disp = HSIZE - i if i else 1
+            while True:
+                i -= disp
+                if i < 0:
+                    i += HSIZE
+                k = keys[i]
+                if k == key or k < 0:
+                    break
+            if k == key:
+                w = vals[i]
+                continue
+        # строки w + b нет в словаре: выдаём код w
+        acc = (acc << width) | w
+        nbits += width
+        if size < max_codes:
+            keys[i] = key
+            vals[i] = size
+            size += 1
+            if size > (1 << width) and width < max_bits:
+                width += 1
+        elif reset:
+            acc = (acc << width) | CLEAR
+            nbits += width
+            keys = array("i", [-1]) * HSIZE
+            size = FIRST_CODE
+            width = MIN_BITS
+        if nbits >= 64:
+            rest = nbits & 7
+            out += (acc >> rest).to_bytes(nbits >> 3, "big")
+            acc &= (1 << rest) - 1
+            nbits = rest
+        w = b
+
+    acc = (acc << width) | w
+    nbits += width
+    pad = -nbits % 8
+    out += (acc << pad).to_bytes((nbits + pad) >> 3, "big")
+    return bytes(out)
+
+
+def decode_codes(data, n, max_bits=MAX_BITS):
+    """раскодировать n байт из потока кодов переменной длины."""
+    if not MIN_BITS <= max_bits <= MAX_BITS:
+        raise ValueError(f"bad max_bits: {max_bits}")
+    if n == 0:
+        return b""
+    max_codes = 1 << max_bits
+    # 3 байта покрывают код до 16 бит при любом сдвиге внутри байта
+    buf = bytes(data) + b"\x00\x00\x00"
+    total_bits = len(data) * 8
+    offs = [0] * max_codes
+    lens = [0] * max_codes
+    out = bytearray()
+    size = FIRST_CODE  # следующий свободный код декодера
+    width = MIN_BITS
+    prev_off = prev_len = -1  # строка предыдущего кода; -1 — в начале и после CLEAR
+    pos = 0
+    while len(out) < n:
+        # кодер добавляет строку на шаг раньше: ширина — по его размеру словаря
+        limit = size if prev_len < 0 or size == max_codes else size + 1
+        width = (limit - 1).bit_length()
+        if pos + width > total_bits:
+            raise ValueError("unexpected EOF in archive data")
+        j = pos >> 3
+        v = (buf[j] << 16) | (buf[j + 1] << 8) | buf[j + 2]
+        code = (v >> (24 - (pos & 7) - width)) & ((1 << width) - 1)
+        pos += width
+
+        if code == CLEAR:
+            size = FIRST_CODE
+            prev_len = -1
+            continue
+        start = len(out)
+        if code < 256:
+            out.append(code)
+            length = 1
+        elif code < size:
+            off = offs[code]
+            length = lens[code]
+            out += out[off:off + length]
+        elif code == size and prev_len >= 0:
+            # строка, которой декодер ещё не знает: предыдущая + её первый байт
+            length = prev_len + 1
+            out += out[prev_off:prev_off + prev_len]
+            out.append(out[prev_off])
+        else:
+            raise ValueError(f"bad LZW code: {code}")
+        if prev_len >= 0 and size < max_codes:
+            # новая строка = предыдущая + первый байт текущей: она лежит в out подряд
+            offs[size] = prev_off
+            lens[size] = prev_len + 1
+            size += 1
+        prev_off = start
+        prev_len = length
+    if len(out) != n:
+        raise ValueError("LZW data longer than original size")
+    return bytes(out)
+
+
+def encode_payload(data, max_bits=MAX_BITS, policy=DEFAULT_POLICY):
+    """Сжать данные в памяти: max_bits + коды LZW."""
+    return bytes([max_bits]) + encode_codes(data, max_bits, policy)
+
+
+def decode_payload(payload, n):
+    """Распаковать n байт из payload LZW."""
+    if not payload:
+        raise ValueError("empty LZW payload")
+    return decode_codes(memoryview(payload)[1:], n, payload[0])
+
+
+def encode(input_path: str, archive_path: str, max_bits=MAX_BITS, policy=DEFAULT_POLICY):
+    """Сжать файл LZW."""
+    with open(input_path, "rb") as f:
+        data = f.read()
+
+    n = len(data)
+    with open(archive_path, "wb") as f:
+        header = struct.pack(HEADER_FMT, SIGNATURE, VERSION, ALGORITHM)
+        header = header[:9] + struct.pack("<Q", n)[:7]
+        f.write(header)
+        f.write(encode_payload(data, max_bits, policy))
+
+def decode(archive_path: str, output_path: str):
+    """Распаковать файл, сжатый LZW."""
+    with open(archive_path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("short header")
+
+        sig = header[:6]
+        ver = struct.unpack("<H", header[6:8])[0]
+        alg = header[8]
+
+        if sig != SIGNATURE:
+            raise ValueError("bad signature")
+        if ver != VERSION:
+            raise ValueError(f"unsupported version: {ver}")
+        if alg != ALGORITHM:
+            raise ValueError(f"wrong algorithm: {alg}")
+
+        n = struct.unpack("<Q", header[9:16] + b"\x00")[0]
+        payload = f.read()
+
+    data = decode_payload(payload, n)
+    with open(output_path, "wb") as f:
+        f.write(data)
+
+def bench(paths):
+    """сравнить политики LZW с lzss.py (уровень 1) и n1.py: размер payload и скорость."""
+    lzss = load_module("lzss", os.path.join(base_dir, "lzss.py"))
+    huffman_codec = lzss.huffman_codec
+    codecs = (("lzw reset", lambda d: encode_payload(d, policy="reset"), decode_payload),
+              ("lzw freeze", lambda d: encode_payload(d, policy="freeze"), decode_payload),
+              ("lzss 1", lambda d: lzss.encode_payload(d, 1), lzss.decode_payload),
+              ("n1", huffman_codec.encode_payload, huffman_codec.decode_payload))
+    print(f"{'file':<24} {'codec':<10} {'payload':>10} {'enc MB/s':>9} {'dec MB/s':>9}")
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        n = len(data)
+        for name, enc, dec in codecs:
+            t0 = time.perf_counter()
+            payload = enc(data)
+            t1 = time.perf_counter()
+            if dec(payload, n) != data:
+                raise ValueError(f"round trip failed: {path} ({name})")
+            t2 = time.perf_counter()
+            print(f"{os.path.basename(path)[:24]:<24} {name:<10} {len(payload):>10}"
+                  f" {n / 1e6 / max(t1 - t0, 1e-9):>9.2f} {n / 1e6 / max(t2 - t1, 1e-9):>9.2f}")
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "bench":
+        bench(argv[1:])
+        return 0
+    if len(argv) < 3:
+        print("usage: lzw.py encode <input> <archive> [--max-bits=9..16] [--policy=reset|freeze]"
+              " | lzw.py decode <archive> <output> | lzw.py bench <file>...", file=sys.stderr)
+        return 2
+
+    cmd = argv[0]
+    try:
+        if cmd == "encode":
+            max_bits = MAX_BITS
+            policy = DEFAULT_POLICY
+            for arg in argv[3:]:
+                if arg.startswith("--max-bits="):
+                    max_bits = int(arg.split("=", 1)[1])
+                elif arg.startswith("--policy="):
+                    policy = arg.split("=", 1)[1]
+            encode(argv[1], argv[2], max_bits, policy)
+            return 0
+        elif cmd == "decode":
+            decode(argv[1], argv[2])
+            return 0
+        else:
+            return 2
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
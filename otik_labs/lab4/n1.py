@@ -26,6 +26,7 @@ import struct
 import sys
 from typing import BinaryIO
 import heapq
+import importlib.util
 
 SIGNATURE = b"SOBSTV"
 VERSION = 0
@@ -34,6 +35,19 @@ ALGORITHM = 1  # Хаффман
 HEADER_FMT = "<6sHBxxxxxxx"  # sig(6), ver(2), alg(1), padding(7)
 HEADER_SIZE = 16
 
+def load_shared(name, path):
+    """загрузить модуль с общим на процесс состоянием (кэшем) один раз."""
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return module
+
+tablecache = load_shared("otik_tablecache", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablecache.py"))
+histogram = load_shared("otik_histogram", os.path.join(os.path.dirname(os.path.abspath(__file__)), "histogram.py"))
+
 class HuffNode:
     def __init__(self, symbol=None, freq=0, left=None, right=None):
         self.symbol = symbol
@@ -88,6 +102,15 @@ def build_codes(node, prefix="", codes=None):
             build_codes(node.right, prefix + "1", codes)
     return codes
 
+def codes_for_freqs(freqs):
+    """словарь кодов по таблице частот (пустой, если символов нет)."""
+    tree = build_huffman_tree(freqs)
+    return build_codes(tree) if tree is not None else {}
+
+def code_table(freqs):
+    """готовые коды и таблица декодирования из общего кэша (tablecache.py)."""
+    return tablecache.get(ALGORITHM, freqs, codes_for_freqs)
+
 def normalize_freqs(counts, n):
     """Нормализовать частоты к диапазону 0..255 (uint8)."""
     if n == 0:
@@ -101,28 +124,32 @@ def normalize_freqs(counts, n):
     
     return freqs
 
-def encode(input_path: str, archive_path: str):
-    """Сжать файл методом Хаффмана."""
-    # читаем входной файл
-    with open(input_path, "rb") as f:
-        data = f.read()
-    
+def pack_bits(bits):
+    """упаковать список битов в байты (старший бит — первый)."""
+    compressed = bytearray()
+    for i in range(0, len(bits), 8):
+        byte_bits = bits[i:i+8]
+        byte_val = 0
+        for j, bit in enumerate(byte_bits):
+            byte_val |= (bit << (7 - j))
+        compressed.append(byte_val)
+    return compressed
+
+def encode_payload(data):
+    """Сжать данные в памяти: таблица частот (256 байт) + сжатые биты.
+
+    Это всё, что идёт в архиве после 16-байтового заголовка.
+    """
     n = len(data)
     
     # подсчитываем частоты байтов
-    counts = [0] * 256
-    for byte in data:
-        counts[byte] += 1
+    counts = histogram.byte_counts(data)
     
     # нормализуем к uint8
     freqs = normalize_freqs(counts, n)
     
-    # строим дерево и коды
-    tree = build_huffman_tree(freqs)
-    if tree is None:
-        codes = {}
-    else:
-        codes = build_codes(tree)
+    # коды (дерево строится один раз на таблицу — кэш)
+    codes = code_table(freqs).codes
     
     # кодируем данные
     bits = []
@@ -131,13 +158,28 @@ def encode(input_path: str, archive_path: str):
             bits.extend([int(b) for b in codes[byte]])
     
     # упаковываем биты в байты
-    compressed = bytearray()
-    for i in range(0, len(bits), 8):
-        byte_bits = bits[i:i+8]
-        byte_val = 0
-        for j, bit in enumerate(byte_bits):
-            byte_val |= (bit << (7 - j))
-        compressed.append(byte_val)
+    return bytes(freqs) + bytes(pack_bits(bits))
+
+def decode_payload(payload, n):
+    """Распаковать n байт из таблицы частот + сжатых битов (без заголовка)."""
+    if len(payload) < 256:
+        raise ValueError("short freqs table")
+    freqs = list(payload[:256])
+    
+    # таблица декодирования из кэша
+    table = code_table(freqs)
+    if not table.codes and n > 0:
+        raise ValueError("no tree for non-empty file")
+    
+    return tablecache.decode_bits(table.decoder, payload[256:], n)
+
+def encode(input_path: str, archive_path: str):
+    """Сжать файл методом Хаффмана."""
+    # читаем входной файл
+    with open(input_path, "rb") as f:
+        data = f.read()
+    
+    n = len(data)
     
     # записываем архив
     with open(archive_path, "wb") as f:
@@ -147,11 +189,8 @@ def encode(input_path: str, archive_path: str):
         header = header[:9] + struct.pack("<Q", n)[:7]
         f.write(header)
         
-        # таблица частот
-        f.write(bytes(freqs))
-        
-        # сжатые данные
-        f.write(compressed)
+        # таблица частот и сжатые данные
+        f.write(encode_payload(data))
 
 def decode(archive_path: str, output_path: str):
     """Распаковать файл методом Хаффмана."""
@@ -176,54 +215,12 @@ def decode(archive_path: str, output_path: str):
         n_bytes = header[9:16] + b'\x00'
         n = struct.unpack("<Q", n_bytes)[0]
         
-        # читаем таблицу частот
-        freqs_raw = f.read(256)
-        if len(freqs_raw) != 256:
-            raise ValueError("short freqs table")
-        freqs = list(freqs_raw)
-        
-        # строим дерево
-        tree = build_huffman_tree(freqs)
-        if tree is None and n > 0:
-            raise ValueError("no tree for non-empty file")
-        
-        # читаем сжатые данные
-        compressed = f.read()
-    
-    # декодируем
-    decoded = bytearray()
-    node = tree
-    bits_processed = 0
-    
-    for byte in compressed:
-        for i in range(8):
-            if len(decoded) >= n:
-                break
-            
-            bit = (byte >> (7 - i)) & 1
-            bits_processed += 1
-            
-            if node.symbol is not None:
-                decoded.append(node.symbol)
-                node = tree
-                if len(decoded) >= n:
-                    break
-            
-            if bit == 0:
-                node = node.left
-            else:
-                node = node.right if node.right else node.left
-            
-            if node.symbol is not None:
-                decoded.append(node.symbol)
-                node = tree
-        
-        if len(decoded) >= n:
-            break
+        # таблица частот и сжатые данные
+        payload = f.read()
     
     # записываем результат
     with open(output_path, "wb") as f:
-        f.write(decoded[:n])
+        f.write(decode_payload(payload, n))
 
 def main(argv):
     if len(argv) < 3:
@@ -18,8 +18,23 @@ CLI:
 """
 from __future__ import annotations
 import math
+import os
 import sys
 import heapq
+import importlib.util
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+histogram = load_module("histogram", os.path.join(os.path.dirname(os.path.abspath(__file__)), "histogram.py"))
+statcache = load_module("otik_statcache", os.path.join(os.path.dirname(os.path.abspath(__file__)), "statcache.py"))
+
+# версия результатов calc_results в кэше: увеличить при изменении расчёта
+RESULTS_VERSION = 1
 
 class HuffNode:
     def __init__(self, symbol=None, freq=0, left=None, right=None):
@@ -86,19 +101,17 @@ def normalize_freqs(counts, n, max_val):
     
     return freqs
 
-def calc_compressed_size(data, freqs):
-    """Рассчитать размер сжатых данных в битах для данных частот."""
+def calc_compressed_size(counts, freqs):
+    """Рассчитать размер сжатых данных в битах для данных частот.
+
+    counts — реальные частоты байтов данных (считаются один раз на файл).
+    """
     tree = build_huffman_tree(freqs)
     if tree is None:
         return 0
     
     codes = build_codes(tree)
     
-    # подсчитываем реальные частоты в данных
-    counts = [0] * 256
-    for byte in data:
-        counts[byte] += 1
-    
     # считаем общую длину в битах
     total_bits = 0
     for i in range(256):
@@ -108,23 +121,51 @@ def calc_compressed_size(data, freqs):
     return total_bits
 
 def analyze_file(filename, all_bits=False):
-    """Анализировать файл для разных разрядностей."""
-    with open(filename, "rb") as f:
-        data = f.read()
-    
-    n = len(data)
-    if n == 0:
+    """Анализировать файл для разных разрядностей.
+
+    Частоты и результаты берутся из постоянного кэша (statcache.py): для
+    неизменного файла данные не читаются и деревья не строятся.
+    """
+    entry = statcache.entry(filename)
+    if entry.size == 0:
         print(f"Файл {filename} пуст")
         return
     
     # подсчитываем частоты
-    counts = [0] * 256
-    for byte in data:
-        counts[byte] += 1
+    counts = entry.byte_counts()
+    n = sum(counts)
     
     print(f"\nАнализ файла: {filename}")
     print(f"Размер: {n} байт\n")
     
+    # JSON хранит ключи строками
+    name = "n2.bits-all" if all_bits else "n2.bits"
+    cached = entry.value(name, RESULTS_VERSION, lambda: calc_results(counts, n, all_bits))
+    results = {int(bits): r for bits, r in cached.items()}
+    
+    for bits, r in results.items():
+        if bits in [64, 32, 8, 4] or all_bits:
+            print(f"B = {bits:2d} бит:")
+            print(f"  E{bits} = {r['E']:10d} байт (сжатые данные)")
+            print(f"  G{bits} = {r['G']:10d} байт (архив с таблицей {r['freq_size']} байт)")
+            if not all_bits:
+                print()
+    
+    # определяем оптимальную разрядность
+    best_bits = min(results.keys(), key=lambda b: results[b]['G'])
+    print(f"Оптимальная разрядность B* = {best_bits} бит (минимальный G = {results[best_bits]['G']} байт)")
+    
+    # рекомендация для фиксированной разрядности
+    if not all_bits:
+        print(f"\nРекомендуемая фиксированная разрядность B** = 8 бит")
+        print(f"  - Удобна в чтении/записи (по 1 байту на частоту)")
+        print(f"  - Таблица 256 байт (компактна)")
+        print(f"  - G8 = {results[8]['G']} байт")
+    
+    return results
+
+def calc_results(counts, n, all_bits=False):
+    """E, G и размер таблицы для каждой разрядности: {bits: {'E', 'G', 'freq_size'}}."""
     results = {}
     
     # варианты разрядностей
@@ -148,7 +189,7 @@ def analyze_file(filename, all_bits=False):
             freqs = normalize_freqs(counts, n, max_val)
         
         # размер сжатых данных в битах
-        compressed_bits = calc_compressed_size(data, freqs)
+        compressed_bits = calc_compressed_size(counts, freqs)
         E = math.ceil(compressed_bits / 8)  # в байтах
         
         # размер таблицы частот
@@ -162,24 +203,6 @@ def analyze_file(filename, all_bits=False):
             'G': G,
             'freq_size': freq_table_size,
         }
-        
-        if bits in [64, 32, 8, 4] or all_bits:
-            print(f"B = {bits:2d} бит:")
-            print(f"  E{bits} = {E:10d} байт (сжатые данные)")
-            print(f"  G{bits} = {G:10d} байт (архив с таблицей {freq_table_size} байт)")
-            if not all_bits:
-                print()
-    
-    # определяем оптимальную разрядность
-    best_bits = min(results.keys(), key=lambda b: results[b]['G'])
-    print(f"Оптимальная разрядность B* = {best_bits} бит (минимальный G = {results[best_bits]['G']} байт)")
-    
-    # рекомендация для фиксированной разрядности
-    if not all_bits:
-        print(f"\nРекомендуемая фиксированная разрядность B** = 8 бит")
-        print(f"  - Удобна в чтении/записи (по 1 байту на частоту)")
-        print(f"  - Таблица 256 байт (компактна)")
-        print(f"  - G8 = {results[8]['G']} байт")
     
     return results
 
@@ -6,9 +6,23 @@
 - алг. 0: декодер из Л3.№3 (без сжатия)
 - алг. 1: декодер Хаффмана из Л4.№1
 - алг. 2: декодер Шеннона-Фано из Л4.№6
+- алг. 3: Хаффман с обученным словарём (dict_huffman.py)
+- алг. 4: Хаффман с контекстом 1-го порядка (context_huffman.py)
+- алг. 5: интервальное кодирование (range_coder.py)
+- алг. 6: rANS с чередованием состояний (rans_coder.py)
+- алг. 7: LZSS + Хаффман для потоков токенов (lzss.py)
+- алг. 8: LZW с кодами переменной длины (lzw.py)
+- алг. 9: BWT + MTF + RLE + Хаффман, блоки параллельно (bwt.py)
+- алг. 10: Хаффман по кодовым точкам Unicode (unicode_huffman.py)
+- алг. 11: участки без сжатия / Хаффман по профилю энтропии (entropy_profile.py)
+
+Модули декодеров загружаются один раз на процесс, а таблицы кодов алгоритмов 1/2
+берутся из общего кэша (tablecache.py) — decode-many распаковывает пачку архивов,
+почти не строя деревьев, и печатает статистику кэша.
 
 CLI:
   decode <archive> <output>
+  decode-many <out_dir> <archive1> [<archive2> ...]
 """
 from __future__ import annotations
 import struct
@@ -18,6 +32,44 @@ import importlib.util
 
 SIGNATURE = b"SOBSTV"
 
+# код алгоритма -> (имя модуля, путь относительно lab4, описание)
+DECODERS = {
+    0: ("lab3_n1", os.path.join("..", "lab3", "n1.py"), "no compression"),
+    1: ("lab4_n1", "n1.py", "Huffman"),
+    2: ("lab4_n6", "n6.py", "Shannon-Fano"),
+    3: ("dict_huffman", "dict_huffman.py", "Huffman, dictionary"),
+    4: ("context_huffman", "context_huffman.py", "Huffman, order-1 context"),
+    5: ("range_coder", "range_coder.py", "range coder"),
+    6: ("rans_coder", "rans_coder.py", "rANS"),
+    7: ("lzss", "lzss.py", "LZSS + Huffman"),
+    8: ("lzw", "lzw.py", "LZW"),
+    9: ("bwt", "bwt.py", "BWT + MTF + RLE + Huffman"),
+    10: ("unicode_huffman", "unicode_huffman.py", "Huffman, Unicode code points"),
+    11: ("entropy_profile", "entropy_profile.py", "stored / Huffman regions by entropy profile"),
+}
+_decoders = {}
+
+def _decoder(alg):
+    """модуль декодера алгоритма (загружается один раз на процесс)."""
+    if alg not in _decoders:
+        name, rel_path, _ = DECODERS[alg]
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), rel_path)
+        module = sys.modules.get(name)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            # по имени модуля процессы-вычислители декодера находят его функции (bwt.py)
+            sys.modules[name] = module
+            spec.loader.exec_module(module)
+        _decoders[alg] = module
+    return _decoders[alg]
+
+def decode_payload(alg, payload, n):
+    """данные по payload архива (без 16-байтового заголовка) алгоритма alg ≠ 0."""
+    if alg not in DECODERS or alg == 0:
+        raise ValueError(f"unknown algorithm: {alg}")
+    return _decoder(alg).decode_payload(payload, n)
+
 def read_header(archive_path):
     """Прочитать заголовок и определить алгоритм."""
     with open(archive_path, "rb") as f:
@@ -60,45 +112,43 @@ def decode(archive_path: str, output_path: str):
         raise ValueError(f"unsupported version: {ver}")
     
     # выбираем декодер по алгоритму
-    if alg == 0:
-        # без сжатия - декодер из Л3
-        lab3_path = os.path.join(os.path.dirname(__file__), "..", "lab3", "n1.py")
-        spec = importlib.util.spec_from_file_location("lab3_n1", lab3_path)
-        lab3_n1 = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(lab3_n1)
-        lab3_n1.decode(archive_path, output_path)
-        print(f"Decoded with algorithm 0 (no compression)")
-    elif alg == 1:
-        # Хаффман
-        lab4_n1_path = os.path.join(os.path.dirname(__file__), "n1.py")
-        spec = importlib.util.spec_from_file_location("lab4_n1", lab4_n1_path)
-        lab4_n1 = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(lab4_n1)
-        lab4_n1.decode(archive_path, output_path)
-        print(f"Decoded with algorithm 1 (Huffman)")
-    elif alg == 2:
-        # Шеннон-Фано
-        lab4_n6_path = os.path.join(os.path.dirname(__file__), "n6.py")
-        spec = importlib.util.spec_from_file_location("lab4_n6", lab4_n6_path)
-        lab4_n6 = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(lab4_n6)
-        lab4_n6.decode(archive_path, output_path)
-        print(f"Decoded with algorithm 2 (Shannon-Fano)")
-    else:
+    if alg not in DECODERS:
         raise ValueError(f"unknown algorithm: {alg}")
+    _decoder(alg).decode(archive_path, output_path)
+    print(f"Decoded with algorithm {alg} ({DECODERS[alg][2]})")
+
+def decode_many(out_dir: str, archive_paths):
+    """Распаковать много архивов в out_dir одним процессом.
+
+    Модули декодеров загружаются один раз, таблицы кодов берутся из общего кэша
+    (tablecache.py): для архивов с одинаковыми таблицами дерево не строится заново.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for archive_path in archive_paths:
+        name = os.path.basename(archive_path)
+        if name.endswith(".otik"):
+            name = name[:-len(".otik")]
+        decode(archive_path, os.path.join(out_dir, name))
+    tablecache = sys.modules.get("otik_tablecache")
+    if tablecache is not None:
+        print(tablecache.format_stats())
 
 def main(argv):
+    usage = "usage: n3.py decode <archive> <output> | n3.py decode-many <out_dir> <archive>..."
     if len(argv) < 3:
-        print("usage: n3.py decode <archive> <output>", file=sys.stderr)
+        print(usage, file=sys.stderr)
         return 2
     
     cmd = argv[0]
-    if cmd != "decode":
-        print("usage: n3.py decode <archive> <output>", file=sys.stderr)
+    if cmd not in ("decode", "decode-many"):
+        print(usage, file=sys.stderr)
         return 2
     
     try:
-        decode(argv[1], argv[2])
+        if cmd == "decode":
+            decode(argv[1], argv[2])
+        else:
+            decode_many(argv[1], argv[2:])
         return 0
     except Exception as e:
         print(f"error: {e}", file=sys.stderr)
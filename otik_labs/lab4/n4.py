@@ -5,12 +5,39 @@
 Анализирует эффективность сжатия и выбирает:
 - алгоритм 1 (Хаффман), если сжатие выгодно
 - алгоритм 0 (без сжатия), если ncompr >= n
+- алгоритм 4 (Хаффман с контекстом 1-го порядка), если это короче всего
+- алгоритм 8 (LZW), если это короче всего (payload считается кодированием
+  целиком — LZW быстрый, и при выборе он же записывается в архив)
+- алгоритм 10 (Хаффман по кодовым точкам Unicode), если это короче всего —
+  обычно для текста UTF-8 с кириллицей
+- алгоритм 11 (участки без сжатия / Хаффман по профилю энтропии), если в файле
+  есть и сжимаемые, и несжимаемые участки и это короче всего
+- алгоритм 3 (Хаффман со словарём), если задан --dict=FILE и это короче всего
 
-Флаг --force-algorithm позволяет принудительно использовать заданный алгоритм.
+Флаг --force-algorithm позволяет принудительно использовать заданный алгоритм
+(для алгоритма 3 нужен --dict; для алгоритмов 7 (LZSS) и 9 (BWT) уровень
+задаёт --level).
+
+transcode перекодирует готовый архив в другой алгоритм (любой, кроме 3 — ему нужен
+словарь) без временных файлов: исходные данные алгоритмов 0/1/2 декодируются
+кусками в память и сразу подаются целевому кодеру, остальных — целиком через
+реестр n3.py. Если меняется только таблица (1 <-> 2), длина n и нормализованная
+таблица частот берутся из исходного архива — повторный подсчёт не нужен.
+Архивы Л3.№2 (каталоги) перекодируются по записям в алгоритмы 0, 1, 2, 7, 9, 10;
+--to=7 / --to=9 для них —
+контекстная стадия LZSS (comp_ctx = 1) / BWT (comp_ctx = 2) с Хаффманом для
+потоков (comp_nctx = 1). --filters задаёт предварительные фильтры записей
+(lab3/n2/filters.py): auto — выбор по выборке для каждой записи, или цепочка
+вида delta16:1,planes:2.
+
+profile печатает карту участков файла по энтропии скользящего окна
+(entropy_profile.py) — ту же, по которой кодирует алгоритм 11.
 
 CLI:
-  encode <input> <archive> [--force-algorithm=N]
+  encode <input> <archive> [--force-algorithm=N] [--dict=FILE] [--level=1..9]
   decode <archive> <output>
+  transcode <in> <out> --to=N [--level=1..9] [--filters=auto|none|CHAIN]
+  profile <file> [--window=N] [--stride=N] [--threshold=BITS] [--windows]
 """
 from __future__ import annotations
 import os
@@ -30,35 +57,48 @@ def load_module(name, path):
 
 base_dir = os.path.dirname(__file__)
 huffman_codec = load_module("huffman_codec", os.path.join(base_dir, "n1.py"))
+pipeline = load_module("pipeline", os.path.join(base_dir, "pipeline.py"))
+dict_huffman = load_module("dict_huffman", os.path.join(base_dir, "dict_huffman.py"))
+context_huffman = load_module("context_huffman", os.path.join(base_dir, "context_huffman.py"))
+range_coder = load_module("range_coder", os.path.join(base_dir, "range_coder.py"))
+rans_coder = load_module("rans_coder", os.path.join(base_dir, "rans_coder.py"))
+lzss = load_module("lzss", os.path.join(base_dir, "lzss.py"))
+lzw = load_module("lzw", os.path.join(base_dir, "lzw.py"))
+unicode_huffman = load_module("unicode_huffman", os.path.join(base_dir, "unicode_huffman.py"))
+entropy_profile = load_module("entropy_profile", os.path.join(base_dir, "entropy_profile.py"))
+# с регистрацией в sys.modules: блоки BWT кодируются в процессах
+bwt = huffman_codec.load_shared("bwt", os.path.join(base_dir, "bwt.py"))
+histogram = huffman_codec.histogram
+statcache = huffman_codec.load_shared("otik_statcache", os.path.join(base_dir, "statcache.py"))
+
+# версия оценки _huffman_archive_size в кэше: увеличить при изменении оценки
+HUFFMAN_SIZE_VERSION = 1
 
 
 def estimate_huffman_size(input_path):
-    """Оценить размер архива Хаффмана без реального сжатия."""
-    with open(input_path, "rb") as f:
-        data = f.read()
-    
-    n = len(data)
+    """Оценить размер архива Хаффмана без реального сжатия.
+
+    Гистограмма и сама оценка берутся из постоянного кэша (statcache.py):
+    для файла, не менявшегося с прошлого запуска, данные не читаются.
+    """
+    entry = statcache.entry(input_path)
+    return entry.value("n4.huffman_size", HUFFMAN_SIZE_VERSION,
+                       lambda: _huffman_archive_size(entry.byte_counts()))
+
+def _huffman_archive_size(counts):
+    """размер архива Хаффмана по гистограмме байтов."""
+    n = sum(counts)
     if n == 0:
         return 0
     
-    # подсчитываем частоты
-    counts = [0] * 256
-    for byte in data:
-        counts[byte] += 1
-    
-    # строим дерево и коды
+    # коды берутся из общего кэша: encode() ниже дерево заново не строит
     freqs = huffman_codec.normalize_freqs(counts, n)
-    tree = huffman_codec.build_huffman_tree(freqs)
-    if tree is None:
+    codes = huffman_codec.code_table(freqs).codes
+    if not codes:
         return 16 + 256  # заголовок + таблица
     
-    codes = huffman_codec.build_codes(tree)
-    
-    # считаем длину сжатых данных в битах
-    total_bits = 0
-    for byte in data:
-        if byte in codes:
-            total_bits += len(codes[byte])
+    # считаем длину сжатых данных в битах: по гистограмме, не по байтам
+    total_bits = histogram.code_bits(counts, codes)
     
     compressed_bytes = (total_bits + 7) // 8
     
@@ -67,7 +107,15 @@ def estimate_huffman_size(input_path):
     
     return total_size
 
-def encode(input_path: str, archive_path: str, force_algorithm=None):
+def estimate_dict_size(input_path, dictionary):
+    """Оценить размер архива алгоритма 3: таблицы нет, коды уже готовы."""
+    codes = dictionary.codes
+    total_bits = histogram.code_bits(statcache.entry(input_path).byte_counts(), codes)
+    
+    # заголовок + ID словаря + сжатые данные
+    return 16 + 4 + (total_bits + 7) // 8
+
+def encode(input_path: str, archive_path: str, force_algorithm=None, dict_path=None, level=None):
     """Интеллектуальное сжатие."""
     n = os.stat(input_path).st_size
     
@@ -80,6 +128,37 @@ def encode(input_path: str, archive_path: str, force_algorithm=None):
         elif force_algorithm == 1:
             print(f"Forced algorithm 1 (Huffman)")
             huffman_codec.encode(input_path, archive_path)
+        elif force_algorithm == 3:
+            if dict_path is None:
+                raise ValueError("algorithm 3 requires --dict=FILE")
+            print(f"Forced algorithm 3 (Huffman, dictionary)")
+            dict_huffman.encode(input_path, archive_path, dict_path)
+        elif force_algorithm == 4:
+            print(f"Forced algorithm 4 (Huffman, order-1 context)")
+            context_huffman.encode(input_path, archive_path)
+        elif force_algorithm == 5:
+            print(f"Forced algorithm 5 (range coder)")
+            range_coder.encode(input_path, archive_path)
+        elif force_algorithm == 6:
+            print(f"Forced algorithm 6 (rANS)")
+            rans_coder.encode(input_path, archive_path)
+        elif force_algorithm == 7:
+            level = lzss.DEFAULT_LEVEL if level is None else level
+            print(f"Forced algorithm 7 (LZSS + Huffman, level {level})")
+            lzss.encode(input_path, archive_path, level)
+        elif force_algorithm == 8:
+            print(f"Forced algorithm 8 (LZW)")
+            lzw.encode(input_path, archive_path)
+        elif force_algorithm == 9:
+            level = bwt.DEFAULT_LEVEL if level is None else level
+            print(f"Forced algorithm 9 (BWT + MTF + RLE + Huffman, level {level})")
+            bwt.encode(input_path, archive_path, level)
+        elif force_algorithm == 10:
+            print(f"Forced algorithm 10 (Huffman, Unicode code points)")
+            unicode_huffman.encode(input_path, archive_path)
+        elif force_algorithm == 11:
+            print(f"Forced algorithm 11 (stored / Huffman regions)")
+            entropy_profile.encode(input_path, archive_path)
         else:
             raise ValueError(f"unknown algorithm: {force_algorithm}")
         return
@@ -92,6 +171,59 @@ def encode(input_path: str, archive_path: str, force_algorithm=None):
     print(f"Estimated Huffman archive: {huffman_size} bytes")
     print(f"Raw archive: {raw_size} bytes")
     
+    with open(input_path, "rb") as f:
+        data = f.read()
+    context_size = context_huffman.estimate_size(data)
+    print(f"Estimated order-1 context archive: {context_size} bytes")
+    lzw_payload = lzw.encode_payload(data)
+    lzw_size = 16 + len(lzw_payload)  # заголовок + payload
+    print(f"LZW archive: {lzw_size} bytes")
+    unicode_size = unicode_huffman.estimate_size(data)
+    print(f"Estimated code-point Huffman archive: {unicode_size} bytes")
+    
+    # участки по профилю энтропии: имеет смысл, только если есть оба вида
+    regions = entropy_profile.regions_of(data)
+    kinds = {r.kind for r in regions}
+    regions_size = raw_size + 1
+    if kinds == {entropy_profile.STORED, entropy_profile.CODED}:
+        regions_size = entropy_profile.estimate_size(data, regions)
+        stored = sum(r.length for r in regions if r.kind == entropy_profile.STORED)
+        print(f"Estimated stored/Huffman regions archive: {regions_size} bytes "
+              f"({len(regions)} regions, {stored} bytes stored)")
+    
+    if dict_path is not None:
+        dictionary = dict_huffman.read_dictionary(dict_path)
+        dict_size = estimate_dict_size(input_path, dictionary)
+        print(f"Estimated dictionary archive: {dict_size} bytes (dictionary {dictionary.id:08x})")
+        if dict_size < min(huffman_size, raw_size, context_size, lzw_size, unicode_size, regions_size):
+            print(f"Using algorithm 3 (Huffman, dictionary) - saves {raw_size - dict_size} bytes")
+            dict_huffman.encode(input_path, archive_path, dict_path)
+            return
+    
+    if regions_size < min(huffman_size, raw_size, context_size, lzw_size, unicode_size):
+        print(f"Using algorithm 11 (stored / Huffman regions) - saves {raw_size - regions_size} bytes")
+        with open(archive_path, "wb") as f:
+            f.write(pipeline.make_header(entropy_profile.ALGORITHM, n))
+            f.write(entropy_profile.encode_payload(data, regions))
+        return
+    
+    if lzw_size < min(huffman_size, raw_size, context_size, unicode_size):
+        print(f"Using algorithm 8 (LZW) - saves {raw_size - lzw_size} bytes")
+        with open(archive_path, "wb") as f:
+            f.write(pipeline.make_header(lzw.ALGORITHM, n))
+            f.write(lzw_payload)
+        return
+    
+    if unicode_size < min(huffman_size, raw_size, context_size):
+        print(f"Using algorithm 10 (Huffman, Unicode code points) - saves {raw_size - unicode_size} bytes")
+        unicode_huffman.encode(input_path, archive_path)
+        return
+    
+    if context_size < min(huffman_size, raw_size):
+        print(f"Using algorithm 4 (Huffman, order-1 context) - saves {raw_size - context_size} bytes")
+        context_huffman.encode(input_path, archive_path)
+        return
+    
     if huffman_size < raw_size:
         print(f"Using algorithm 1 (Huffman) - saves {raw_size - huffman_size} bytes")
         huffman_codec.encode(input_path, archive_path)
@@ -105,25 +237,189 @@ def decode(archive_path: str, output_path: str):
     n3 = load_module("universal_decoder", os.path.join(base_dir, "n3.py"))
     n3.decode(archive_path, output_path)
 
+def _source_chunks(f, alg, n, freqs, chunk=pipeline.CHUNK):
+    """декодированные данные исходного архива кусками (f стоит на начале payload)."""
+    if alg == 0:
+        left = n
+        while left:
+            buf = f.read(min(chunk, left))
+            if not buf:
+                raise ValueError("unexpected EOF in archive data")
+            left -= len(buf)
+            yield buf
+        return
+    codec = huffman_codec if alg == 1 else pipeline.sf_codec
+    table = codec.code_table(freqs)
+    if not table.codes:
+        if n:
+            raise ValueError("no tree for non-empty file")
+        return
+    dec = pipeline.StreamDecoder(table.decoder, n)
+    while dec.left:
+        buf = f.read(chunk)
+        if not buf:
+            raise ValueError("unexpected EOF in archive data")
+        yield dec.feed(buf)
+
+# алгоритм Л4 -> код контекстной стадии comp_ctx в архивах Л3.№2
+CONTEXT_STAGES = {7: 1, 9: 2}
+
+# целевые алгоритмы, которым нужен весь вход целиком: алгоритм -> модуль с encode_payload(data)
+WHOLE_INPUT_CODECS = {
+    context_huffman.ALGORITHM: context_huffman,
+    range_coder.ALGORITHM: range_coder,
+    rans_coder.ALGORITHM: rans_coder,
+    lzw.ALGORITHM: lzw,
+    unicode_huffman.ALGORITHM: unicode_huffman,
+    entropy_profile.ALGORITHM: entropy_profile,
+}
+
+def transcode(in_path: str, out_path: str, to_algorithm: int, level=None, filters=None):
+    """Перекодировать архив в алгоритм to_algorithm без временных файлов."""
+    if to_algorithm == dict_huffman.ALGORITHM:
+        raise ValueError(f"transcode to {to_algorithm} is not supported (it needs a dictionary)")
+    if to_algorithm not in (0, 1, 2) and to_algorithm not in CONTEXT_STAGES and to_algorithm not in WHOLE_INPUT_CODECS:
+        raise ValueError(f"unknown algorithm: {to_algorithm}")
+    
+    with open(in_path, "rb") as f:
+        sig8 = f.read(8)
+    lab3_n2 = load_module("lab3_n2", os.path.join(base_dir, "..", "lab3", "n2", "n2.py"))
+    if sig8 == lab3_n2.SIG:
+        # архив Л3.№2 — перекодируем каждую запись
+        if to_algorithm not in (0, 1, 2, unicode_huffman.ALGORITHM) and to_algorithm not in CONTEXT_STAGES:
+            raise ValueError(f"transcode to {to_algorithm} is not supported for directory archives")
+        chain = filters if filters in (None, "auto") else lab3_n2.filters.parse_chain(filters)
+        if to_algorithm in CONTEXT_STAGES:
+            lab3_n2.transcode(in_path, out_path, 1, comp_ctx=CONTEXT_STAGES[to_algorithm], level=level,
+                              filters_chain=chain)
+        else:
+            lab3_n2.transcode(in_path, out_path, to_algorithm, filters_chain=chain)
+        print(f"Transcoded directory archive to algorithm {to_algorithm}")
+        return
+    if filters is not None:
+        raise ValueError("--filters applies only to directory archives")
+    
+    n3 = load_module("universal_decoder", os.path.join(base_dir, "n3.py"))
+    sig, ver, alg = n3.read_header(in_path)
+    if sig != SIGNATURE:
+        raise ValueError(f"bad signature: expected {SIGNATURE}, got {sig}")
+    if ver != VERSION:
+        raise ValueError(f"unsupported version: {ver}")
+    if alg not in n3.DECODERS:
+        raise ValueError(f"unknown algorithm: {alg}")
+    
+    with open(in_path, "rb") as f:
+        header = f.read(16)
+        freqs = None
+        if alg == 0:
+            n = struct.unpack("<Q", header[8:16])[0]
+        else:
+            n = struct.unpack("<Q", header[9:16] + b"\x00")[0]
+        if alg in (1, 2):
+            freqs = list(f.read(256))
+            if len(freqs) != 256:
+                raise ValueError("short freqs table")
+        payload_start = f.tell()
+        if alg in (0, 1, 2):
+            source = lambda: _source_chunks(f, alg, n, freqs)
+        else:
+            # остальные алгоритмы потоково не декодируются — целиком через реестр n3
+            whole = n3.decode_payload(alg, f.read(), n)
+            source = lambda: iter([whole] if whole else [])
+        
+        if to_algorithm in CONTEXT_STAGES:
+            # контекстной стадии нужен весь вход целиком (окно ссылок LZSS, блоки BWT)
+            codec = lzss if to_algorithm == 7 else bwt
+            data = b"".join(source())
+            with open(out_path, "wb") as out:
+                out.write(pipeline.make_header(to_algorithm, n))
+                out.write(codec.encode_payload(data, codec.DEFAULT_LEVEL if level is None else level))
+            print(f"Transcoded algorithm {alg} -> {to_algorithm}")
+            return
+        if to_algorithm in WHOLE_INPUT_CODECS:
+            # таблицы этих кодеров (контексты, кодовые точки, участки) считаются по всему входу
+            data = b"".join(source())
+            with open(out_path, "wb") as out:
+                out.write(pipeline.make_header(to_algorithm, n))
+                out.write(WHOLE_INPUT_CODECS[to_algorithm].encode_payload(data))
+            print(f"Transcoded algorithm {alg} -> {to_algorithm}")
+            return
+        
+        if to_algorithm in (1, 2):
+            if freqs is None:
+                # источник без таблицы — первый проход только ради гистограммы
+                counts = [0] * 256
+                for buf in source():
+                    histogram.add_counts(counts, histogram.byte_counts(buf))
+                f.seek(payload_start)
+                freqs = huffman_codec.normalize_freqs(counts, n)
+            # таблица нормализуется одинаково для алгоритмов 1 и 2,
+            # поэтому таблица источника годится целевому кодеру как есть
+            codes = pipeline.codes_for(to_algorithm, freqs)
+        
+        with open(out_path, "wb") as out:
+            out.write(pipeline.make_header(to_algorithm, n))
+            if to_algorithm == 0:
+                for buf in source():
+                    out.write(buf)
+            else:
+                out.write(bytes(freqs))
+                joiner = pipeline.BitJoiner()
+                for buf in source():
+                    out.write(joiner.feed(*pipeline.encode_bits(buf, codes)))
+                out.write(joiner.flush())
+    
+    print(f"Transcoded algorithm {alg} -> {to_algorithm}")
+
 def main(argv):
-    if len(argv) < 3:
-        print("usage: n4.py encode <input> <archive> [--force-algorithm=N] | n4.py decode <archive> <output>", file=sys.stderr)
+    if len(argv) < (2 if argv[:1] == ["profile"] else 3):
+        print("usage: n4.py encode <input> <archive> [--force-algorithm=N] [--dict=FILE] [--level=1..9]"
+              " | n4.py decode <archive> <output>"
+              " | n4.py transcode <in> <out> --to=N [--level=1..9] [--filters=auto|none|CHAIN]"
+              " | n4.py profile <file> [--window=N] [--stride=N] [--threshold=BITS] [--windows]",
+              file=sys.stderr)
         return 2
     
     cmd = argv[0]
     
     try:
-        if cmd == "encode":
+        if cmd == "profile":
+            entropy_profile.print_profile(argv[1], **entropy_profile.parse_options(argv[2:]))
+            return 0
+        elif cmd == "encode":
             force_alg = None
+            dict_path = None
+            level = None
             for arg in argv[3:]:
                 if arg.startswith("--force-algorithm="):
                     force_alg = int(arg.split("=")[1])
+                elif arg.startswith("--dict="):
+                    dict_path = arg.split("=", 1)[1]
+                elif arg.startswith("--level="):
+                    level = int(arg.split("=")[1])
             
-            encode(argv[1], argv[2], force_alg)
+            encode(argv[1], argv[2], force_alg, dict_path, level)
             return 0
         elif cmd == "decode":
             decode(argv[1], argv[2])
             return 0
+        elif cmd == "transcode":
+            to_alg = None
+            level = None
+            filters = None
+            for arg in argv[3:]:
+                if arg.startswith("--to="):
+                    to_alg = int(arg.split("=")[1])
+                elif arg.startswith("--level="):
+                    level = int(arg.split("=")[1])
+                elif arg.startswith("--filters="):
+                    filters = arg.split("=", 1)[1]
+            if to_alg is None:
+                print("usage: n4.py transcode <in> <out> --to=N [--level=1..9] [--filters=auto|none|CHAIN]",
+                      file=sys.stderr)
+                return 2
+            transcode(argv[1], argv[2], to_alg, level, filters)
+            return 0
         else:
             print("unknown command", file=sys.stderr)
             return 2
@@ -25,6 +25,7 @@ import os
 import struct
 import sys
 from typing import List, Tuple
+import importlib.util
 
 SIGNATURE = b"SOBSTV"
 VERSION = 0
@@ -33,6 +34,19 @@ ALGORITHM = 2  # Шеннон-Фано
 HEADER_FMT = "<6sHBxxxxxxx"
 HEADER_SIZE = 16
 
+def load_shared(name, path):
+    """загрузить модуль с общим на процесс состоянием (кэшем) один раз."""
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return module
+
+tablecache = load_shared("otik_tablecache", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablecache.py"))
+histogram = load_shared("otik_histogram", os.path.join(os.path.dirname(os.path.abspath(__file__)), "histogram.py"))
+
 def shannon_fano(symbols_freqs: List[Tuple[int, int]], prefix="") -> dict:
     """Рекурсивное построение кодов Шеннона-Фано.
     
@@ -80,6 +94,10 @@ def build_shannon_fano_codes(freqs):
     
     return shannon_fano(symbols_freqs)
 
+def code_table(freqs):
+    """готовые коды и таблица декодирования из общего кэша (tablecache.py)."""
+    return tablecache.get(ALGORITHM, freqs, build_shannon_fano_codes)
+
 def normalize_freqs(counts, n):
     """Нормализовать частоты к диапазону 0..255."""
     if n == 0:
@@ -92,23 +110,21 @@ def normalize_freqs(counts, n):
     
     return freqs
 
-def encode(input_path: str, archive_path: str):
-    """Сжать файл методом Шеннона-Фано."""
-    with open(input_path, "rb") as f:
-        data = f.read()
-    
+def encode_payload(data):
+    """Сжать данные в памяти: таблица частот (256 байт) + сжатые биты.
+
+    Это всё, что идёт в архиве после 16-байтового заголовка.
+    """
     n = len(data)
     
     # подсчитываем частоты
-    counts = [0] * 256
-    for byte in data:
-        counts[byte] += 1
+    counts = histogram.byte_counts(data)
     
     # нормализуем
     freqs = normalize_freqs(counts, n)
     
-    # строим коды Шеннона-Фано
-    codes = build_shannon_fano_codes(freqs)
+    # коды Шеннона-Фано (строятся один раз на таблицу — кэш)
+    codes = code_table(freqs).codes
     
     # кодируем
     bits = []
@@ -125,6 +141,15 @@ def encode(input_path: str, archive_path: str):
             byte_val |= (bit << (7 - j))
         compressed.append(byte_val)
     
+    return bytes(freqs) + bytes(compressed)
+
+def encode(input_path: str, archive_path: str):
+    """Сжать файл методом Шеннона-Фано."""
+    with open(input_path, "rb") as f:
+        data = f.read()
+    
+    n = len(data)
+    
     # записываем архив
     with open(archive_path, "wb") as f:
         # заголовок
@@ -132,11 +157,8 @@ def encode(input_path: str, archive_path: str):
         header = header[:9] + struct.pack("<Q", n)[:7]
         f.write(header)
         
-        # таблица частот
-        f.write(bytes(freqs))
-        
-        # сжатые данные
-        f.write(compressed)
+        # таблица частот и сжатые данные
+        f.write(encode_payload(data))
 
 def build_decode_tree(codes):
     """Построить дерево декодирования из словаря кодов."""
@@ -150,6 +172,17 @@ def build_decode_tree(codes):
         node[code[-1]] = symbol
     return tree
 
+def decode_payload(payload, n):
+    """Распаковать n байт из таблицы частот + сжатых битов (без заголовка)."""
+    if len(payload) < 256:
+        raise ValueError("short freqs table")
+    freqs = list(payload[:256])
+    
+    # таблица декодирования из кэша
+    table = code_table(freqs)
+    
+    return tablecache.decode_bits(table.decoder, payload[256:], n)
+
 def decode(archive_path: str, output_path: str):
     """Распаковать файл методом Шеннона-Фано."""
     with open(archive_path, "rb") as f:
@@ -173,49 +206,12 @@ def decode(archive_path: str, output_path: str):
         n_bytes = header[9:16] + b'\x00'
         n = struct.unpack("<Q", n_bytes)[0]
         
-        # читаем таблицу частот
-        freqs_raw = f.read(256)
-        if len(freqs_raw) != 256:
-            raise ValueError("short freqs table")
-        freqs = list(freqs_raw)
-        
-        # строим коды
-        codes = build_shannon_fano_codes(freqs)
-        
-        # строим дерево декодирования
-        decode_tree = build_decode_tree(codes)
-        
-        # читаем сжатые данные
-        compressed = f.read()
-    
-    # декодируем
-    decoded = bytearray()
-    node = decode_tree
-    
-    for byte in compressed:
-        for i in range(8):
-            if len(decoded) >= n:
-                break
-            
-            bit = str((byte >> (7 - i)) & 1)
-            
-            if bit in node:
-                val = node[bit]
-                if isinstance(val, int):
-                    decoded.append(val)
-                    node = decode_tree
-                else:
-                    node = val
-            else:
-                # ошибка декодирования - сбрасываем
-                node = decode_tree
-        
-        if len(decoded) >= n:
-            break
+        # таблица частот и сжатые данные
+        payload = f.read()
     
     # записываем результат
     with open(output_path, "wb") as f:
-        f.write(decoded[:n])
+        f.write(decode_payload(payload, n))
 
 def main(argv):
     if len(argv) < 3:
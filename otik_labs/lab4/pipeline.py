@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Конвейерный кодек для форматов Л3.№1 / Л4.№1 / Л4.№6
+
+Читает и пишет те же архивы, что n1.py / n6.py / lab3/n1.py (побайтно идентичные),
+но ввод-вывод и вычисления перекрываются:
+
+  поток чтения --(очередь кусков)--> вычислители --(очередь результатов)--> поток записи
+
+Очереди ограничены (depth кусков), поэтому память постоянна при любом размере файла.
+Кодирование Хаффмана/Шеннона-Фано — в два прохода: 1) гистограмма (чтение и подсчёт
+идут параллельно), 2) кодирование кусков независимо друг от друга; поток записи
+склеивает битовые потоки кусков по границе, не кратной байту.
+Декодирование битового потока последовательно по природе, но чтение, декодирование
+и запись всё равно идут в разных потоках.
+
+CLI:
+  encode <input> <archive> [--algorithm=N] [--chunk=BYTES] [--workers=N] [--threads]
+  decode <archive> <output> [--chunk=BYTES]
+
+--workers=N — число вычислителей (по умолчанию — число ядер); по умолчанию это
+процессы, --threads — потоки (меньше накладных расходов, но вычисления под GIL).
+"""
+from __future__ import annotations
+import os
+import queue
+import struct
+import sys
+import threading
+import importlib.util
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+SIGNATURE = b"SOBSTV"
+VERSION = 0
+HEADER_SIZE = 16
+CHUNK = 1024 * 1024
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+huffman_codec = load_module("huffman_codec", os.path.join(base_dir, "n1.py"))
+sf_codec = load_module("sf_codec", os.path.join(base_dir, "n6.py"))
+lab3_n1 = load_module("lab3_n1", os.path.join(base_dir, "..", "lab3", "n1.py"))
+histogram = huffman_codec.histogram
+
+_STOP = object()
+
+
+# --- ступени конвейера ---
+
+def _reader(path, chunk, out_q, offset=0):
+    """поток чтения: куски файла в ограниченную очередь, затем _STOP."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while True:
+                buf = f.read(chunk)
+                if not buf:
+                    break
+                out_q.put(buf)
+    except BaseException as e:
+        out_q.put(e)
+    out_q.put(_STOP)
+
+
+def _items(q):
+    """забирать элементы очереди до _STOP (исключения потока-источника пробрасываются)."""
+    while True:
+        item = q.get()
+        if item is _STOP:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+class _Writer:
+    """поток записи: пишет элементы очереди в файл по порядку."""
+
+    def __init__(self, f, depth):
+        self.q = queue.Queue(maxsize=depth)
+        self.f = f
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        # после ошибки записи очередь всё равно разбирается до _STOP:
+        # иначе put()/close() навсегда заблокируются на полной очереди
+        while True:
+            data = self.q.get()
+            if data is _STOP:
+                return
+            if self.error is None:
+                try:
+                    self.f.write(data)
+                except BaseException as e:
+                    self.error = e
+
+    def put(self, data):
+        if self.error is not None:
+            raise self.error
+        self.q.put(data)
+
+    def close(self):
+        self.q.put(_STOP)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+def _start_reader(path, chunk, depth, offset=0):
+    q = queue.Queue(maxsize=depth)
+    t = threading.Thread(target=_reader, args=(path, chunk, q, offset), daemon=True)
+    t.start()
+    return q
+
+
+def _ordered_map(executor, fn, items, depth):
+    """executor.map с ограниченным числом кусков «в полёте» и сохранением порядка."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# --- вычисления над кусками (верхний уровень модуля — для пула процессов) ---
+
+_codes = None
+
+
+def _set_codes(codes):
+    global _codes
+    _codes = codes
+
+
+def _count_chunk(buf):
+    return histogram.byte_counts(buf)
+
+
+def encode_bits(buf, codes):
+    """закодировать кусок: (биты, выровненные влево до байта, число бит)."""
+    bits = "".join([codes[b] for b in buf])
+    nbits = len(bits)
+    if nbits == 0:
+        return b"", 0
+    pad = -nbits % 8
+    return (int(bits, 2) << pad).to_bytes((nbits + pad) // 8, "big"), nbits
+
+
+def _encode_chunk(buf):
+    return encode_bits(buf, _codes)
+
+
+def codes_for(algorithm, freqs):
+    """таблица кодов алгоритма 1 (Хаффман) или 2 (Шеннон-Фано) по нормализованным частотам."""
+    codec = huffman_codec if algorithm == 1 else sf_codec
+    return codec.code_table(freqs).codes
+
+
+class BitJoiner:
+    """склейка битовых потоков кусков в один (старший бит — первый)."""
+
+    def __init__(self):
+        self.carry = 0       # неполный последний байт
+        self.carry_bits = 0
+
+    def feed(self, data, nbits):
+        if self.carry_bits == 0 and nbits % 8 == 0:
+            return data
+        pad = len(data) * 8 - nbits
+        total = self.carry_bits + nbits
+        val = (self.carry << nbits) | (int.from_bytes(data, "big") >> pad)
+        rem = total % 8
+        self.carry = val & ((1 << rem) - 1)
+        self.carry_bits = rem
+        return (val >> rem).to_bytes(total // 8, "big")
+
+    def flush(self):
+        if self.carry_bits == 0:
+            return b""
+        return bytes([self.carry << (8 - self.carry_bits)])
+
+
+def _make_executor(workers, threads, codes=None):
+    workers = workers or os.cpu_count() or 1
+    if threads:
+        _set_codes(codes)
+        return ThreadPoolExecutor(max_workers=workers), workers
+    return ProcessPoolExecutor(max_workers=workers, initializer=_set_codes, initargs=(codes,)), workers
+
+
+# --- кодирование ---
+
+def make_header(algorithm, n):
+    if algorithm == 0:
+        return struct.pack(lab3_n1.HEADER_FMT, lab3_n1.SIGNATURE, lab3_n1.VERSION, n)
+    header = struct.pack("<6sHBxxxxxxx", SIGNATURE, VERSION, algorithm)
+    return header[:9] + struct.pack("<Q", n)[:7]
+
+
+def encode(input_path, archive_path, algorithm=1, chunk=CHUNK, workers=None, threads=False):
+    """Сжать файл конвейером; результат совпадает с n1.py/n6.py/lab3/n1.py."""
+    if algorithm not in (0, 1, 2):
+        raise ValueError(f"unknown algorithm: {algorithm}")
+    n = os.stat(input_path).st_size
+
+    with open(archive_path, "wb") as out:
+        if algorithm == 0:
+            # без сжатия: только перекрытие чтения и записи
+            writer = _Writer(out, 4)
+            writer.put(make_header(0, n))
+            for buf in _items(_start_reader(input_path, chunk, 4)):
+                writer.put(buf)
+            writer.close()
+            return
+
+        codec = huffman_codec if algorithm == 1 else sf_codec
+
+        # проход 1: гистограмма
+        executor, workers = _make_executor(workers, threads)
+        depth = 2 * workers + 2
+        with executor:
+            counts = [0] * 256
+            for part in _ordered_map(executor, _count_chunk,
+                                     _items(_start_reader(input_path, chunk, depth)), depth):
+                histogram.add_counts(counts, part)
+
+        freqs = codec.normalize_freqs(counts, n)
+        codes = codes_for(algorithm, freqs)
+
+        # проход 2: кодирование кусков и склейка битов
+        executor, workers = _make_executor(workers, threads, codes)
+        writer = _Writer(out, depth)
+        joiner = BitJoiner()
+        try:
+            writer.put(make_header(algorithm, n))
+            writer.put(bytes(freqs))
+            with executor:
+                for data, nbits in _ordered_map(executor, _encode_chunk,
+                                                _items(_start_reader(input_path, chunk, depth)), depth):
+                    writer.put(joiner.feed(data, nbits))
+            writer.put(joiner.flush())
+        finally:
+            writer.close()
+
+
+# --- декодирование ---
+
+# таблицы декодирования живут в tablecache.py (общий кэш процесса)
+DecodeTable = huffman_codec.tablecache.DecodeTable
+StreamDecoder = huffman_codec.tablecache.StreamDecoder
+
+
+def decode(archive_path, output_path, chunk=CHUNK):
+    """Распаковать архив алгоритмов 0/1/2: чтение, декодирование и запись в разных потоках."""
+    file_size = os.path.getsize(archive_path)
+    with open(archive_path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("archive too short")
+        sig = header[:6]
+        ver = struct.unpack("<H", header[6:8])[0]
+        if sig != SIGNATURE:
+            raise ValueError("bad signature")
+        if ver != VERSION:
+            raise ValueError(f"unsupported version: {ver}")
+        # определение алгоритма — как в n3.py
+        n_old = struct.unpack("<Q", header[8:16])[0]
+        if file_size == HEADER_SIZE + n_old:
+            alg, n = 0, n_old
+        else:
+            alg = header[8]
+            n = struct.unpack("<Q", header[9:16] + b"\x00")[0]
+        freqs = None
+        if alg in (1, 2):
+            freqs = f.read(256)
+            if len(freqs) != 256:
+                raise ValueError("short freqs table")
+        elif alg != 0:
+            raise ValueError(f"unknown algorithm: {alg}")
+
+    with open(output_path, "wb") as out:
+        writer = _Writer(out, 4)
+        try:
+            if alg == 0:
+                for buf in _items(_start_reader(archive_path, chunk, 4, HEADER_SIZE)):
+                    writer.put(buf)
+                return
+            codec = huffman_codec if alg == 1 else sf_codec
+            table = codec.code_table(list(freqs))
+            if not table.codes:
+                if n:
+                    raise ValueError("no tree for non-empty file")
+                return
+            dec = StreamDecoder(table.decoder, n)
+            for buf in _items(_start_reader(archive_path, chunk, 4, HEADER_SIZE + 256)):
+                writer.put(dec.feed(buf))
+            if dec.left:
+                raise ValueError("unexpected EOF in archive data")
+        finally:
+            writer.close()
+
+
+def main(argv):
+    if len(argv) < 3:
+        print("usage: pipeline.py encode <input> <archive> [--algorithm=N] [--chunk=BYTES] [--workers=N] [--threads]"
+              " | pipeline.py decode <archive> <output> [--chunk=BYTES]", file=sys.stderr)
+        return 2
+
+    cmd = argv[0]
+    opts = dict(a[2:].split("=", 1) if "=" in a else (a[2:], "") for a in argv[3:] if a.startswith("--"))
+    try:
+        chunk = int(opts.get("chunk", CHUNK))
+        if cmd == "encode":
+            encode(argv[1], argv[2], int(opts.get("algorithm", 1)), chunk,
+                   int(opts["workers"]) if "workers" in opts else None, "threads" in opts)
+            return 0
+        elif cmd == "decode":
+            decode(argv[1], argv[2], chunk)
+            return 0
+        else:
+            print("unknown command", file=sys.stderr)
+            return 2
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        return 2
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
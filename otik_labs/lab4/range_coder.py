@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Интервальное (арифметическое) кодирование — алгоритм 5
+
+Хаффман и Шеннон-Фано теряют до 1 бита на символ из-за целой длины кода;
+интервальный кодер тратит на символ почти ровно -log2 p бит, и сжатые данные
+получаются в пределах нескольких байт от оценки E из lab2/lab2_1.py.
+
+Кодер — целочисленный, 32-битный, с побайтовой нормализацией (схема с
+переносом, как в LZMA): low — 32 бита + бит переноса, range — 32 бита;
+когда range < 2^24, старший байт low выталкивается в выход. Частоты
+масштабируются к сумме 2^16 (PROB_BITS); при декодировании символ находится
+по таблице слотов 2^16 -> символ, без поиска.
+
+Конец потока: из финального интервала берётся число с наибольшим числом
+нулевых младших байт, нулевые байты в хвосте не пишутся — декодер читает
+за концом данных нули.
+
+Формат архива:
+  Заголовок (16 байт):
+    0..5  : сигнатура b"SOBSTV" (6 байт)
+    6-7   : версия формата uint16 = 0
+    8     : код алгоритма uint8 = 5 (интервальное кодирование)
+    9..15 : исходная длина n (uint64) - 7 байт
+  Битовая карта символов (32 байта): бит s (младший бит байта s // 8 — первый)
+    установлен, если символ s встречается
+  Частоты встречающихся символов по возрастанию s: uint16 (частота - 1),
+    сумма частот = 2^16
+  Сжатые данные
+
+CLI:
+  encode <input> <archive>
+  decode <archive> <output>
+  bench <file1> [<file2> ...]   — размер и скорость против n1.py и оценки E
+"""
+from __future__ import annotations
+import math
+import os
+import struct
+import sys
+import time
+import importlib.util
+
+SIGNATURE = b"SOBSTV"
+VERSION = 0
+ALGORITHM = 5  # интервальное кодирование
+
+HEADER_FMT = "<6sHBxxxxxxx"
+HEADER_SIZE = 16
+BITMAP_SIZE = 32
+
+PROB_BITS = 16
+TOTAL = 1 << PROB_BITS
+TOP = 1 << 24
+MASK32 = 0xFFFFFFFF
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+histogram = load_module("histogram", os.path.join(base_dir, "histogram.py"))
+
+
+def scale_freqs(counts, n):
+    """частоты с суммой ровно TOTAL; ненулевые не становятся нулями."""
+    freqs = [0] * 256
+    if n == 0:
+        return freqs
+    for s in range(256):
+        if counts[s]:
+            freqs[s] = max(1, counts[s] * TOTAL // n)
+    # остаток (или излишек) раздаём самым частым символам
+    diff = TOTAL - sum(freqs)
+    order = sorted((s for s in range(256) if freqs[s]), key=lambda s: -freqs[s])
+    i = 0
+    while diff:
+        s = order[i % len(order)]
+        if diff > 0:
+            freqs[s] += 1
+            diff -= 1
+        elif freqs[s] > 1:
+            freqs[s] -= 1
+            diff += 1
+        i += 1
+    return freqs
+
+
+def pack_freqs(freqs):
+    bitmap = bytearray(BITMAP_SIZE)
+    values = bytearray()
+    for s in range(256):
+        if freqs[s]:
+            bitmap[s >> 3] |= 1 << (s & 7)
+            values += struct.pack("<H", freqs[s] - 1)
+    return bytes(bitmap + values)
+
+
+def unpack_freqs(payload):
+    """(частоты, позиция начала сжатых данных)."""
+    if len(payload) < BITMAP_SIZE:
+        raise ValueError("short symbol bitmap")
+    freqs = [0] * 256
+    pos = BITMAP_SIZE
+    for s in range(256):
+        if payload[s >> 3] & (1 << (s & 7)):
+            if pos + 2 > len(payload):
+                raise ValueError("short freqs table")
+            freqs[s] = struct.unpack_from("<H", payload, pos)[0] + 1
+            pos += 2
+    if any(freqs) and sum(freqs) != TOTAL:
+        raise ValueError("bad freqs table")
+    return freqs, pos
+
+
+def cumulative(freqs):
+    cum = [0] * 257
+    for s in range(256):
+        cum[s + 1] = cum[s] + freqs[s]
+    return cum
+
+
+def encode_bytes(data, freqs):
+    """закодировать data интервальным кодером по частотам freqs (сумма TOTAL)."""
+    cum = cumulative(freqs)
+    out = bytearray()
+    low = 0
+    rng = MASK32
+    cache = 0
+    pending = 0  # сколько байт 0xFF ждут решения о переносе (после cache)
+
+    def shift_low():
+        nonlocal low, cache, pending
+        if low < 0xFF000000 or low > MASK32:
+            carry = low >> 32
+            out.append((cache + carry) & 0xFF)
+            out.extend(bytes([(0xFF + carry) & 0xFF]) * pending)
+            pending = 0
+            cache = (low >> 24) & 0xFF
+        else:
+            pending += 1
+        low = (low & 0x00FFFFFF) << 8
+
+    for b in data:
+        r = rng >> PROB_BITS
+        low += r * cum[b]
+        rng = r * freqs[b]
+        while rng < TOP:
+            rng <<= 8
+            shift_low()
+
+    # финальное значение с наибольшим числом нулевых младших байт
+    for bits in (32, 24, 16, 8, 0):
+        v = (low + (1 << bits) - 1) >> bits << bits
+        if v < low + rng:
+            low = v
+            break
+    for _ in range(5):
+        shift_low()
+    # первый байт всегда 0 (начальный cache), нулевой хвост декодер додумает сам
+    return bytes(out[1:]).rstrip(b"\x00")
+
+
+def decode_bytes(payload, n, freqs):
+    """раскодировать n байт (за концом payload читаются нули)."""
+    if n == 0:
+        return b""
+    cum = cumulative(freqs)
+    # таблица слотов: значение в пределах [0, TOTAL) -> символ
+    slots = bytearray(TOTAL)
+    for s in range(256):
+        if freqs[s]:
+            slots[cum[s]:cum[s + 1]] = bytes([s]) * freqs[s]
+
+    data = bytes(payload) + b"\x00" * 4
+    size = len(data)
+    pos = 4
+    code = int.from_bytes(data[:4], "big")
+    rng = MASK32
+    out = bytearray()
+    for _ in range(n):
+        r = rng >> PROB_BITS
+        slot = code // r
+        if slot >= TOTAL:
+            raise ValueError("corrupted range coder data")
+        s = slots[slot]
+        code -= r * cum[s]
+        rng = r * freqs[s]
+        while rng < TOP:
+            rng <<= 8
+            code = ((code << 8) | (data[pos] if pos < size else 0)) & MASK32
+            pos += 1
+        out.append(s)
+    return bytes(out)
+
+
+def encode_payload(data):
+    """Сжать данные в памяти: карта символов + частоты + сжатые данные."""
+    counts = histogram.byte_counts(data)
+    freqs = scale_freqs(counts, len(data))
+    return pack_freqs(freqs) + encode_bytes(data, freqs)
+
+
+def decode_payload(payload, n):
+    """Распаковать n байт из карты символов + частот + сжатых данных."""
+    freqs, pos = unpack_freqs(payload)
+    if n and not any(freqs):
+        raise ValueError("empty freqs table for non-empty file")
+    return decode_bytes(memoryview(payload)[pos:], n, freqs)
+
+
+def encode(input_path: str, archive_path: str):
+    """Сжать файл интервальным кодером."""
+    with open(input_path, "rb") as f:
+        data = f.read()
+
+    n = len(data)
+    with open(archive_path, "wb") as f:
+        header = struct.pack(HEADER_FMT, SIGNATURE, VERSION, ALGORITHM)
+        header = header[:9] + struct.pack("<Q", n)[:7]
+        f.write(header)
+        f.write(encode_payload(data))
+
+def decode(archive_path: str, output_path: str):
+    """Распаковать файл, сжатый интервальным кодером."""
+    with open(archive_path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("short header")
+
+        sig = header[:6]
+        ver = struct.unpack("<H", header[6:8])[0]
+        alg = header[8]
+
+        if sig != SIGNATURE:
+            raise ValueError("bad signature")
+        if ver != VERSION:
+            raise ValueError(f"unsupported version: {ver}")
+        if alg != ALGORITHM:
+            raise ValueError(f"wrong algorithm: {alg}")
+
+        n = struct.unpack("<Q", header[9:16] + b"\x00")[0]
+        payload = f.read()
+
+    data = decode_payload(payload, n)
+    with open(output_path, "wb") as f:
+        f.write(data)
+
+def bench(paths):
+    """сравнить с n1.py: размер сжатых данных, оценка E (lab2_1), скорость."""
+    huffman_codec = load_module("huffman_codec", os.path.join(base_dir, "n1.py"))
+    print(f"{'file':<24} {'n':>10} {'E':>10} {'range':>10} {'n1':>10}"
+          f" {'enc MB/s':>9} {'dec MB/s':>9} {'n1 enc':>9} {'n1 dec':>9}")
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        n = len(data)
+        counts = histogram.byte_counts(data)
+        E = math.ceil(histogram.entropy_bits(counts) / 8) if n else 0
+
+        row = []
+        codecs = ((encode_payload, decode_payload, len(pack_freqs(scale_freqs(counts, n)))),
+                  (huffman_codec.encode_payload, huffman_codec.decode_payload, 256))
+        for enc, dec, table in codecs:
+            t0 = time.perf_counter()
+            payload = enc(data)
+            t1 = time.perf_counter()
+            if dec(payload, n) != data:
+                raise ValueError(f"round trip failed: {path}")
+            t2 = time.perf_counter()
+            row.append((len(payload) - table, n / 1e6 / max(t1 - t0, 1e-9), n / 1e6 / max(t2 - t1, 1e-9)))
+        (rc_size, rc_enc, rc_dec), (h_size, h_enc, h_dec) = row
+        print(f"{os.path.basename(path)[:24]:<24} {n:>10} {E:>10} {rc_size:>10} {h_size:>10}"
+              f" {rc_enc:>9.2f} {rc_dec:>9.2f} {h_enc:>9.2f} {h_dec:>9.2f}")
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "bench":
+        bench(argv[1:])
+        return 0
+    if len(argv) < 3:
+        print("usage: range_coder.py encode <input> <archive> | range_coder.py decode <archive> <output>"
+              " | range_coder.py bench <file>...", file=sys.stderr)
+        return 2
+
+    cmd = argv[0]
+    try:
+        if cmd == "encode":
+            encode(argv[1], argv[2])
+            return 0
+        elif cmd == "decode":
+            decode(argv[1], argv[2])
+            return 0
+        else:
+            return 2
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
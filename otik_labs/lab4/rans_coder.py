@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+rANS (асимметричные системы счисления) с чередованием состояний — алгоритм 6
+
+Как и интервальный кодер (range_coder.py), не теряет дробных битов Хаффмана,
+но декодирование символа — это поиск по таблице слотов и одно умножение со
+сдвигом, без деления. Частоты — та же таблица, что в range_coder.py: сумма
+ровно 2^16 (степень двойки), ненулевые частоты не обнуляются (как normalize_freqs).
+
+Используются STATES независимых 32-битных состояний: символ i кодируется
+состоянием i % STATES. Цепочки зависимостей у состояний разные, поэтому их
+шаги можно выполнять параллельно (векторно); в Python это в основном экономит
+на нормализации.
+
+Состояние x лежит в [L, 256 * L), L = 2^23; нормализация побайтовая.
+Кодирование идёт с конца данных, байты пишутся в обратном порядке, поэтому
+декодер читает поток от начала.
+
+Формат архива:
+  Заголовок (16 байт):
+    0..5  : сигнатура b"SOBSTV" (6 байт)
+    6-7   : версия формата uint16 = 0
+    8     : код алгоритма uint8 = 6 (rANS)
+    9..15 : исходная длина n (uint64) - 7 байт
+  Таблица частот — как в range_coder.py: битовая карта символов (32 байта),
+    затем uint16 (частота - 1) встречающихся символов, сумма частот = 2^16
+  Начальные состояния декодера: STATES x uint32 (big-endian)
+  Байты нормализации
+
+CLI:
+  encode <input> <archive>
+  decode <archive> <output>
+  bench <file1> [<file2> ...]   — размер и скорость против n1.py и range_coder.py
+"""
+from __future__ import annotations
+import os
+import struct
+import sys
+import time
+import importlib.util
+from functools import lru_cache
+
+SIGNATURE = b"SOBSTV"
+VERSION = 0
+ALGORITHM = 6  # rANS
+
+HEADER_FMT = "<6sHBxxxxxxx"
+HEADER_SIZE = 16
+
+STATES = 4          # число чередующихся состояний
+RANS_L = 1 << 23    # нижняя граница состояния
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+range_coder = load_module("range_coder", os.path.join(base_dir, "range_coder.py"))
+
+PROB_BITS = range_coder.PROB_BITS
+TOTAL = range_coder.TOTAL
+
+
+def encode_bytes(data, freqs):
+    """закодировать data по частотам freqs (сумма TOTAL): начальные состояния + байты."""
+    cum = range_coder.cumulative(freqs)
+    # граница нормализации для символа: x >= x_max -> вытолкнуть байт
+    x_max = [((RANS_L >> PROB_BITS) << 8) * f for f in freqs]
+    states = [RANS_L] * STATES
+    out = bytearray()
+    for i in range(len(data) - 1, -1, -1):
+        s = data[i]
+        k = i % STATES
+        x = states[k]
+        f = freqs[s]
+        limit = x_max[s]
+        while x >= limit:
+            out.append(x & 0xFF)
+            x >>= 8
+        states[k] = ((x // f) << PROB_BITS) + (x % f) + cum[s]
+    # состояния — в конец (в файле окажутся первыми, состояние 0 — первым)
+    for k in range(STATES - 1, -1, -1):
+        out += states[k].to_bytes(4, "little")
+    out.reverse()
+    return bytes(out)
+
+
+@lru_cache(maxsize=16)
+def decode_tables(freqs):
+    """таблицы слотов: символ, частота и сдвиг (слот - начало интервала) для каждого слота.
+
+    freqs — кортеж; таблицы одинаковых частот строятся один раз.
+    """
+    cum = range_coder.cumulative(freqs)
+    sym = bytearray(TOTAL)
+    freq = [0] * TOTAL
+    bias = [0] * TOTAL
+    for s in range(256):
+        f = freqs[s]
+        if f:
+            start = cum[s]
+            sym[start:start + f] = bytes([s]) * f
+            freq[start:start + f] = [f] * f
+            bias[start:start + f] = range(f)
+    return sym, freq, bias
+
+
+def decode_bytes(payload, n, freqs):
+    """раскодировать n байт: состояния + байты нормализации."""
+    if n == 0:
+        return b""
+    if len(payload) < 4 * STATES:
+        raise ValueError("short rANS states")
+    sym, freq, bias = decode_tables(tuple(freqs))
+    data = bytes(payload)
+    size = len(data)
+    states = [int.from_bytes(data[4 * k:4 * k + 4], "big") for k in range(STATES)]
+    pos = 4 * STATES
+    mask = TOTAL - 1
+    out = bytearray(n)
+    for i in range(n):
+        k = i % STATES
+        x = states[k]
+        slot = x & mask
+        out[i] = sym[slot]
+        x = freq[slot] * (x >> PROB_BITS) + bias[slot]
+        while x < RANS_L:
+            if pos >= size:
+                raise ValueError("unexpected EOF in archive data")
+            x = (x << 8) | data[pos]
+            pos += 1
+        states[k] = x
+    return bytes(out)
+
+
+def encode_payload(data):
+    """Сжать данные в памяти: таблица частот + состояния + байты нормализации."""
+    counts = range_coder.histogram.byte_counts(data)
+    freqs = range_coder.scale_freqs(counts, len(data))
+    if not data:
+        return range_coder.pack_freqs(freqs)
+    return range_coder.pack_freqs(freqs) + encode_bytes(data, freqs)
+
+
+def decode_payload(payload, n):
+    """Распаковать n байт из таблицы частот + состояний + байтов нормализации."""
+    freqs, pos = range_coder.unpack_freqs(payload)
+    if n and not any(freqs):
+        raise ValueError("empty freqs table for non-empty file")
+    return decode_bytes(memoryview(payload)[pos:], n, freqs)
+
+
+def encode(input_path: str, archive_path: str):
+    """Сжать файл кодером rANS."""
+    with open(input_path, "rb") as f:
+        data = f.read()
+
+    n = len(data)
+    with open(archive_path, "wb") as f:
+        header = struct.pack(HEADER_FMT, SIGNATURE, VERSION, ALGORITHM)
+        header = header[:9] + struct.pack("<Q", n)[:7]
+        f.write(header)
+        f.write(encode_payload(data))
+
+def decode(archive_path: str, output_path: str):
+    """Распаковать файл, сжатый кодером rANS."""
+    with open(archive_path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("short header")
+
+        sig = header[:6]
+        ver = struct.unpack("<H", header[6:8])[0]
+        alg = header[8]
+
+        if sig != SIGNATURE:
+            raise ValueError("bad signature")
+        if ver != VERSION:
+            raise ValueError(f"unsupported version: {ver}")
+        if alg != ALGORITHM:
+            raise ValueError(f"wrong algorithm: {alg}")
+
+        n = struct.unpack("<Q", header[9:16] + b"\x00")[0]
+        payload = f.read()
+
+    data = decode_payload(payload, n)
+    with open(output_path, "wb") as f:
+        f.write(data)
+
+def bench(paths):
+    """сравнить с n1.py и range_coder.py: размер payload и скорость (МБ/с)."""
+    huffman_codec = load_module("huffman_codec", os.path.join(base_dir, "n1.py"))
+    codecs = (("rans", encode_payload, decode_payload),
+              ("range", range_coder.encode_payload, range_coder.decode_payload),
+              ("n1", huffman_codec.encode_payload, huffman_codec.decode_payload))
+    print(f"{'file':<24} {'codec':<6} {'payload':>10} {'enc MB/s':>9} {'dec MB/s':>9}")
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        n = len(data)
+        for name, enc, dec in codecs:
+            t0 = time.perf_counter()
+            payload = enc(data)
+            t1 = time.perf_counter()
+            if dec(payload, n) != data:
+                raise ValueError(f"round trip failed: {path} ({name})")
+            t2 = time.perf_counter()
+            print(f"{os.path.basename(path)[:24]:<24} {name:<6} {len(payload):>10}"
+                  f" {n / 1e6 / max(t1 - t0, 1e-9):>9.2f} {n / 1e6 / max(t2 - t1, 1e-9):>9.2f}")
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "bench":
+        bench(argv[1:])
+        return 0
+    if len(argv) < 3:
+        print("usage: rans_coder.py encode <input> <archive> | rans_coder.py decode <archive> <output>"
+              " | rans_coder.py bench <file>...", file=sys.stderr)
+        return 2
+
+    cmd = argv[0]
+    try:
+        if cmd == "encode":
+            encode(argv[1], argv[2])
+            return 0
+        elif cmd == "decode":
+            decode(argv[1], argv[2])
+            return 0
+        else:
+            return 2
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Постоянный кэш гистограмм и оценок файлов (на диске, общий для процессов)
+
+n2.py, n4.py, lab2_1.py, lab2_4.py при каждом запуске читают файл целиком и
+заново считают частоты, даже если файл не менялся с прошлого прогона. Здесь
+результаты хранятся на диске:
+
+  ключ файла : (устройство, inode, размер, mtime) -> хэш содержимого (BLAKE2b);
+               если по stat запись не найдена (файл скопирован, тронут touch),
+               файл читается и ищется по хэшу содержимого
+  значения   : по хэшу содержимого и имени — гистограммы (bytes — 256 частот,
+               pairs — 65536 частот пар, как в histogram.py) и производные
+               оценки (любое значение JSON, например n4.huffman_size.v1);
+               версия оценщика входит в имя записи: после изменения оценки
+               (normalize_freqs, построение дерева) старые записи не читаются
+
+Повторный прогон по неизменным файлам стоит один stat и пару чтений маленьких
+файлов на файл: данные не читаются и не хэшируются.
+
+Каталог: $OTIK_CACHE, иначе $XDG_CACHE_HOME/otik, %LOCALAPPDATA%/otik или
+~/.cache/otik; OTIK_CACHE=off отключает кэш. Размер ограничен MAX_BYTES
+($OTIK_CACHE_MAX, МБ): при переполнении удаляются давно не использованные
+файлы (LRU по mtime — при попадании mtime обновляется).
+
+Параллельный доступ из нескольких процессов:
+  - каждый файл пишется во временный и переименовывается (os.replace) —
+    читатель видит либо старую, либо новую запись целиком;
+  - удалённая или испорченная запись — просто промах, значение считается заново;
+  - вытеснение выполняет один процесс (файл блокировки, созданный с O_EXCL);
+  - запись по stat не делается для файлов, изменённых меньше RACY секунд назад:
+    в пределах одного тика mtime файл мог измениться, не изменив ключа.
+
+Ошибки диска (нет прав, нет места) не мешают анализу: кэш тогда не используется.
+
+CLI:
+  stats              — каталог, число файлов и объём
+  evict [--max=МБ]   — вытеснить до заданного объёма
+  clear              — удалить все записи
+"""
+from __future__ import annotations
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+
+VERSION = 1                     # меняется при смене формата записей
+
+MAX_BYTES = 256 * 1024 * 1024   # объём кэша по умолчанию
+LOW_WATER = 0.8                 # вытеснять до этой доли MAX_BYTES
+EVICT_EVERY = 16 * 1024 * 1024  # записано байт с прошлой проверки объёма
+EVICT_INTERVAL = 600            # секунд между проверками объёма разными запусками
+TOUCH_AFTER = 3600              # mtime записи обновляется не чаще, секунд
+RACY = 2.0                      # секунд: более свежие файлы — только по содержимому
+LOCK_STALE = 60                 # секунд: блокировка старше считается брошенной
+
+COUNTS = b"C"  # zlib(array('Q'))
+VALUE = b"J"   # JSON
+
+
+def load_shared(name, path):
+    """загрузить модуль с общим на процесс состоянием один раз."""
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return module
+
+histogram = load_shared("otik_histogram", os.path.join(os.path.dirname(os.path.abspath(__file__)), "histogram.py"))
+
+
+def default_root():
+    """каталог кэша из окружения; None — кэш отключён."""
+    env = os.environ.get("OTIK_CACHE")
+    if env is not None:
+        return None if env.strip().lower() in ("", "0", "off", "no", "none") else env
+    base = (os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "otik")
+
+
+def default_max_bytes():
+    env = os.environ.get("OTIK_CACHE_MAX")
+    return int(float(env) * 1024 * 1024) if env else MAX_BYTES
+
+
+def _dump_counts(counts):
+    return COUNTS + zlib.compress(array("Q", counts).tobytes(), 1)
+
+
+def _load_counts(blob):
+    if blob[:1] != COUNTS:
+        raise ValueError("not a histogram")
+    counts = array("Q")
+    counts.frombytes(zlib.decompress(blob[1:]))
+    return counts.tolist()
+
+
+def _dump_value(value):
+    return VALUE + json.dumps(value, separators=(",", ":")).encode()
+
+
+def _load_value(blob):
+    if blob[:1] != VALUE:
+        raise ValueError("not a JSON value")
+    return json.loads(blob[1:])
+
+
+def _check_name(name):
+    if not name or not all(ch.isalnum() or ch in "._-" for ch in name):
+        raise ValueError(f"bad cache entry name: {name!r}")
+    return name
+
+
+class StatCache:
+    """записи на диске: keys/<stat> -> хэш содержимого, data/<хэш>.<имя> -> значение."""
+
+    def __init__(self, root=None, max_bytes=MAX_BYTES):
+        self.root = os.path.join(root, f"v{VERSION}") if root else None
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._written = 0
+        self._checked = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.root is not None
+
+    def _path(self, kind, name):
+        return os.path.join(self.root, kind, name)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def read(self, kind, name):
+        """содержимое записи или None (нет записи, ошибка чтения)."""
+        path = self._path(kind, name)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+                mtime = os.fstat(f.fileno()).st_mtime
+            if time.time() - mtime > TOUCH_AFTER:
+                os.utime(path)  # запись используется: в конец очереди LRU
+        except OSError:
+            return None
+        return blob
+
+    def write(self, kind, name, blob):
+        """атомарно записать запись; ошибки диска игнорируются."""
+        if not self.enabled:
+            return
+        directory = os.path.join(self.root, kind)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp, os.path.join(directory, name))
+            except OSError:
+                # например, Windows не заменяет файл, открытый другим процессом
+                os.remove(tmp)
+                return
+        except OSError:
+            return
+        with self._lock:
+            self._written += len(blob)
+            full = self._written >= EVICT_EVERY
+            first = not self._checked
+            if full or first:
+                self._written = 0
+                self._checked = True
+        # первая запись в процессе: проверить объём, если давно никто не проверял
+        if full or (first and self._check_due()):
+            self.evict()
+
+    def get(self, digest, name, load):
+        """значение записи digest.name (load(blob) разбирает) или None."""
+        blob = self.read("data", f"{digest}.{name}")
+        if blob is not None:
+            try:
+                value = load(blob)
+            except (ValueError, zlib.error):
+                value = None  # испорченная запись — промах, перезапишется
+            if value is not None:
+                self._count(True)
+                return value
+        self._count(False)
+        return None
+
+    def put(self, digest, name, blob):
+        self.write("data", f"{digest}.{name}", blob)
+
+    # --- вытеснение ---
+
+    def _entries(self):
+        """(mtime, размер, путь) всех файлов кэша и их общий объём."""
+        entries = []
+        total = 0
+        for kind in ("keys", "data"):
+            try:
+                it = os.scandir(os.path.join(self.root, kind))
+            except OSError:
+                continue
+            with it:
+                for e in it:
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, e.path))
+                    total += st.st_size
+        return entries, total
+
+    def _check_due(self):
+        """прошло ли EVICT_INTERVAL с последнего вытеснения (метка — mtime файла evicted)."""
+        try:
+            return time.time() - os.stat(os.path.join(self.root, "evicted")).st_mtime >= EVICT_INTERVAL
+        except OSError:
+            return True
+
+    def evict(self, max_bytes=None):
+        """удалить давно не использованные файлы, пока объём больше LOW_WATER · max_bytes.
+
+        Возвращает (удалено файлов, освобождено байт); (0, 0), если вытесняет
+        другой процесс.
+        """
+        if not self.enabled:
+            return 0, 0
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        lock = os.path.join(self.root, "evict.lock")
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(lock).st_mtime < LOCK_STALE:
+                    return 0, 0
+                os.remove(lock)  # процесс-владелец завершился, не сняв блокировку
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except OSError:
+                return 0, 0
+        except OSError:
+            return 0, 0
+        removed = freed = 0
+        try:
+            os.close(fd)
+            entries, total = self._entries()
+            now = time.time()
+            target = int(max_bytes * LOW_WATER) if total > max_bytes else total
+            for mtime, size, path in sorted(entries):
+                stale_tmp = os.path.basename(path).startswith(".tmp-") and now - mtime > LOCK_STALE
+                if total <= target and not stale_tmp:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue  # уже удалён другим процессом или открыт
+                removed += 1
+                freed += size
+                total -= size
+            with open(os.path.join(self.root, "evicted"), "wb"):
+                pass
+        except OSError:
+            pass
+        finally:
+            try:
+                os.remove(lock)
+            except OSError:
+                pass
+        return removed, freed
+
+    def clear(self):
+        """удалить все записи; возвращает число удалённых файлов."""
+        if not self.enabled:
+            return 0
+        return self.evict(0)[0]
+
+    def usage(self):
+        entries, total = self._entries() if self.enabled else ([], 0)
+        return {"root": self.root, "files": len(entries), "bytes": total,
+                "max_bytes": self.max_bytes}
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+class FileEntry:
+    """записи кэша для одного файла.
+
+    Файл читается и хэшируется только при промахе; data и digest считаются
+    один раз на объект.
+    """
+
+    def __init__(self, cache, path):
+        self.cache = cache
+        self.path = path
+        st = os.stat(path)
+        self.size = st.st_size
+        self._stat = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        self._racy = time.time() - st.st_mtime < RACY
+        self._data = None
+        self._digest = None
+
+    @property
+    def stat_key(self):
+        raw = "{}:{}:{}:{}".format(*self._stat).encode()
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    @property
+    def data(self):
+        if self._data is None:
+            with open(self.path, "rb") as f:
+                self._data = f.read()
+                st = os.fstat(f.fileno())
+            if (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) != self._stat:
+                self._racy = True  # файл изменился с момента stat: ключ по stat не пишем
+        return self._data
+
+    @property
+    def digest(self):
+        """хэш содержимого: по записи keys/<stat>, иначе по данным файла."""
+        if self._digest is None:
+            blob = self.cache.read("keys", self.stat_key)
+            try:
+                self._digest = bytes.fromhex(blob.decode("ascii")).hex() if blob else None
+            except ValueError:
+                self._digest = None  # испорченная запись
+            if self._digest is None or len(self._digest) != 32:
+                self._digest = hashlib.blake2b(self.data, digest_size=16).hexdigest()
+                if not self._racy:
+                    self.cache.write("keys", self.stat_key, self._digest.encode("ascii"))
+        return self._digest
+
+    def _cached(self, name, load, dump, compute):
+        if not self.cache.enabled:
+            return compute()
+        name = _check_name(name)
+        value = self.cache.get(self.digest, name, load)
+        if value is None:
+            value = compute()
+            self.cache.put(self.digest, name, dump(value))
+        return value
+
+    def counts(self, name, compute):
+        """таблица частот name; compute(data) -> список int при промахе."""
+        return self._cached(name, _load_counts, _dump_counts, lambda: compute(self.data))
+
+    def value(self, name, version, compute):
+        """производная оценка name версии version (значение JSON); compute() при промахе.
+
+        version увеличивает оценщик при любом изменении результата — запись
+        хранится под именем name.v<version>.
+        """
+        return self._cached(f"{name}.v{version}", _load_value, _dump_value, compute)
+
+    def byte_counts(self):
+        """256 частот байтов (histogram.byte_counts)."""
+        return self.counts("bytes", histogram.byte_counts)
+
+    def pair_counts(self):
+        """65536 частот пар соседних байтов (histogram.pair_counts)."""
+        return self.counts("pairs", histogram.pair_counts)
+
+
+CACHE = StatCache(default_root(), default_max_bytes())
+
+
+def entry(path):
+    return FileEntry(CACHE, path)
+
+
+def stats():
+    return CACHE.stats()
+
+
+def format_stats(s=None):
+    s = s or stats()
+    total = s["hits"] + s["misses"]
+    rate = 100.0 * s["hits"] / total if total else 0.0
+    return f"stat cache: {s['hits']} hits, {s['misses']} misses ({rate:.1f}% hit rate)"
+
+
+def main(argv):
+    if not argv or argv[0] not in ("stats", "evict", "clear"):
+        print("usage: statcache.py stats | statcache.py evict [--max=MB] | statcache.py clear",
+              file=sys.stderr)
+        return 2
+
+    cmd = argv[0]
+
+    try:
+        if not CACHE.enabled:
+            print("cache disabled (OTIK_CACHE=off)")
+            return 0
+        if cmd == "stats":
+            u = CACHE.usage()
+            print(f"{u['root']}: {u['files']} files, {u['bytes']} bytes (limit {u['max_bytes']})")
+        elif cmd == "evict":
+            max_bytes = None
+            for arg in argv[1:]:
+                if arg.startswith("--max="):
+                    max_bytes = int(float(arg.split("=", 1)[1]) * 1024 * 1024)
+            removed, freed = CACHE.evict(max_bytes)
+            print(f"evicted {removed} files, {freed} bytes")
+        else:
+            print(f"removed {CACHE.clear()} files")
+        return 0
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Кэш готовых таблиц кодов (общий на процесс)
+
+n1.py / n6.py строят дерево и словарь кодов из 256-байтовой таблицы частот при
+каждом вызове, хотя у архивов одного источника нормализованные таблицы обычно
+совпадают. Здесь хранится ограниченный LRU-кэш:
+
+  ключ     : (код алгоритма, хэш 256 байт таблицы частот)
+  значение : CodeTable — коды для кодирования и DecodeTable для декодирования
+
+Модуль держит состояние, поэтому его загружают через load_shared() под одним
+именем "otik_tablecache": все модули лабораторной получают один экземпляр и один кэш.
+stats() — число попаданий и промахов.
+"""
+from __future__ import annotations
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+MAX_TABLES = 64  # сколько разных таблиц держать одновременно
+
+
+class DecodeTable:
+    """неизменяемая часть декодера префиксного кода — её можно строить один раз
+    и переиспользовать для многих файлов с одной таблицей.
+
+    Коды Хаффмана и Шеннона-Фано полные и префиксные, поэтому разбор строки бит
+    регулярным выражением-альтернативой однозначен.
+    """
+
+    def __init__(self, codes):
+        self.single = None
+        self.lookup = {}
+        self.match = None
+        if len(codes) == 1:
+            # один символ: n1/n6 кодируют его как "0", данные однозначны без разбора
+            self.single = next(iter(codes))
+        elif codes:
+            self.lookup = {code: sym for sym, code in codes.items()}
+            self.match = re.compile("|".join(sorted(self.lookup, key=len))).match
+
+
+class StreamDecoder:
+    """потоковый декодер префиксного кода: куски битов -> байты.
+
+    Хвост куска без полного кода переносится в следующий кусок.
+    codes — словарь кодов или готовая DecodeTable.
+    """
+
+    def __init__(self, codes, n):
+        table = codes if isinstance(codes, DecodeTable) else DecodeTable(codes)
+        self.n = n
+        self.left = n
+        self.tail = ""
+        self.single = table.single
+        self.lookup = table.lookup
+        self.match = table.match
+
+    def feed(self, buf):
+        if self.left == 0 or not buf:
+            return b""
+        if self.single is not None:
+            take = min(self.left, len(buf) * 8)
+            self.left -= take
+            return bytes([self.single]) * take
+        bits = self.tail + format(int.from_bytes(buf, "big"), f"0{len(buf) * 8}b")
+        lookup = self.lookup
+        match = self.match
+        out = bytearray()
+        end = 0
+        while len(out) < self.left:
+            m = match(bits, end)
+            if m is None:
+                break
+            out.append(lookup[m.group()])
+            end = m.end()
+        self.tail = bits[end:]
+        self.left -= len(out)
+        return bytes(out)
+
+
+def decode_bits(table, data, n, chunk=64 * 1024):
+    """декодировать до n байт из упакованных бит data (кусками, без дерева)."""
+    dec = StreamDecoder(table, n)
+    out = bytearray()
+    view = memoryview(data)
+    for pos in range(0, len(view), chunk):
+        if not dec.left:
+            break
+        out += dec.feed(bytes(view[pos:pos + chunk]))
+    return bytes(out)
+
+
+class CodeTable:
+    """готовые таблицы для одной таблицы частот."""
+
+    def __init__(self, codes):
+        self.codes = codes
+        self.decoder = DecodeTable(codes)
+
+
+class TableCache:
+    """LRU-кэш CodeTable по (алгоритм, хэш таблицы частот). Потокобезопасен."""
+
+    def __init__(self, max_tables=MAX_TABLES):
+        self.max_tables = max_tables
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(algorithm, freqs):
+        return algorithm, hashlib.blake2b(bytes(freqs), digest_size=16).digest()
+
+    def get(self, algorithm, freqs, build):
+        """CodeTable для таблицы freqs; build(freqs) -> словарь кодов (при промахе)."""
+        key = self.key(algorithm, freqs)
+        with self._lock:
+            table = self._items.get(key)
+            if table is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return table
+            self.misses += 1
+        # строим вне блокировки: таблицы детерминированы, гонка безвредна
+        table = CodeTable(build(list(freqs)))
+        with self._lock:
+            self._items[key] = table
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_tables:
+                self._items.popitem(last=False)
+        return table
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "tables": len(self._items), "max_tables": self.max_tables}
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+
+CACHE = TableCache()
+
+
+def get(algorithm, freqs, build):
+    return CACHE.get(algorithm, freqs, build)
+
+
+def stats():
+    return CACHE.stats()
+
+
+def format_stats(s=None):
+    s = s or stats()
+    total = s["hits"] + s["misses"]
+    rate = 100.0 * s["hits"] / total if total else 0.0
+    return (f"table cache: {s['hits']} hits, {s['misses']} misses ({rate:.1f}% hit rate), "
+            f"{s['tables']}/{s['max_tables']} tables")
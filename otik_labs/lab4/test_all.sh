@@ -103,9 +103,72 @@ echo ""
 echo "Большой файл:"
 ls -lh test_large.txt test_large_h.otik test_large_sf.otik test_large_smart.otik
 
+echo ""
+echo "=== Алгоритмы 3..11: n4.py --force-algorithm и декодирование n3.py ==="
+echo ""
+: > test_empty.txt
+printf 'A' > test_one.txt
+mkdir -p test_dicts
+python3 dict_huffman.py train test_dicts/test.otikdict test_large.txt
+for alg in 3 4 5 6 7 8 9 10 11; do
+    for f in test_small.txt test_large.txt test_empty.txt test_one.txt; do
+        python3 n4.py encode $f test_force.otik --force-algorithm=$alg --dict=test_dicts/test.otikdict > /dev/null
+        OTIK_DICTS=test_dicts python3 n3.py decode test_force.otik test_force_out.txt > /dev/null
+        cmp -s $f test_force_out.txt && echo "✓ Алгоритм $alg, $f: OK" || echo "✗ ОШИБКА: алгоритм $alg, $f"
+    done
+done
+
+echo ""
+echo "=== Л3.№2: каталог с пустым файлом ==="
+echo ""
+N2=../lab3/n2/n2.py
+rm -rf test_tree test_tree_out
+mkdir -p test_tree/sub
+cp test_small.txt test_tree/a.txt
+cp test_large.txt test_tree/sub/large.txt
+: > test_tree/sub/zz_empty
+for p in 0 1 2; do
+    python3 $N2 pack test_tree test_tree.otik --protect=$p
+    python3 $N2 test test_tree.otik > /dev/null && echo "✓ test (protect=$p): OK" || echo "✗ ОШИБКА: test (protect=$p)"
+    rm -rf test_tree_out
+    python3 $N2 unpack test_tree.otik test_tree_out
+    python3 $N2 diff test_tree.otik test_tree_out --checksum && echo "✓ unpack (protect=$p): OK" || echo "✗ ОШИБКА: unpack (protect=$p)"
+done
+echo "Синхронизация после изменений (файл заменён каталогом, каталог — файлом)..."
+rm -rf test_tree_out/a.txt test_tree_out/sub
+mkdir -p test_tree_out/a.txt/extra
+echo "not a directory" > test_tree_out/sub
+python3 $N2 diff test_tree.otik test_tree_out || true
+python3 $N2 unpack test_tree.otik test_tree_out --sync --delete
+python3 $N2 diff test_tree.otik test_tree_out --checksum && echo "✓ unpack --sync: OK" || echo "✗ ОШИБКА: unpack --sync"
+
+echo ""
+echo "=== Л3.№2: порча данных и исправление кодом Рида — Соломона ==="
+echo ""
+python3 $N2 pack test_tree test_tree.otik --protect=2
+# портим по байту в начале и в середине данных sub/large.txt
+python3 - test_tree.otik <<'PY'
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location("n2", "../lab3/n2/n2.py")
+n2 = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(n2)
+with open(sys.argv[1], "r+b") as f:
+    e = next(e for e in n2._read_toc(f, n2._read_header(f)) if e["path"] == "sub/large.txt")
+    for pos in (e["data_offset"], e["data_offset"] + e["stored_size"] // 2):
+        f.seek(pos)
+        b = f.read(1)
+        f.seek(pos)
+        f.write(bytes([b[0] ^ 0x5A]))
+PY
+python3 $N2 test test_tree.otik && echo "✗ ОШИБКА: порча не обнаружена" || echo "✓ Порча обнаружена"
+rm -rf test_tree_out
+python3 $N2 unpack test_tree.otik test_tree_out
+python3 $N2 diff test_tree.otik test_tree_out --checksum && echo "✓ Исправлено при распаковке: OK" || echo "✗ ОШИБКА: исправление RS"
+
 echo ""
 echo "=== Очистка временных файлов ==="
-rm -f test_*_out.txt test_n3_*.txt
+rm -f test_*_out.txt test_n3_*.txt test_force.otik test_empty.txt test_one.txt test_tree.otik
+rm -rf test_dicts test_tree test_tree_out
 
 echo ""
 echo "=== Все тесты завершены! ==="
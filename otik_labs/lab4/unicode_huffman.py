@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Хаффман по кодовым точкам Unicode — алгоритм 10
+
+Модель та же, что в lab2/lab2_2.py: символ — кодовая точка текста UTF-8, а не
+байт. У кириллицы в UTF-8 каждая буква — два байта, и байтовый код (n1.py)
+тратит биты на предсказуемые старшие байты; код по кодовым точкам приближается
+к оценке E из lab2_2.
+
+Алфавит разреженный (до 1 114 112 возможных символов, в тексте — десятки или
+десятки тысяч), поэтому таблица — пары (кодовая точка, длина кода) только для
+встречающихся символов, а коды канонические: декодер восстанавливает их по
+длинам. Длины считаются по точным частотам, без нормализации к uint8.
+
+Дерево строится на массивах за O(m) после сортировки весов (две очереди:
+листья по возрастанию веса и внутренние узлы в порядке создания) — без объектов
+узлов и кучи, так что алфавиты 10^4..10^5 символов строятся за доли секунды.
+
+Кодирование: str.translate заменяет каждый символ строкой его кода из '0'/'1',
+строка бит переводится в байты одним int(..., 2). Декодирование — по таблице:
+первые TABLE_BITS бит указывают на (байты UTF-8 символа, длина кода), длинные
+коды дочитываются по каноническим диапазонам длин; байты UTF-8 пишутся в выход
+сразу, без промежуточной строки.
+
+Байты, не образующие UTF-8, кодируются как отдельные символы U+DC80..U+DCFF
+(surrogateescape) и восстанавливаются как есть — кодек обратим для любых данных.
+
+Формат архива:
+  Заголовок (16 байт):
+    0..5  : сигнатура b"SOBSTV" (6 байт)
+    6-7   : версия формата uint16 = 0
+    8     : код алгоритма uint8 = 10 (Хаффман по кодовым точкам)
+    9..15 : исходная длина n в байтах (uint64) - 7 байт
+  Таблица:
+    varint m — число символов
+    m пар по возрастанию кодовой точки: varint (кодовая точка - предыдущая - 1),
+      uint8 длина кода
+    varint — 7 бит на байт, младшие первыми, старший бит — «есть продолжение»
+  Сжатые данные: канонические коды, старший бит первый, дополнено нулями
+
+CLI:
+  encode <input> <archive>
+  decode <archive> <output>
+  bench <file1> [<file2> ...]   — размер и скорость против n1.py и оценки E (lab2_2)
+"""
+from __future__ import annotations
+import math
+import os
+import struct
+import sys
+import time
+import importlib.util
+from array import array
+from collections import Counter
+
+SIGNATURE = b"SOBSTV"
+VERSION = 0
+ALGORITHM = 10  # Хаффман по кодовым точкам
+
+HEADER_FMT = "<6sHBxxxxxxx"
+HEADER_SIZE = 16
+
+TABLE_BITS = 12          # ширина первичной таблицы декодирования
+CHUNK = 1 << 20          # символов за один проход str.translate при кодировании
+ERRORS = "surrogateescape"
+
+# динамический импорт модулей
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def code_lengths(weights):
+    """длины кодов Хаффмана для весов weights (все > 0), на массивах.
+
+    Листья сортируются по весу; внутренние узлы создаются с неубывающими весами,
+    поэтому два наименьших узла всегда в начале одной из двух очередей.
+    """
+    m = len(weights)
+    if m == 0:
+        return []
+    if m == 1:
+        return [1]
+    order = sorted(range(m), key=weights.__getitem__)
+    leaf_w = [weights[i] for i in order]
+    inner_w = [0] * (m - 1)
+    # узлы 0..m-1 — листья (в порядке order), m..2m-2 — внутренние
+    parent = array("l", [0]) * (2 * m - 1)
+    leaf = head = 0
+    for node in range(m - 1):
+        total = 0
+        for _ in range(2):
+            if leaf < m and (head >= node or leaf_w[leaf] <= inner_w[head]):
+                parent[leaf] = m + node
+                total += leaf_w[leaf]
+                leaf += 1
+            else:
+                parent[m + head] = m + node
+                total += inner_w[head]
+                head += 1
+        inner_w[node] = total
+    depth = array("l", [0]) * (2 * m - 1)
+    for i in range(2 * m - 3, -1, -1):
+        depth[i] = depth[parent[i]] + 1
+    lengths = [0] * m
+    for j, i in enumerate(order):
+        lengths[i] = depth[j]
+    return lengths
+
+
+def canonical_codes(symbols, lengths):
+    """канонические коды: [(символ, длина, код)] в порядке (длина, символ)."""
+    out = []
+    code = 0
+    prev = 0
+    for length, sym in sorted(zip(lengths, symbols)):
+        code <<= length - prev
+        out.append((sym, length, code))
+        code += 1
+        prev = length
+    return out
+
+
+def _varint(v, out):
+    while v >= 0x80:
+        out.append((v & 0x7F) | 0x80)
+        v >>= 7
+    out.append(v)
+
+
+def _read_varint(buf, pos):
+    v = shift = 0
+    while True:
+        if pos >= len(buf):
+            raise ValueError("short code-point table")
+        b = buf[pos]
+        pos += 1
+        v |= (b & 0x7F) << shift
+        if b < 0x80:
+            return v, pos
+        shift += 7
+        if shift > 35:
+            raise ValueError("bad varint in code-point table")
+
+
+def pack_table(symbols, lengths):
+    """таблица (кодовая точка, длина) по возрастанию кодовой точки."""
+    out = bytearray()
+    _varint(len(symbols), out)
+    prev = -1
+    for cp, length in zip(symbols, lengths):
+        _varint(cp - prev - 1, out)
+        out.append(length)
+        prev = cp
+    return bytes(out)
+
+
+def unpack_table(buf, pos=0):
+    """прочитать таблицу: (кодовые точки, длины, позиция после таблицы)."""
+    m, pos = _read_varint(buf, pos)
+    symbols = []
+    lengths = []
+    cp = -1
+    for _ in range(m):
+        delta, pos = _read_varint(buf, pos)
+        cp += delta + 1
+        if cp > 0x10FFFF:
+            raise ValueError("bad code point in table")
+        if pos >= len(buf):
+            raise ValueError("short code-point table")
+        length = buf[pos]
+        pos += 1
+        if length == 0:
+            raise ValueError("zero code length in table")
+        symbols.append(cp)
+        lengths.append(length)
+    return symbols, lengths, pos
+
+
+def build_model(text):
+    """(кодовые точки по возрастанию, длины кодов, частоты) текста."""
+    counts = Counter(text)
+    symbols = sorted(map(ord, counts))
+    weights = [counts[chr(cp)] for cp in symbols]
+    return symbols, code_lengths(weights), weights
+
+
+def estimate_size(data):
+    """размер архива алгоритма 10 (заголовок + таблица + данные) без кодирования."""
+    text = data.decode("utf-8", ERRORS)
+    symbols, lengths, weights = build_model(text)
+    bits = sum(l * w for l, w in zip(lengths, weights))
+    return HEADER_SIZE + len(pack_table(symbols, lengths)) + (bits + 7) // 8
+
+
+def encode_payload(data):
+    """Сжать данные в памяти: таблица кодовых точек + коды."""
+    text = data.decode("utf-8", ERRORS)
+    symbols, lengths, _ = build_model(text)
+    table = {sym: format(code, f"0{length}b") for sym, length, code in canonical_codes(symbols, lengths)}
+    out = bytearray(pack_table(symbols, lengths))
+    carry = ""
+    for pos in range(0, len(text), CHUNK):
+        bits = carry + text[pos:pos + CHUNK].translate(table)
+        whole = len(bits) & ~7
+        if whole:
+            out += int(bits[:whole], 2).to_bytes(whole >> 3, "big")
+        carry = bits[whole:]
+    if carry:
+        out += int(carry.ljust(8, "0"), 2).to_bytes(1, "big")
+    return bytes(out)
+
+
+class DecodeTable:
+    """таблица декодирования канонического кода.
+
+    primary[первые bits бит] — (байты UTF-8 символа, длина кода) для кодов не
+    длиннее bits, None — для префиксов длинных кодов; их дочитывает long_codes:
+    по длине L — (первый код, число кодов, индекс первого символа в syms).
+    """
+
+    def __init__(self, symbols, lengths):
+        codes = canonical_codes(symbols, lengths)
+        self.max_len = max(lengths) if lengths else 0
+        self.bits = min(self.max_len, TABLE_BITS)
+        bits = self.bits
+        self.syms = [chr(sym).encode("utf-8", ERRORS) for sym, _, _ in codes]
+        self.primary = [None] * (1 << bits)
+        self.long_codes = {}
+        for i, (sym, length, code) in enumerate(codes):
+            if length <= bits:
+                entry = (self.syms[i], length)
+                start = code << (bits - length)
+                self.primary[start:start + (1 << (bits - length))] = [entry] * (1 << (bits - length))
+            else:
+                first, count, index = self.long_codes.get(length, (code, 0, i))
+                self.long_codes[length] = (first, count + 1, index)
+
+
+def decode_codes(table, data, n):
+    """раскодировать n байт UTF-8 из кодов data по DecodeTable."""
+    if n == 0:
+        return b""
+    if table.max_len == 0:
+        raise ValueError("no codes for non-empty file")
+    bits = table.bits
+    mask = (1 << bits) - 1
+    primary = table.primary
+    need = table.max_len
+    # нули за концом данных дают декодеру дочитать последний код
+    buf = bytes(data) + bytes(8 + (need >> 3))
+    limit = len(data) * 8
+    out = bytearray()
+    acc = 0
+    nbits = 0   # непрочитанных бит в acc
+    j = 0       # байт buf, с которого пополняется acc
+    used = 0    # прочитано бит данных
+    from_bytes = int.from_bytes
+    while len(out) < n:
+        while nbits < need:
+            acc = ((acc & ((1 << nbits) - 1)) << 64) | from_bytes(buf[j:j + 8], "big")
+            j += 8
+            nbits += 64
+        entry = primary[(acc >> (nbits - bits)) & mask]
+        if entry is None:
+            entry = _decode_long(table, acc, nbits)
+        sym, length = entry
+        nbits -= length
+        used += length
+        if used > limit:
+            raise ValueError("unexpected EOF in archive data")
+        out += sym
+    if len(out) != n:
+        raise ValueError("code-point data longer than original size")
+    return bytes(out)
+
+
+def _decode_long(table, acc, nbits):
+    """код длиннее первичной таблицы: перебор канонических диапазонов длин."""
+    for length in range(table.bits + 1, table.max_len + 1):
+        rng = table.long_codes.get(length)
+        if rng is None:
+            continue
+        first, count, index = rng
+        code = (acc >> (nbits - length)) & ((1 << length) - 1)
+        if first <= code < first + count:
+            return table.syms[index + code - first], length
+    raise ValueError("bad code in archive data")
+
+
+def decode_payload(payload, n):
+    """Распаковать n байт из таблицы кодовых точек + кодов."""
+    symbols, lengths, pos = unpack_table(payload)
+    return decode_codes(DecodeTable(symbols, lengths), memoryview(payload)[pos:], n)
+
+
+def encode(input_path: str, archive_path: str):
+    """Сжать файл кодом Хаффмана по кодовым точкам."""
+    with open(input_path, "rb") as f:
+        data = f.read()
+
+    n = len(data)
+    with open(archive_path, "wb") as f:
+        header = struct.pack(HEADER_FMT, SIGNATURE, VERSION, ALGORITHM)
+        header = header[:9] + struct.pack("<Q", n)[:7]
+        f.write(header)
+        f.write(encode_payload(data))
+
+def decode(archive_path: str, output_path: str):
+    """Распаковать файл, сжатый кодом Хаффмана по кодовым точкам."""
+    with open(archive_path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("short header")
+
+        sig = header[:6]
+        ver = struct.unpack("<H", header[6:8])[0]
+        alg = header[8]
+
+        if sig != SIGNATURE:
+            raise ValueError("bad signature")
+        if ver != VERSION:
+            raise ValueError(f"unsupported version: {ver}")
+        if alg != ALGORITHM:
+            raise ValueError(f"wrong algorithm: {alg}")
+
+        n = struct.unpack("<Q", header[9:16] + b"\x00")[0]
+        payload = f.read()
+
+    data = decode_payload(payload, n)
+    with open(output_path, "wb") as f:
+        f.write(data)
+
+def bench(paths):
+    """сравнить с n1.py: размер payload, оценка E по кодовым точкам (lab2_2), скорость."""
+    huffman_codec = load_module("huffman_codec", os.path.join(base_dir, "n1.py"))
+    print(f"{'file':<24} {'n':>10} {'symbols':>8} {'E':>10} {'cp':>10} {'n1':>10}"
+          f" {'enc MB/s':>9} {'dec MB/s':>9}")
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        n = len(data)
+        counts = Counter(data.decode("utf-8", ERRORS))
+        chars = sum(counts.values())
+        E = math.ceil(sum(c * -math.log2(c / chars) for c in counts.values()) / 8) if chars else 0
+
+        t0 = time.perf_counter()
+        payload = encode_payload(data)
+        t1 = time.perf_counter()
+        if decode_payload(payload, n) != data:
+            raise ValueError(f"round trip failed: {path}")
+        t2 = time.perf_counter()
+        h_size = len(huffman_codec.encode_payload(data))
+        print(f"{os.path.basename(path)[:24]:<24} {n:>10} {len(counts):>8} {E:>10} {len(payload):>10} {h_size:>10}"
+              f" {n / 1e6 / max(t1 - t0, 1e-9):>9.2f} {n / 1e6 / max(t2 - t1, 1e-9):>9.2f}")
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "bench":
+        bench(argv[1:])
+        return 0
+    if len(argv) < 3:
+        print("usage: unicode_huffman.py encode <input> <archive> | unicode_huffman.py decode <archive> <output>"
+              " | unicode_huffman.py bench <file>...", file=sys.stderr)
+        return 2
+
+    cmd = argv[0]
+    try:
+        if cmd == "encode":
+            encode(argv[1], argv[2])
+            return 0
+        elif cmd == "decode":
+            decode(argv[1], argv[2])
+            return 0
+        else:
+            return 2
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))